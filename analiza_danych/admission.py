@@ -0,0 +1,178 @@
+"""
+Kontrola przyjmowania raportów do generowania (admission control).
+
+Każde żądanie raportu dostaje szacunek pamięci (na podstawie rozmiaru pliku,
+liczby wierszy oraz liczby i typów analizowanych kolumn - tylko one są wczytywane). Raport startuje tylko wtedy, gdy jest wolne
+miejsce w puli (REPORT_WORKERS x REPORTS_PER_WORKER) i suma szacunków
+uruchomionych raportów mieści się w budżecie pamięci instancji. Pozostałe
+czekają w kolejce FIFO (pozycję można odpytać przez /api/report-queue), a gdy
+kolejka jest pełna, żądanie jest od razu odrzucane z nagłówkiem Retry-After.
+Dzięki temu przeciążenie wydłuża czas oczekiwania zamiast zabijać procesy (OOM).
+Raport pliku większego niż budżet jest liczony porcjami (outofcore.py) i ma
+osobny szacunek, zależny od rozmiaru porcji i próby, a nie od liczby wierszy.
+
+Konfiguracja przez zmienne środowiskowe:
+- REPORT_MEMORY_BUDGET_MB - budżet pamięci dla raportów (domyślnie 75% pamięci
+  dostępnej przy starcie według psutil, bez psutil 2048 MB),
+- REPORTS_PER_WORKER - liczba jednoczesnych raportów na proces roboczy (domyślnie 1),
+- REPORT_QUEUE_MAX - maksymalna długość kolejki (domyślnie 20),
+- REPORT_MEMORY_FACTOR - mnożnik rozmiaru sparsowanych danych (kopie robocze,
+  ProfileReport; domyślnie 6).
+"""
+import asyncio
+import os
+import statistics
+import time
+from collections import deque
+
+REPORTS_PER_WORKER = int(os.getenv("REPORTS_PER_WORKER", "1"))
+REPORT_QUEUE_MAX = int(os.getenv("REPORT_QUEUE_MAX", "20"))
+REPORT_MEMORY_FACTOR = float(os.getenv("REPORT_MEMORY_FACTOR", "6"))
+
+# Stały narzut jednego raportu (ProfileReport, matplotlib, wynikowy HTML)
+BASE_REPORT_BYTES = 100 * 1024 * 1024
+# Przybliżony koszt komórki w DataFrame: liczba (float64) i tekst (obiekt str + wskaźnik)
+NUMERIC_CELL_BYTES = 8
+OBJECT_CELL_BYTES = 64
+NUMERIC_TYPES = ("ciągła", "binarna")
+
+DEFAULT_RETRY_AFTER = 30
+
+
+def _default_memory_budget():
+    if os.getenv("REPORT_MEMORY_BUDGET_MB"):
+        return int(float(os.getenv("REPORT_MEMORY_BUDGET_MB")) * 1024 * 1024)
+    try:
+        import psutil
+    except ImportError:
+        return 2048 * 1024 * 1024
+    return int(psutil.virtual_memory().available * 0.75)
+
+
+REPORT_MEMORY_BUDGET = _default_memory_budget()
+
+
+class QueueFull(RuntimeError):
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class ReportTooLarge(ValueError):
+    pass
+
+
+def _row_bytes(upload, variable_types):
+    # Raport wczytuje tylko analizowane kolumny (typ inny niż 'pomiń'); bez typów (podgląd) - wszystkie kolumny pliku
+    analyzed = [type_.lower() for type_ in variable_types.values() if type_.lower() != "pomiń"]
+    n_columns = len(analyzed) if analyzed else upload.header.count(b",") + 1
+    n_numeric = sum(1 for type_ in analyzed if type_ in NUMERIC_TYPES)
+    return n_numeric * NUMERIC_CELL_BYTES + (n_columns - n_numeric) * OBJECT_CELL_BYTES
+
+
+def estimate_report_memory(upload, variable_types: dict) -> int:
+    """Szacunek szczytowej pamięci raportu w bajtach, z metadanych przesłanego pliku (uploads.StoredUpload)."""
+    parsed = upload.line_count * _row_bytes(upload, variable_types)
+    return int(BASE_REPORT_BYTES + upload.size + parsed * REPORT_MEMORY_FACTOR)
+
+
+def estimate_streaming_memory(upload, variable_types: dict, resident_rows: int) -> int:
+    """Szacunek pamięci raportu czytającego plik porcjami (zob. outofcore.py): w pamięci najwyżej resident_rows wierszy."""
+    parsed = min(upload.line_count, resident_rows) * _row_bytes(upload, variable_types)
+    return int(BASE_REPORT_BYTES + parsed * REPORT_MEMORY_FACTOR)
+
+
+def format_mb(n_bytes):
+    return f"{n_bytes / 2 ** 20:.0f} MB"
+
+
+class _Ticket:
+    def __init__(self, key, estimate):
+        self.key = key
+        self.estimate = estimate
+        self.started_at = None
+
+
+class AdmissionController:
+    def __init__(self, max_concurrent, memory_budget=REPORT_MEMORY_BUDGET, queue_max=REPORT_QUEUE_MAX):
+        self.max_concurrent = max_concurrent
+        self.memory_budget = memory_budget
+        self.queue_max = queue_max
+        self._waiting = deque()
+        self._running = []
+        self._durations = deque(maxlen=20)
+        self._condition = asyncio.Condition()
+
+    def check(self, estimate):
+        """Zgłasza ReportTooLarge, jeśli raport nie zmieści się w budżecie nawet na pustej instancji."""
+        if estimate > self.memory_budget:
+            raise ReportTooLarge(
+                f"Plik jest zbyt duży do analizy na tym serwerze (szacowane zużycie pamięci {format_mb(estimate)}, "
+                f"limit {format_mb(self.memory_budget)}). Zmniejsz liczbę wierszy lub kolumn."
+            )
+
+    def _can_start(self, ticket):
+        if len(self._running) >= self.max_concurrent:
+            return False
+        # Pojedynczy raport mieszczący się w budżecie zawsze może wystartować na pustej instancji
+        used = sum(t.estimate for t in self._running)
+        return not self._running or used + ticket.estimate <= self.memory_budget
+
+    def _average_duration(self):
+        return statistics.mean(self._durations) if self._durations else None
+
+    def retry_after(self):
+        average = self._average_duration()
+        if average is None:
+            return DEFAULT_RETRY_AFTER
+        return max(5, int(average * (len(self._waiting) / self.max_concurrent + 1)))
+
+    async def acquire(self, key, estimate):
+        """Czeka na miejsce dla raportu; zwraca bilet do przekazania do release()."""
+        self.check(estimate)
+        ticket = _Ticket(key, estimate)
+        async with self._condition:
+            if self._waiting or not self._can_start(ticket):
+                if len(self._waiting) >= self.queue_max:
+                    raise QueueFull("Serwer jest obecnie przeciążony. Spróbuj ponownie za chwilę.", self.retry_after())
+                self._waiting.append(ticket)
+                try:
+                    # FIFO: startuje tylko pierwszy bilet w kolejce, więc duże raporty nie są zagładzane
+                    await self._condition.wait_for(lambda: self._waiting[0] is ticket and self._can_start(ticket))
+                finally:
+                    self._waiting.remove(ticket)
+                    self._condition.notify_all()
+            ticket.started_at = time.monotonic()
+            self._running.append(ticket)
+        return ticket
+
+    async def release(self, ticket):
+        async with self._condition:
+            self._running.remove(ticket)
+            self._durations.append(time.monotonic() - ticket.started_at)
+            self._condition.notify_all()
+
+    def position(self, key):
+        """Stan raportu o danym kluczu (ID sesji): w kolejce (z pozycją), w trakcie albo None."""
+        for i, ticket in enumerate(self._waiting):
+            if ticket.key == key:
+                average = self._average_duration()
+                return {
+                    "state": "queued",
+                    "position": i + 1,
+                    "queue_length": len(self._waiting),
+                    "estimated_wait_s": round(average * (i / self.max_concurrent + 1)) if average else None,
+                }
+        if any(ticket.key == key for ticket in self._running):
+            return {"state": "running"}
+        return None
+
+    def status(self):
+        return {
+            "running": len(self._running),
+            "queued": len(self._waiting),
+            "max_concurrent": self.max_concurrent,
+            "queue_max": self.queue_max,
+            "memory_reserved": sum(t.estimate for t in self._running),
+            "memory_budget": self.memory_budget,
+        }
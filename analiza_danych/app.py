@@ -1,26 +1,33 @@
 import pandas as pd
 import numpy as np
 import numpy as np
-import pingouin as pg
 import itertools
-import io
 import html
 import json
+import asyncio
 import traceback
 import os
-import stripe
-from fastapi import FastAPI, File, UploadFile, Form, HTTPException, Body
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi import FastAPI, File, UploadFile, Form, HTTPException, Body, Request
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from ydata_profiling import ProfileReport
-from scipy import stats
-import statsmodels.api as sm
-from statsmodels.stats.diagnostic import het_breuschpagan
 from dotenv import load_dotenv
 
 import uuid
 from typing import Optional
 
+import admission
+import chunked_uploads
+import compaction
+import corrections
+import excel
+import imputation
+import nullmap
+import outofcore
+import tracing
+import typeinference
+import uploads
+import workers
+
 # --- Konfiguracja ---
 load_dotenv()
 app = FastAPI()
@@ -28,7 +35,9 @@ app = FastAPI()
 # Zabezpieczenie przed wyciekiem pamięci - prosty magazyn w pamięci
 session_storage = {}
 
-stripe.api_key = os.getenv("STRIPE_API_KEY")
+STRIPE_API_KEY = os.getenv("STRIPE_API_KEY")
+# Opcjonalny adres API Stripe - np. lokalna atrapa Stripe w teście obciążeniowym (loadtest.py)
+STRIPE_API_BASE = os.getenv("STRIPE_API_BASE")
 # Na sztywno ustawiamy poprawny URL frontendu, aby uniknąć problemów z konfiguracją na Render
 FRONTEND_URL = "https://analiza-danych-python.vercel.app"
 
@@ -37,80 +46,260 @@ origins = [
     FRONTEND_URL,
 ]
 
+# Limit rozmiaru przesyłanych plików (413 przed odebraniem całego żądania); dodany przed CORS,
+# aby odpowiedź 413 również miała nagłówki CORS
+app.add_middleware(uploads.UploadSizeLimitMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Retry-After musi być widoczny dla frontendu przy odpowiedziach 503 (ponawianie raportu)
+    expose_headers=["Retry-After"],
 )
 
+# Ciężkie biblioteki (stripe, scipy, numba, ydata_profiling, moduły testów) importujemy leniwie
+# przy pierwszym użyciu, aby zimny start instancji i /api/parse-preview nie czekały na ich ładowanie.
+def get_stripe():
+    import stripe
+    stripe.api_key = STRIPE_API_KEY
+    if STRIPE_API_BASE:
+        stripe.api_base = STRIPE_API_BASE
+    return stripe
+
+# Ograniczenie liczby jednocześnie generowanych raportów (zob. admission.py)
+report_admission = admission.AdmissionController(max(workers.REPORT_WORKERS, 1) * admission.REPORTS_PER_WORKER)
+
+# Pula procesów raportowych startuje razem z serwerem; rozgrzewanie (importy, JIT, raport
+# próbny) odbywa się w tle, a gotowość do obsługi raportów zgłasza /api/health/ready
+@app.on_event("startup")
+def start_report_workers():
+    workers.start()
+
+@app.on_event("shutdown")
+def stop_report_workers():
+    workers.stop()
+
 # --- Endpointy API ---
 
+def build_preview(upload: uploads.StoredUpload) -> dict:
+    """Podgląd pliku i informacja o brakach danych; plik przechodzi pod token (zob. uploads.issue_token)."""
+    sampled_rows = None
+    if upload.format in excel.FORMATS:
+        # Skoroszyt: podgląd, typy i braki z pierwszych wierszy arkusza, czytanych strumieniowo (zob. excel.py)
+        df_full = uploads.read_head(upload, excel.EXCEL_PREVIEW_ROWS)
+        null_bitmap = nullmap.NullBitmap.from_frame(df_full)
+        if len(df_full) >= excel.EXCEL_PREVIEW_ROWS and upload.line_count - 1 > len(df_full):
+            sampled_rows = len(df_full)
+        else:
+            upload.null_bitmap = null_bitmap
+    elif outofcore.use_out_of_core(admission.estimate_report_memory(upload, {}), report_admission.memory_budget):
+        # Plik większy niż pamięć: mapa braków liczona porcjami, podgląd i typy z pierwszej porcji (zob. outofcore.py)
+        df_full, null_bitmap = outofcore.scan_preview(upload)
+    else:
+        df_full = uploads.read_frame(upload)
+        # Jedna mapa braków (bit na komórkę) służy podglądowi, a potem raportowi - bez ponownego skanowania
+        null_bitmap = nullmap.NullBitmap.from_frame(df_full)
+        upload.null_bitmap = null_bitmap
+    columns_with_missing_data = null_bitmap.columns_with_missing()
+    has_missing_data = len(columns_with_missing_data) > 0
+    
+    missing_value_locations = []
+    detection_method_explanation = None
+    missing_summary = None
+
+    if has_missing_data:
+        detection_method_explanation = (
+            "Braki danych wykrywamy poprzez analizę każdej komórki w przesłanym pliku. "
+            "Za brak danych uznajemy puste komórki oraz standardowe znaczniki takie jak 'NA', 'N/A', 'NaN' czy 'null'. "
+            "System automatycznie skanuje cały zbiór w poszukiwaniu tych wartości, aby zapewnić integralność analizy."
+        )
+        # Do 5 pierwszych lokalizacji braków; +1 bo indeksy są od 0, +1 za wiersz nagłówka w pliku CSV
+        for row_idx, col_name in null_bitmap.first_locations(5):
+            missing_value_locations.append(f"Wiersz {row_idx + 2}, kolumna '{col_name}'")
+        # Liczby braków, skutki strategii usuwania i wzorce współwystępowania braków
+        missing_summary = null_bitmap.summary()
+    if sampled_rows is not None:
+        detection_method_explanation = (
+            f"W podglądzie skoroszytu Excel sprawdzono pierwsze {sampled_rows} wierszy arkusza "
+            f"(z około {upload.line_count - 1}). Za brak danych uznajemy puste komórki oraz standardowe znaczniki "
+            "takie jak 'NA', 'N/A', '#N/A' czy 'null'. Cały arkusz zostanie sprawdzony przy generowaniu raportu."
+        )
+
+    df_preview = df_full.head(5)
+    df_preview_filled = df_preview.astype(object).where(pd.notnull(df_preview), None)
+    # Daty i godziny (np. z arkuszy Excel) jako tekst - JSON nie ma dla nich typu
+    df_preview_filled = df_preview_filled.map(lambda v: v if v is None or isinstance(v, (str, int, float, bool)) else str(v))
+    
+    response_content = {
+        # Plik zostaje na serwerze; płatność odwołuje się do niego tokenem zamiast ponownego przesłania
+        "upload_token": uploads.issue_token(upload, df_full.columns),
+        "columns": df_preview_filled.columns.tolist(), 
+        "preview_data": df_preview_filled.values.tolist(),
+        # Arkusze skoroszytu Excel i arkusz, którego dotyczy podgląd (dla CSV i pozostałych formatów None)
+        "sheets": upload.sheets,
+        "sheet": upload.sheet,
+        # Propozycje typów zmiennych (na próbie wierszy, w ograniczonym czasie) do wstępnego wypełnienia formularza
+        "suggested_types": typeinference.infer_types(df_full),
+        "missing_data_info": {
+            "has_missing_data": has_missing_data,
+            "columns_with_missing_data": columns_with_missing_data,
+            "missing_value_locations": missing_value_locations,
+            "detection_method": detection_method_explanation,
+            "summary": missing_summary,
+            # Liczba sprawdzonych wierszy, gdy braki szukano tylko w początku arkusza Excel
+            "sampled_rows": sampled_rows
+        }
+    }
+    return response_content
+
 @app.post("/api/parse-preview")
 async def parse_preview(file: UploadFile = File(...)):
+    upload = None
     try:
-        content = await file.read()
-        
-        try:
-            df_full = pd.read_csv(io.BytesIO(content), encoding='utf-8')
-        except UnicodeDecodeError:
-            df_full = pd.read_csv(io.BytesIO(content), encoding='latin1')
+        upload = await uploads.receive(file)
+        # Podgląd (dla dużych plików pełny skan porcjami) poza pętlą zdarzeń - health i kolejka odpowiadają w trakcie
+        response_content = await asyncio.to_thread(build_preview, upload)
+        upload = None  # plik należy teraz do tokenu z podglądu
+        return JSONResponse(content=response_content)
+    except uploads.UploadTooLarge as e:
+        return JSONResponse(status_code=413, content={"error": str(e)})
+    except uploads.UnsupportedFormat as e:
+        return JSONResponse(status_code=415, content={"error": str(e)})
+    except Exception as e:
+        return JSONResponse(status_code=400, content={"error": f"Błąd przetwarzania pliku CSV: {e}", "trace": traceback.format_exc()})
+    finally:
+        uploads.release(upload)
+
+@app.post("/api/preview-sheet")
+def preview_sheet(upload_token: str = Body(...), sheet: str = Body(...)):
+    """Podgląd innego arkusza skoroszytu spod tokenu; zwraca nowy token (poprzedni zostaje unieważniony)."""
+    redeemed = uploads.redeem_token(upload_token)
+    if redeemed is None:
+        raise HTTPException(status_code=410, detail="Przesłany plik wygasł. Prześlij go ponownie.")
+    upload = redeemed[0]
+    try:
+        upload = upload.with_sheet(sheet)
+        response_content = build_preview(upload)
+    except ValueError as e:
+        uploads.release(upload)
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        uploads.release(upload)
+        return JSONResponse(status_code=400, content={"error": f"Błąd przetwarzania arkusza: {e}", "trace": traceback.format_exc()})
+    uploads.discard_token(upload_token)
+    return JSONResponse(content=response_content)
+
+# --- Wznawialne przesyłanie dużych plików fragmentami (zob. chunked_uploads.py) ---
+
+@app.post("/api/uploads")
+def init_chunked_upload(
+    filename: str = Body(...),
+    size: int = Body(...),
+    chunk_size: Optional[int] = Body(None),
+    sha256: Optional[str] = Body(None)
+):
+    try:
+        return chunked_uploads.create(filename, size, chunk_size, sha256).status()
+    except chunked_uploads.ChunkedUploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
 
-        missing_values_series = df_full.isnull().sum()
-        columns_with_missing_data = missing_values_series[missing_values_series > 0].index.tolist()
-        has_missing_data = len(columns_with_missing_data) > 0
-        
-        missing_value_locations = []
-        detection_method_explanation = None
-
-        if has_missing_data:
-            detection_method_explanation = (
-                "Braki danych wykrywamy poprzez analizę każdej komórki w przesłanym pliku. "
-                "Za brak danych uznajemy puste komórki oraz standardowe znaczniki takie jak 'NA', 'N/A', 'NaN' czy 'null'. "
-                "System automatycznie skanuje cały zbiór w poszukiwaniu tych wartości, aby zapewnić integralność analizy."
-            )
+@app.get("/api/uploads/{upload_id}")
+def chunked_upload_status(upload_id: str):
+    try:
+        return chunked_uploads.get(upload_id).status()
+    except chunked_uploads.ChunkedUploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
 
-            # Znajdź indeksy wszystkich brakujących wartości
-            null_coords = np.where(pd.isnull(df_full))
-            
-            # Przetwórz do 5 pierwszych znalezionych lokalizacji
-            for i in range(min(5, len(null_coords[0]))):
-                row_idx = null_coords[0][i]
-                col_idx = null_coords[1][i]
-                col_name = df_full.columns[col_idx]
-                # Dodajemy 2 do indeksu wiersza: +1 bo indeksy są od 0, +1 za wiersz nagłówka w pliku CSV
-                location_str = f"Wiersz {row_idx + 2}, kolumna '{col_name}'"
-                missing_value_locations.append(location_str)
-
-        df_preview = df_full.head(5)
-        df_preview_filled = df_preview.astype(object).where(pd.notnull(df_preview), None)
-        
-        response_content = {
-            "columns": df_preview_filled.columns.tolist(), 
-            "preview_data": df_preview_filled.values.tolist(),
-            "missing_data_info": {
-                "has_missing_data": has_missing_data,
-                "columns_with_missing_data": columns_with_missing_data,
-                "missing_value_locations": missing_value_locations,
-                "detection_method": detection_method_explanation
-            }
-        }
-        return JSONResponse(content=response_content)
+@app.put("/api/uploads/{upload_id}/chunks/{index}")
+async def put_chunk(upload_id: str, index: int, request: Request):
+    try:
+        session = chunked_uploads.get(upload_id)
+        data = bytearray()
+        async for part in request.stream():
+            data += part
+            if len(data) > session.chunk_size:
+                raise HTTPException(status_code=413, detail=f"Fragment przekracza {session.chunk_size} B.")
+        await asyncio.to_thread(session.write_chunk, index, bytes(data), request.headers.get("X-Chunk-SHA256"))
+        return {"index": index, "received": len(session.received), "total_chunks": session.total_chunks, "columns": session.columns}
+    except chunked_uploads.ChunkedUploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+
+@app.post("/api/uploads/{upload_id}/complete")
+def complete_chunked_upload(upload_id: str):
+    """Kończy przesyłanie i zwraca podgląd z tokenem pliku - tak jak /api/parse-preview."""
+    try:
+        upload = chunked_uploads.complete(upload_id)
+    except chunked_uploads.ChunkedUploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    try:
+        return JSONResponse(content=build_preview(upload))
     except Exception as e:
+        uploads.release(upload)
         return JSONResponse(status_code=400, content={"error": f"Błąd przetwarzania pliku CSV: {e}", "trace": traceback.format_exc()})
 
 @app.post("/api/create-payment-session")
 async def create_payment_session(
-    file: UploadFile = File(...), 
+    file: Optional[UploadFile] = File(None),
+    upload_token: Optional[str] = Form(None),
     variable_types_json: str = Form(...),
-    missing_data_strategy: str = Form(...)
+    missing_data_strategy: str = Form(...),
+    correction_method: str = Form(corrections.DEFAULT_METHOD),
+    sheet: Optional[str] = Form(None)
 ):
+    if correction_method not in corrections.METHODS:
+        raise HTTPException(status_code=400, detail=f"Nieznana metoda korekty na wielokrotne porównania: {correction_method}.")
+    upload = None
+    columns = None
     try:
-        file_content = await file.read()
+        if upload_token:
+            redeemed = uploads.redeem_token(upload_token)
+            if redeemed is None:
+                raise HTTPException(status_code=410, detail="Przesłany plik wygasł. Prześlij go ponownie.")
+            upload, columns = redeemed
+        elif file is not None:
+            try:
+                upload = await uploads.receive(file)
+            except uploads.UploadTooLarge as e:
+                raise HTTPException(status_code=413, detail=str(e))
+            except uploads.UnsupportedFormat as e:
+                raise HTTPException(status_code=415, detail=str(e))
+            # Ponowne przesłanie skoroszytu (wygasły token) - arkusz wybrany w podglądzie
+            if sheet is not None and upload.sheets and sheet != upload.sheet:
+                try:
+                    upload = upload.with_sheet(sheet)
+                except ValueError as e:
+                    raise HTTPException(status_code=400, detail=str(e))
+        else:
+            raise HTTPException(status_code=400, detail="Brak pliku lub tokenu przesłanego pliku.")
         variable_types = json.loads(variable_types_json)
+        if columns is None:
+            # Ponowne przesłanie pliku: kolumny z nagłówka, aby raport (usecols) nie zawiódł dopiero po płatności
+            try:
+                columns = uploads.column_names(upload)
+            except Exception as e:
+                raise HTTPException(status_code=400, detail=f"Nie udało się odczytać nagłówka pliku: {e}")
+        if not set(variable_types) <= set(columns):
+            unknown = ", ".join(sorted(set(variable_types) - set(columns)))
+            raise HTTPException(status_code=400, detail=f"Typy zmiennych odwołują się do kolumn spoza pliku: {unknown}.")
+
+        # Plik, którego raport nie zmieści się w pamięci instancji, jest analizowany porcjami (zob. outofcore.py);
+        # odrzucamy go przed płatnością tylko wtedy, gdy nie zmieści się nawet w tym trybie
+        memory_estimate = admission.estimate_report_memory(upload, variable_types)
+        out_of_core = outofcore.use_out_of_core(memory_estimate, report_admission.memory_budget)
+        if out_of_core:
+            if missing_data_strategy not in outofcore.STRATEGIES:
+                raise HTTPException(status_code=400, detail="Wybrana strategia uzupełniania braków wymaga wczytania całego pliku do pamięci i nie jest dostępna dla tak dużych plików. Wybierz usuwanie wierszy lub kolumn albo uzupełnianie medianą/dominantą.")
+            memory_estimate = outofcore.estimate_memory(upload, variable_types)
+        try:
+            report_admission.check(memory_estimate)
+        except admission.ReportTooLarge as e:
+            raise HTTPException(status_code=413, detail=str(e))
 
         # Utwórz sesję płatności w Stripe
+        stripe = get_stripe()
         session = stripe.checkout.Session.create(
             payment_method_types=['blik', 'p24'],
             line_items=[{
@@ -131,55 +320,96 @@ async def create_payment_session(
         
         # Zapisz dane w pamięci podręcznej, używając ID sesji Stripe jako klucza
         session_storage[session.id] = {
-            "file_content": file_content,
+            "upload": upload,
             "variable_types": variable_types,
-            "missing_data_strategy": missing_data_strategy
+            "missing_data_strategy": missing_data_strategy,
+            "correction_method": correction_method,
+            "out_of_core": out_of_core,
+            "memory_estimate": memory_estimate,
         }
 
         return JSONResponse({'id': session.id, 'url': session.url})
+    except HTTPException:
+        uploads.release(upload)
+        raise
     except Exception as e:
+        uploads.release(upload)
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Błąd Stripe lub przetwarzania danych: {str(e)}")
 
-def handle_missing_data(df: pd.DataFrame, strategy: str):
+def handle_missing_data(df: pd.DataFrame, strategy: str, variable_types: Optional[dict] = None, null_bitmap=None):
+    """Obsługa braków danych; strategie uzupełniania ('impute*') modyfikują przekazaną ramkę w miejscu.
+
+    null_bitmap (nullmap.NullBitmap z podglądu tego samego pliku) pozwala pominąć ponowne szukanie braków.
+    """
+    if null_bitmap is not None and not null_bitmap.matches(df):
+        null_bitmap = None
     if strategy == 'none':
-        if df.isnull().values.any():
+        has_missing = null_bitmap.total > 0 if null_bitmap is not None else df.isnull().values.any()
+        if has_missing:
             raise ValueError("Wybrano opcję 'brak braków danych', ale plik zawiera brakujące wartości. Proszę oczyścić dane lub wybrać inną strategię.")
         info = "Sprawdzono - plik nie zawiera brakujących wartości."
         return df, info
     elif strategy == 'delete_cols':
         cols_before = set(df.columns)
-        df_cleaned = df.dropna(axis=1)
+        df_cleaned = df.drop(columns=null_bitmap.columns_with_missing()) if null_bitmap is not None else df.dropna(axis=1)
         cols_after = set(df_cleaned.columns)
         deleted_cols = ", ".join(list(cols_before - cols_after))
         info = f"Usunięto kolumny z brakującymi wartościami: {deleted_cols}." if deleted_cols else "Nie znaleziono kolumn z brakującymi wartościami do usunięcia."
         return df_cleaned, info
     elif strategy == 'delete_rows':
         rows_before = len(df)
-        df_cleaned = df.dropna(axis=0)
+        df_cleaned = df[~null_bitmap.row_mask()] if null_bitmap is not None else df.dropna(axis=0)
         rows_after = len(df_cleaned)
         deleted_rows_count = rows_before - rows_after
         info = f"Usunięto {deleted_rows_count} wierszy zawierających brakujące wartości." if deleted_rows_count > 0 else "Nie znaleziono wierszy z brakującymi wartościami do usunięcia."
         return df_cleaned, info
     elif strategy == 'impute':
-        imputed_cols = []
-        for col in df.columns:
-            if df[col].isnull().any():
-                if pd.api.types.is_numeric_dtype(df[col]):
-                    median_val = df[col].median()
-                    df.loc[:, col] = df[col].fillna(median_val)
-                    imputed_cols.append(f"{col} (medianą: {median_val:.2f})")
-                else:
-                    mode_val = df[col].mode()[0]
-                    df.loc[:, col] = df[col].fillna(mode_val)
-                    imputed_cols.append(f"{col} (dominantą: {mode_val})")
+        # Liczba braków we wszystkich kolumnach jednym przebiegiem, wartości do uzupełnienia tylko dla
+        # kolumn z brakami, a samo uzupełnienie jednym fillna w miejscu (bez kopii ramki).
+        # Mediany liczymy na widokach kolumn: df[kolumny].median() kopiuje cały blok liczbowy.
+        if null_bitmap is not None:
+            cols_with_missing = null_bitmap.columns_with_missing()
+        else:
+            null_counts = df.isnull().sum()
+            cols_with_missing = null_counts.index[null_counts > 0]
+        numeric_cols = [col for col in cols_with_missing if pd.api.types.is_numeric_dtype(df[col])]
+        fill_values = {
+            col: df[col].median() if col in numeric_cols else imputation.fast_mode(df[col])
+            for col in cols_with_missing
+        }
+        # Bez niejawnej zmiany typu kolumn obiektowych (np. True/False z brakami), jak przy dawnym df.loc
+        with pd.option_context("future.no_silent_downcasting", True):
+            df.fillna(value=fill_values, inplace=True)
+        imputed_cols = [
+            f"{col} (medianą: {fill_values[col]:.2f})" if col in numeric_cols else f"{col} (dominantą: {fill_values[col]})"
+            for col in cols_with_missing
+        ]
         info = f"Uzupełniono brakujące wartości w kolumnach: {', '.join(imputed_cols)}." if imputed_cols else "Nie znaleziono brakujących wartości do uzupełnienia."
         return df, info
+    elif strategy in imputation.STRATEGIES:
+        info = imputation.STRATEGIES[strategy](df, variable_types)
+        return df, info
     else:
         raise ValueError("Nieznana strategia obsługi braków danych.")
 
-def run_academic_tests_and_build_table(df: pd.DataFrame, variable_types: dict, missing_data_info: str) -> str:
+def run_academic_tests_and_build_table(df: pd.DataFrame, variable_types: dict, missing_data_info: str, correction_method: str = corrections.DEFAULT_METHOD, trace=tracing.NULL_TRACE) -> str:
+    all_results, assumptions_sampled, category_notes = run_academic_tests(df, variable_types, trace)
+    with trace.stage("html_assembly", results=len(all_results)):
+        return build_results_html(all_results, missing_data_info, correction_method, assumptions_sampled, category_notes)
+
+def run_academic_tests(df: pd.DataFrame, variable_types: dict, trace=tracing.NULL_TRACE):
+    """Uruchamia wszystkie scenariusze testów; zwraca (lista wyników, czy założenia sprawdzano na próbie)."""
+    from scipy import stats
+    import kernels
+    import moments
+    import regression
+    import sampling
+    import sketches
+
     all_results = []
+    assumptions_sampled = False
+    category_notes = []
     variable_types_lower = {k: v.lower() for k, v in variable_types.items()}
     
     continuous_cols = [col for col, type_ in variable_types_lower.items() if type_ == 'ciągła' and col in df.columns]
@@ -190,108 +420,147 @@ def run_academic_tests_and_build_table(df: pd.DataFrame, variable_types: dict, m
         if col in continuous_cols or col in binary_cols:
              df[col] = pd.to_numeric(df[col], errors='coerce')
 
+    # Statystyki dostateczne (średnie, wariancje, macierz Grama) liczone raz dla całego raportu
+    with trace.stage("sufficient_statistics", columns=len(continuous_cols)):
+        suff_stats = moments.SufficientStatistics(df, continuous_cols, binary_cols)
+
     # --- SCENARIUSZE TESTÓW ---
     # (Logika testów pozostaje taka sama jak poprzednio, ale działa na DataFrame po obsłudze braków danych)
     # --- SCENARIUSZ 1: Ciągła vs. Binarna ---
-    for cont_col, bin_col in itertools.product(continuous_cols, binary_cols):
-        try:
-            cleaned_data = df[[cont_col, bin_col]].dropna()
-            if cleaned_data[bin_col].nunique() != 2:
-                all_results.append({"Zmienne": f"{cont_col} vs. {bin_col}", "Typ Analizy": "Ciągła vs. Binarna", "Użyty Test": "N/A", "p-value": "N/A", "Siła Efektu": "N/A", "Uwagi": f"Kolumna '{bin_col}' nie jest binarna.", "assumptions_met": False, "is_robust": False})
-                continue
-            if len(cleaned_data) < 10: continue
+    with trace.stage("scenario_1_continuous_binary", pairs=len(continuous_cols) * len(binary_cols)):
+        for cont_col, bin_col in itertools.product(continuous_cols, binary_cols):
+            try:
+                cleaned_data = df[[cont_col, bin_col]].dropna()
+                if cleaned_data[bin_col].nunique() != 2:
+                    all_results.append({"Zmienne": f"{cont_col} vs. {bin_col}", "Typ Analizy": "Ciągła vs. Binarna", "Użyty Test": "N/A", "p-value": "N/A", "Siła Efektu": "N/A", "Uwagi": f"Kolumna '{bin_col}' nie jest binarna.", "assumptions_met": False, "is_robust": False})
+                    continue
+                if len(cleaned_data) < 10: continue
+
+                # Podział na grupy według kolejności wystąpienia wartości (jak w unique())
+                group_codes, _ = pd.factorize(cleaned_data[bin_col])
+                values = cleaned_data[cont_col].to_numpy(dtype=float)
+                group1, group2 = values[group_codes == 0], values[group_codes == 1]
+
+                # Normalność w każdej grupie osobno (dla dużych grup na próbie, zob. sampling.py)
+                is_normal = min(sampling.normality_pvalue(group1), sampling.normality_pvalue(group2)) > 0.05
+                assumptions_sampled = assumptions_sampled or sampling.is_large(max(len(group1), len(group2)))
+                _, p_levene = stats.levene(group1, group2)
+                is_homoscedastic = p_levene > 0.05
+                assumptions_met_ttest = is_normal and is_homoscedastic
+
+                if bin_col in suff_stats.binary_index:
+                    n, mean, m2 = suff_stats.group_moments(cont_col, bin_col)
+                else:
+                    n, mean, m2 = kernels.group_moments(values, group_codes, 2)
 
-            normality_result = pg.normality(data=cleaned_data, dv=cont_col, group=bin_col)
-            is_normal = normality_result['pval'].min() > 0.05
-            levene_result = pg.homoscedasticity(data=cleaned_data, dv=cont_col, group=bin_col)
-            is_homoscedastic = levene_result['pval'].iloc[0] > 0.05
-            assumptions_met_ttest = is_normal and is_homoscedastic
-            
-            # Poprawiona logika T-Testu: podział na grupy
-            unique_vals = cleaned_data[bin_col].unique()
-            group1 = cleaned_data[cont_col][cleaned_data[bin_col] == unique_vals[0]]
-            group2 = cleaned_data[cont_col][cleaned_data[bin_col] == unique_vals[1]]
-
-            test_name = "Test T-Studenta" if is_homoscedastic else "Test T (Welch)"
-            ttest_result = pg.ttest(group1, group2, correction=not is_homoscedastic)
-            p_value_ttest = ttest_result['p-val'].iloc[0]
-            cohen_d = ttest_result['cohen-d'].iloc[0]
+                test_name = "Test T-Studenta" if is_homoscedastic else "Test T (Welch)"
+                _, _, p_value_ttest, cohen_d = kernels.ttest_from_moments(n, mean, m2, equal_var=is_homoscedastic)
             
-            uwagi_ttest = []
-            if not is_normal: uwagi_ttest.append("niespełnione założenie o normalności rozkładu")
-            if not is_homoscedastic: uwagi_ttest.append("niespełnione założenie o równości wariancji")
-            if not uwagi_ttest: uwagi_ttest.append("Założenia spełnione.")
-
-            all_results.append({"Zmienne": f"{cont_col} vs. {bin_col}", "Typ Analizy": "Ciągła vs. Binarna", "Użyty Test": test_name, "p-value": p_value_ttest, "Siła Efektu": f"d Cohena = {cohen_d:.3f}", "Uwagi": "; ".join(uwagi_ttest), "assumptions_met": assumptions_met_ttest, "is_robust": False})
-
-            if not is_normal:
-                group1 = cleaned_data[cont_col][cleaned_data[bin_col] == cleaned_data[bin_col].unique()[0]]
-                group2 = cleaned_data[cont_col][cleaned_data[bin_col] == cleaned_data[bin_col].unique()[1]]
-                mwu_result = pg.mwu(group1, group2)
-                p_value_mwu = mwu_result['p-val'].iloc[0]
-                effect_size_mwu = mwu_result['RBC'].iloc[0]
-                all_results.append({"Zmienne": f"{cont_col} vs. {bin_col}", "Typ Analizy": "Ciągła vs. Binarna", "Użyty Test": "Test U Manna-Whitneya (odporny)", "p-value": p_value_mwu, "Siła Efektu": f"RBC = {effect_size_mwu:.3f}", "Uwagi": "Użyty z powodu braku normalności rozkładu.", "assumptions_met": True, "is_robust": True})
-        except Exception as e:
-            all_results.append({"Zmienne": f"{cont_col} vs. {bin_col}", "Typ Analizy": "Ciągła vs. Binarna", "Użyty Test": "N/A", "p-value": float('inf'), "Siła Efektu": "N/A", "Uwagi": f"Błąd: {html.escape(str(e))}", "assumptions_met": False, "is_robust": False})
+                uwagi_ttest = []
+                if not is_normal: uwagi_ttest.append("niespełnione założenie o normalności rozkładu")
+                if not is_homoscedastic: uwagi_ttest.append("niespełnione założenie o równości wariancji")
+                if not uwagi_ttest: uwagi_ttest.append("Założenia spełnione.")
+
+                all_results.append({"Zmienne": f"{cont_col} vs. {bin_col}", "Typ Analizy": "Ciągła vs. Binarna", "Użyty Test": test_name, "p-value": p_value_ttest, "Siła Efektu": f"d Cohena = {cohen_d:.3f}", "Uwagi": "; ".join(uwagi_ttest), "assumptions_met": assumptions_met_ttest, "is_robust": False})
+
+                if not is_normal:
+                    _, p_value_mwu, effect_size_mwu = kernels.mwu_test(group1, group2)
+                    all_results.append({"Zmienne": f"{cont_col} vs. {bin_col}", "Typ Analizy": "Ciągła vs. Binarna", "Użyty Test": "Test U Manna-Whitneya (odporny)", "p-value": p_value_mwu, "Siła Efektu": f"RBC = {effect_size_mwu:.3f}", "Uwagi": "Użyty z powodu braku normalności rozkładu.", "assumptions_met": True, "is_robust": True})
+            except Exception as e:
+                all_results.append({"Zmienne": f"{cont_col} vs. {bin_col}", "Typ Analizy": "Ciągła vs. Binarna", "Użyty Test": "N/A", "p-value": float('inf'), "Siła Efektu": "N/A", "Uwagi": f"Błąd: {html.escape(str(e))}", "assumptions_met": False, "is_robust": False})
 
     # --- SCENARIUSZ 2: Ciągła vs. Ciągła ---
-    for col1, col2 in itertools.combinations(continuous_cols, 2):
-        try:
-            cleaned_data = df[[col1, col2]].dropna()
-            if len(cleaned_data) < 10: continue
-
-            X = sm.add_constant(cleaned_data[col1])
-            model = sm.OLS(cleaned_data[col2], X).fit()
-            p_value_reg = model.pvalues.iloc[1]
-            r_squared = model.rsquared
-
-            _, p_shapiro = stats.shapiro(model.resid)
-            is_resid_normal = p_shapiro > 0.05
-            _, p_bp, _, _ = het_breuschpagan(model.resid, model.model.exog)
-            is_homoscedastic = p_bp > 0.05
+    with trace.stage("scenario_2_continuous_continuous", pairs=len(continuous_cols) * (len(continuous_cols) - 1) // 2):
+        # Korelacje Spearmana dla wszystkich par liczone jednym przebiegiem jądra
+        spearman_r, spearman_n = kernels.pairwise_spearman(suff_stats.values) if continuous_cols else (None, None)
+
+        for col1, col2 in itertools.combinations(continuous_cols, 2):
+            try:
+                pair_moments = suff_stats.pair(col1, col2)
+                if pair_moments[0] < 10: continue
+
+                # Regresja prosta ze statystyk dostatecznych (zob. moments.py i regression.py)
+                model = regression.fit_from_moments(*pair_moments)
+                p_value_reg = model["p_value"]
+                r_squared = model["r_squared"]
+
+                # Diagnostyka reszt; dla dużych prób na powtarzalnej próbie warstwowej według decyli predyktora
+                i, j = suff_stats.index[col1], suff_stats.index[col2]
+                rows = suff_stats.complete_rows(col1, col2)
+                sample_rows = rows
+                if sampling.is_large(len(rows)):
+                    assumptions_sampled = True
+                    sample_rows = rows[sampling.stratified_indices(sampling.quantile_strata(suff_stats.values[rows, i]), sampling.ASSUMPTION_MAX_N)]
+                normality_rows = rows if sampling.ASSUMPTION_LARGE_N_POLICY == "moments" else sample_rows
+
+                resid_normality = regression.residuals(model, suff_stats.values[normality_rows, i], suff_stats.values[normality_rows, j])
+                p_shapiro = sampling.normality_pvalue(resid_normality)
+                is_resid_normal = p_shapiro > 0.05
+                x_sample = suff_stats.values[sample_rows, i]
+                resid_sample = regression.residuals(model, x_sample, suff_stats.values[sample_rows, j])
+                _, p_bp = regression.breusch_pagan(resid_sample, x_sample)
+                is_homoscedastic = p_bp > 0.05
             
-            uwagi_reg = []
-            if not is_resid_normal: uwagi_reg.append(f"niespełnione założenie o normalności reszt (p={p_shapiro:.3f})")
-            if not is_homoscedastic: uwagi_reg.append(f"niespełnione założenie o homoskedastyczności (p={p_bp:.3f})")
-            if not uwagi_reg: uwagi_reg.append("Założenia (normalność reszt, homoskedastyczność) spełnione.")
+                uwagi_reg = []
+                if not is_resid_normal: uwagi_reg.append(f"niespełnione założenie o normalności reszt (p={p_shapiro:.3f})")
+                if not is_homoscedastic: uwagi_reg.append(f"niespełnione założenie o homoskedastyczności (p={p_bp:.3f})")
+                if not uwagi_reg: uwagi_reg.append("Założenia (normalność reszt, homoskedastyczność) spełnione.")
             
-            all_results.append({"Zmienne": f"{col1} vs. {col2}", "Typ Analizy": "Ciągła vs. Ciągła", "Użyty Test": "Regresja Liniowa", "p-value": p_value_reg, "Siła Efektu": f"R-kwadrat = {r_squared:.3f}", "Uwagi": "; ".join(uwagi_reg), "assumptions_met": is_resid_normal and is_homoscedastic, "is_robust": False})
+                all_results.append({"Zmienne": f"{col1} vs. {col2}", "Typ Analizy": "Ciągła vs. Ciągła", "Użyty Test": "Regresja Liniowa", "p-value": p_value_reg, "Siła Efektu": f"R-kwadrat = {r_squared:.3f}", "Uwagi": "; ".join(uwagi_reg), "assumptions_met": is_resid_normal and is_homoscedastic, "is_robust": False})
 
-            spearman_corr = pg.corr(cleaned_data[col1], cleaned_data[col2], method='spearman')
-            p_value_spearman = spearman_corr['p-val'].iloc[0]
-            rho = spearman_corr['r'].iloc[0]
-            all_results.append({"Zmienne": f"{col1} vs. {col2}", "Typ Analizy": "Ciągła vs. Ciągła", "Użyty Test": "Korelacja Spearmana (odporna)", "p-value": p_value_spearman, "Siła Efektu": f"rho = {rho:.3f}", "Uwagi": "Test nieparametryczny, odporny na brak normalności i nieliniowe zależności monotoniczne.", "assumptions_met": True, "is_robust": True})
+                rho = spearman_r[i, j]
+                p_value_spearman = kernels.correlation_pvalue(rho, spearman_n[i, j])
+                all_results.append({"Zmienne": f"{col1} vs. {col2}", "Typ Analizy": "Ciągła vs. Ciągła", "Użyty Test": "Korelacja Spearmana (odporna)", "p-value": p_value_spearman, "Siła Efektu": f"rho = {rho:.3f}", "Uwagi": "Test nieparametryczny, odporny na brak normalności i nieliniowe zależności monotoniczne.", "assumptions_met": True, "is_robust": True})
 
-        except Exception as e:
-            all_results.append({"Zmienne": f"{col1} vs. {col2}", "Typ Analizy": "Ciągła vs. Ciągła", "Użyty Test": "N/A", "p-value": float('inf'), "Siła Efektu": "N/A", "Uwagi": f"Błąd: {html.escape(str(e))}", "assumptions_met": False, "is_robust": False})
+            except Exception as e:
+                all_results.append({"Zmienne": f"{col1} vs. {col2}", "Typ Analizy": "Ciągła vs. Ciągła", "Użyty Test": "N/A", "p-value": float('inf'), "Siła Efektu": "N/A", "Uwagi": f"Błąd: {html.escape(str(e))}", "assumptions_met": False, "is_robust": False})
 
     # --- SCENARIUSZ 3: Kategoryczna vs. Kategoryczna ---
-    for col1, col2 in itertools.combinations(categorical_cols, 2):
-        if col1 == col2: continue
-        try:
-            cleaned_data = df[[col1, col2]].dropna()
-            if cleaned_data.empty or cleaned_data.nunique().min() < 2: continue
-
-            chi2_result = pg.chi2_independence(data=cleaned_data, x=col1, y=col2)
-            # Na podstawie logów debugowania, kolejność w krotce jest inna niż w dokumentacji.
-            # stats_df jest trzecim elementem, a expected pierwszym.
-            expected = chi2_result[0]
-            stats_df = chi2_result[2]
-            
-            p_value_chi2 = stats_df.loc[stats_df['test'] == 'pearson', 'pval'].iloc[0]
-            cramer_v = stats_df.loc[stats_df['test'] == 'pearson', 'cramer'].iloc[0]
-            assumption_met_chi2 = expected.min().min() >= 5
-            uwagi_chi2 = "Założenie o liczebnościach oczekiwanych (>=5) spełnione." if assumption_met_chi2 else "Niespełnione założenie o liczebnościach oczekiwanych (>=5)."
+    with trace.stage("scenario_3_categorical_categorical", pairs=len(categorical_cols) * (len(categorical_cols) - 1) // 2):
+        # Zanim powstanie jakakolwiek tabela kontyngencji: szkice (liczba poziomów, najczęstsze poziomy)
+        # decydują, czy kolumnę zostawić, zwinąć rzadkie poziomy, czy pominąć (np. identyfikator)
+        category_codes = {}
+        for col in categorical_cols:
+            action, levels, reason = sketches.plan_categorical(sketches.sketch_column(df[col]))
+            if action == "skip":
+                category_notes.append(f"{col}: {reason}.")
+                continue
+            values = df[col]
+            if action == "collapse":
+                # Poziom zbiorczy nie należy do kategorii kolumny typu 'category'
+                values = values.astype(object) if isinstance(values.dtype, pd.CategoricalDtype) else values
+                values = values.where(values.isin(levels) | values.isna(), sketches.OTHER_LEVEL)
+                category_notes.append(f"{col}: {reason}.")
+            # Kody kategorii liczone raz na kolumnę (braki danych = -1)
+            category_codes[col] = pd.factorize(values)
+
+        for col1, col2 in itertools.combinations(list(category_codes), 2):
+            if col1 == col2: continue
+            try:
+                codes1, levels1 = category_codes[col1]
+                codes2, levels2 = category_codes[col2]
+                observed = kernels.contingency_table(codes1, codes2, len(levels1), len(levels2))
+                # Usuń poziomy, które nie występują w parach kompletnych
+                observed = observed[observed.sum(axis=1) > 0][:, observed.sum(axis=0) > 0]
+                if observed.size == 0 or min(observed.shape) < 2: continue
+
+                _, _, p_value_chi2, cramer_v, expected = kernels.chi2_from_table(observed)
+                assumption_met_chi2 = expected.min() >= 5
+                uwagi_chi2 = "Założenie o liczebnościach oczekiwanych (>=5) spełnione." if assumption_met_chi2 else "Niespełnione założenie o liczebnościach oczekiwanych (>=5)."
             
-            all_results.append({"Zmienne": f"{col1} vs. {col2}", "Typ Analizy": "Kategoryczna vs. Kategoryczna", "Użyty Test": "Test Chi-kwadrat", "p-value": p_value_chi2, "Siła Efektu": f"V Craméra = {cramer_v:.3f}", "Uwagi": uwagi_chi2, "assumptions_met": assumption_met_chi2, "is_robust": False})
+                all_results.append({"Zmienne": f"{col1} vs. {col2}", "Typ Analizy": "Kategoryczna vs. Kategoryczna", "Użyty Test": "Test Chi-kwadrat", "p-value": p_value_chi2, "Siła Efektu": f"V Craméra = {cramer_v:.3f}", "Uwagi": uwagi_chi2, "assumptions_met": assumption_met_chi2, "is_robust": False})
 
-            if not assumption_met_chi2:
-                crosstab = pd.crosstab(cleaned_data[col1], cleaned_data[col2])
-                if crosstab.shape == (2, 2):
-                    _, p_fisher = stats.fisher_exact(crosstab)
-                    all_results.append({"Zmienne": f"{col1} vs. {col2}", "Typ Analizy": "Kategoryczna vs. Kategoryczna", "Użyty Test": "Dokładny test Fishera (odporny)", "p-value": p_fisher, "Siła Efektu": "N/A", "Uwagi": "Użyty z powodu małych liczebności oczekiwanych w tabeli 2x2.", "assumptions_met": True, "is_robust": True})
-        except Exception as e:
-            all_results.append({"Zmienne": f"{col1} vs. {col2}", "Typ Analizy": "Kategoryczna vs. Kategoryczna", "Użyty Test": "N/A", "p-value": float('inf'), "Siła Efektu": "N/A", "Uwagi": f"Błąd: {html.escape(str(e))}", "assumptions_met": False, "is_robust": False})
+                if not assumption_met_chi2:
+                    if observed.shape == (2, 2):
+                        _, p_fisher = stats.fisher_exact(observed)
+                        all_results.append({"Zmienne": f"{col1} vs. {col2}", "Typ Analizy": "Kategoryczna vs. Kategoryczna", "Użyty Test": "Dokładny test Fishera (odporny)", "p-value": p_fisher, "Siła Efektu": "N/A", "Uwagi": "Użyty z powodu małych liczebności oczekiwanych w tabeli 2x2.", "assumptions_met": True, "is_robust": True})
+            except Exception as e:
+                all_results.append({"Zmienne": f"{col1} vs. {col2}", "Typ Analizy": "Kategoryczna vs. Kategoryczna", "Użyty Test": "N/A", "p-value": float('inf'), "Siła Efektu": "N/A", "Uwagi": f"Błąd: {html.escape(str(e))}", "assumptions_met": False, "is_robust": False})
+
+    return all_results, assumptions_sampled, category_notes
+
+def build_results_html(all_results: list, missing_data_info: str, correction_method: str = corrections.DEFAULT_METHOD, assumptions_sampled: bool = False, category_notes: list = (), out_of_core_note: Optional[str] = None) -> str:
+    import sampling
 
     # --- Budowanie tabel HTML ---
     if not all_results:
@@ -299,25 +568,43 @@ def run_academic_tests_and_build_table(df: pd.DataFrame, variable_types: dict, m
 
     all_results.sort(key=lambda x: (x["Zmienne"], x["is_robust"]))
     
-    num_tests = len(all_results)
-    bonferroni_threshold = 0.05 / num_tests if num_tests > 0 else 0.05
+    # Skorygowane p-value dla wszystkich metod naraz; raport podświetla wybraną metodę
+    adjusted = corrections.adjust_all([res["p-value"] for res in all_results])
+    for idx, res in enumerate(all_results):
+        res["p-value skorygowane"] = {method: float(values[idx]) for method, values in adjusted.items()}
+
+    # Testy zakończone błędem nie wliczają się do liczby porównań (zob. corrections.py)
+    num_tests = max(corrections.count_tests([res["p-value"] for res in all_results]), 1)
+    correction_name = corrections.METHODS[correction_method]
+    if correction_method == "bonferroni":
+        threshold_text = f"p < {0.05 / num_tests:.4f}"
+    else:
+        threshold_text = "skorygowane p < 0.05"
 
     header1 = "<h2>Część 2: Pełne Wyniki Testów Statystycznych</h2>"
-    desc1 = f"<p>Poniższa tabela przedstawia pełne wyniki analizy zależności między zmiennymi. W przypadku niespełnienia założeń testu parametrycznego, w osobnym wierszu przedstawiono wynik jego nieparametrycznego (odpornego) odpowiednika. Wynik został podświetlony na czerwono, gdy test wykazał istotną statystycznie zależność (p < {bonferroni_threshold:.4f}) po zastosowaniu korekty Bonferroniego i w warunkach, które pozwalają uznać go za wiarygodny.</p>"
+    desc1 = f"<p>Poniższa tabela przedstawia pełne wyniki analizy zależności między zmiennymi. W przypadku niespełnienia założeń testu parametrycznego, w osobnym wierszu przedstawiono wynik jego nieparametrycznego (odpornego) odpowiednika. Wynik został podświetlony na czerwono, gdy test wykazał istotną statystycznie zależność ({threshold_text}) po zastosowaniu korekty {correction_name} i w warunkach, które pozwalają uznać go za wiarygodny.</p>"
     
     info_box_style = "margin: 15px 0; padding: 10px; background-color: #f8f9fa; border: 1px solid #dee2e6; border-radius: 5px;"
     
     missing_data_html = f"<div style='{info_box_style}'><strong>Obsługa braków danych:</strong> {html.escape(missing_data_info)}</div>"
-
-    html_table = header1 + missing_data_html + desc1 + "<table border='1' style='width:100%; border-collapse: collapse; text-align: left; font-size: 14px;'><thead><tr style='background-color: #f0f0f0;'><th>Zmienne</th><th>Typ Analizy</th><th>Użyty Test</th><th>p-value</th><th>Siła Efektu</th><th>Uwagi</th></tr></thead><tbody>"
+    if out_of_core_note:
+        missing_data_html += f"<div style='{info_box_style}'><strong>Analiza dużego pliku:</strong> {html.escape(out_of_core_note)}</div>"
+    if assumptions_sampled:
+        missing_data_html += f"<div style='{info_box_style}'><strong>Diagnostyka założeń dla dużych prób:</strong> {html.escape(sampling.policy_note())}</div>"
+    if category_notes:
+        notes = "<br>".join(html.escape(note) for note in category_notes)
+        missing_data_html += f"<div style='{info_box_style}'><strong>Zmienne kategoryczne o wielu poziomach:</strong><br>{notes}</div>"
+
+    html_table = header1 + missing_data_html + desc1 + "<table border='1' style='width:100%; border-collapse: collapse; text-align: left; font-size: 14px;'><thead><tr style='background-color: #f0f0f0;'><th>Zmienne</th><th>Typ Analizy</th><th>Użyty Test</th><th>p-value</th><th>p-value (skorygowane)</th><th>Siła Efektu</th><th>Uwagi</th></tr></thead><tbody>"
     
     significant_results = []
     last_zmienne = None
     for i, res in enumerate(all_results):
         is_significant_and_valid = False
         p_val = res.get("p-value", float('inf'))
+        p_adj = res["p-value skorygowane"][correction_method]
         
-        if (res.get("assumptions_met", False) and p_val < bonferroni_threshold):
+        if (res.get("assumptions_met", False) and p_adj < 0.05):
             is_significant_and_valid = True
             significant_results.append(res)
         
@@ -329,17 +616,23 @@ def run_academic_tests_and_build_table(df: pd.DataFrame, variable_types: dict, m
         last_zmienne = current_zmienne
 
         p_val_str = f"{p_val:.4f}" if isinstance(p_val, float) and p_val != float('inf') else str(p_val)
-        html_table += f"<tr style='{style}'><td>{res.get('Zmienne', 'N/A')}</td><td>{res.get('Typ Analizy', 'N/A')}</td><td>{res.get('Użyty Test', 'N/A')}</td><td>{p_val_str}</td><td>{res.get('Siła Efektu', 'N/A')}</td><td>{res.get('Uwagi', 'N/A')}</td></tr>"
+        p_adj_str = f"{p_adj:.4f}" if isinstance(p_val, float) and p_val != float('inf') else "N/A"
+        html_table += f"<tr style='{style}'><td>{res.get('Zmienne', 'N/A')}</td><td>{res.get('Typ Analizy', 'N/A')}</td><td>{res.get('Użyty Test', 'N/A')}</td><td>{p_val_str}</td><td>{p_adj_str}</td><td>{res.get('Siła Efektu', 'N/A')}</td><td>{res.get('Uwagi', 'N/A')}</td></tr>"
     html_table += "</tbody></table>"
 
     if significant_results:
-        header2 = "<h2>Podsumowanie: Istotne Wyniki po Korekcie Bonferroniego</h2>"
-        desc2 = f"<p>Poniższa tabela zawiera wyłącznie te zależności, które okazały się istotne statystycznie po zastosowaniu rygorystycznej korekty na wielokrotne porównania (p < {bonferroni_threshold:.4f}). Korekta Bonferroniego minimalizuje ryzyko fałszywych odkryć, dając większą pewność co do wiarygodności wyników. Wyniki te z największym prawdopodobieństwem wskazują na rzeczywistą, wartą dalszej analizy zależność między zmiennymi.</p>"
-        html_table += "<br>" + header2 + desc2 + "<table border='1' style='width:100%; border-collapse: collapse; text-align: left; font-size: 14px;'><thead><tr style='background-color: #e6ffec;'><th>Zmienne</th><th>Typ Analizy</th><th>Użyty Test</th><th>p-value</th><th>Siła Efektu</th><th>Uwagi</th></tr></thead><tbody>"
+        header2 = f"<h2>Podsumowanie: Istotne Wyniki po Korekcie {correction_name}</h2>"
+        if correction_method == "fdr_bh":
+            correction_desc = "Korekta Benjaminiego-Hochberga kontroluje oczekiwany odsetek fałszywych odkryć (FDR) wśród wyników uznanych za istotne, dzięki czemu przy dużej liczbie testów wykrywa więcej rzeczywistych zależności niż korekta Bonferroniego."
+        else:
+            correction_desc = f"Korekta {correction_name} minimalizuje ryzyko fałszywych odkryć, dając większą pewność co do wiarygodności wyników."
+        desc2 = f"<p>Poniższa tabela zawiera wyłącznie te zależności, które okazały się istotne statystycznie po zastosowaniu korekty na wielokrotne porównania ({threshold_text}). {correction_desc} Wyniki te z największym prawdopodobieństwem wskazują na rzeczywistą, wartą dalszej analizy zależność między zmiennymi.</p>"
+        html_table += "<br>" + header2 + desc2 + "<table border='1' style='width:100%; border-collapse: collapse; text-align: left; font-size: 14px;'><thead><tr style='background-color: #e6ffec;'><th>Zmienne</th><th>Typ Analizy</th><th>Użyty Test</th><th>p-value</th><th>p-value (skorygowane)</th><th>Siła Efektu</th><th>Uwagi</th></tr></thead><tbody>"
         significant_results.sort(key=lambda x: x["p-value"])
         for res in significant_results:
             p_val_str = f"{res.get('p-value', 'N/A'):.4f}"
-            html_table += f"<tr><td>{res.get('Zmienne', 'N/A')}</td><td>{res.get('Typ Analizy', 'N/A')}</td><td>{res.get('Użyty Test', 'N/A')}</td><td>{p_val_str}</td><td>{res.get('Siła Efektu', 'N/A')}</td><td>{res.get('Uwagi', 'N/A')}</td></tr>"
+            p_adj_str = f"{res['p-value skorygowane'][correction_method]:.4f}"
+            html_table += f"<tr><td>{res.get('Zmienne', 'N/A')}</td><td>{res.get('Typ Analizy', 'N/A')}</td><td>{res.get('Użyty Test', 'N/A')}</td><td>{p_val_str}</td><td>{p_adj_str}</td><td>{res.get('Siła Efektu', 'N/A')}</td><td>{res.get('Uwagi', 'N/A')}</td></tr>"
         html_table += "</tbody></table>"
 
     # Sekcja z interpretacją i formularzem
@@ -370,17 +663,75 @@ def run_academic_tests_and_build_table(df: pd.DataFrame, variable_types: dict, m
     html_table += interpretation_section
     return html_table
 
+def analyzed_columns(variable_types: dict):
+    """Kolumny analizowane w raporcie (typ inny niż 'pomiń'); None, gdy nie ma żadnej - wtedy raport obejmuje cały plik."""
+    columns = [col for col, type_ in variable_types.items() if str(type_).lower() != "pomiń"]
+    return columns or None
+
+def profile_scope(variable_types: dict):
+    """Opis zakresu części opisowej dla ProfileReport: kolumny oznaczone 'pomiń' nie są wczytywane."""
+    skipped = [col for col, type_ in variable_types.items() if str(type_).lower() == "pomiń"]
+    if not skipped or analyzed_columns(variable_types) is None:
+        return None
+    return {"description": (
+        f"Raport obejmuje tylko analizowane kolumny. Kolumny oznaczone jako 'pomiń' ({len(skipped)}: "
+        f"{', '.join(map(str, skipped))}) nie zostały wczytane, więc nie ma ich także w tej części."
+    )}
+
+def build_report(upload: uploads.StoredUpload, variable_types: dict, missing_data_strategy: str, correction_method: str = corrections.DEFAULT_METHOD, out_of_core: bool = False, trace=tracing.NULL_TRACE):
+    """Pełny potok raportu; zwraca (kod HTTP, HTML). Uruchamiany w procesie roboczym (zob. workers.py)."""
+    if out_of_core:
+        return outofcore.build_report(upload, variable_types, missing_data_strategy, correction_method, trace)
+    # Tylko analizowane kolumny (usecols, projekcja kolumn Arrow) - jak w trybie porcjowym: kolumny 'pomiń' nie trafiają
+    # do testów ani części opisowej (raport to zaznacza), a w szerokich plikach stanowią większość czasu parsowania
+    # i pamięci ramki
+    columns = analyzed_columns(variable_types)
+    with trace.stage("read_csv", bytes=upload.size) as stage:
+        try:
+            df_original = uploads.read_frame(upload, columns)
+        except Exception as e:
+            return 400, f"<h1>Błąd</h1><p>Plik CSV jest uszkodzony lub nieprawidłowy. Błąd: {e}</p>"
+        stage.update(rows=len(df_original), columns=len(df_original.columns))
+    # Mapa braków z podglądu obejmuje wszystkie kolumny pliku
+    null_bitmap = upload.null_bitmap.select(df_original.columns) if upload.null_bitmap is not None else None
+
+    # Mniejsze typy kolumn (zob. compaction.py) - obsługa braków, profil i testy działają na mniejszej ramce
+    with trace.stage("compact_dtypes") as stage:
+        columns_changed, bytes_before, bytes_after = compaction.compact_frame(df_original)
+        stage.update(columns=columns_changed, bytes_before=bytes_before, bytes_after=bytes_after)
+
+    with trace.stage("handle_missing_data", strategy=missing_data_strategy):
+        try:
+            # Ramka z read_csv nie jest dalej używana, więc przekazujemy ją bez kopii
+            df, missing_data_info = handle_missing_data(df_original, missing_data_strategy, variable_types, null_bitmap)
+        except ValueError as e:
+            return 400, f"<h1>Błąd Walidacji Danych</h1><p>{e}</p>"
+
+    with trace.stage("profile_report"):
+        from ydata_profiling import ProfileReport
+        profile = ProfileReport(df, title="Część 1: Automatyczny Raport Opisowy (Rozszerzony)", dataset=profile_scope(variable_types))
+    with trace.stage("profile_to_html"):
+        report1_html = profile.to_html()
+    
+    # Testy działają na ramce po zakończeniu ProfileReport (HTML jest już gotowy), więc kopia nie jest potrzebna
+    report2_html = run_academic_tests_and_build_table(df, variable_types, missing_data_info, correction_method, trace)
+    
+    final_html = report1_html + "<br><hr style='border: 2px solid #007bff;'>" + report2_html
+    return 200, final_html
+
 @app.post("/api/generate-report", response_class=HTMLResponse)
 async def generate_report(session_id: Optional[str] = Body(None, embed=True)):
     if not session_id:
         raise HTTPException(status_code=400, detail="Brak ID sesji.")
     
-    if not stripe.api_key:
+    if not STRIPE_API_KEY:
         raise HTTPException(status_code=500, detail="Klucz API Stripe nie jest skonfigurowany.")
 
+    trace = tracing.Trace(report_id=session_id)
     try:
         # Weryfikacja płatności
-        checkout_session = stripe.checkout.Session.retrieve(session_id)
+        with trace.stage("stripe_retrieve"):
+            checkout_session = get_stripe().checkout.Session.retrieve(session_id)
         if checkout_session.payment_status != "paid":
             raise HTTPException(status_code=402, detail="Płatność nie została zakończona.")
     except Exception as e:
@@ -391,36 +742,65 @@ async def generate_report(session_id: Optional[str] = Body(None, embed=True)):
     if not session_data:
         raise HTTPException(status_code=404, detail="Nie znaleziono danych sesji. Być może sesja wygasła. Spróbuj ponownie.")
 
+    # Kolejka raportów: czekamy na wolny proces i pamięć; przy pełnej kolejce odrzucamy od razu.
+    # Przy błędach z Retry-After dane sesji zostają, aby ponowienie mogło się udać.
+    estimate = session_data["memory_estimate"]
     try:
-        file_content = session_data["file_content"]
-        variable_types = session_data["variable_types"]
-        missing_data_strategy = session_data["missing_data_strategy"]
-        
-        try:
-            df_original = pd.read_csv(io.BytesIO(file_content), encoding='utf-8')
-        except UnicodeDecodeError:
-            df_original = pd.read_csv(io.BytesIO(file_content), encoding='latin1')
-        except Exception as e:
-            return HTMLResponse(content=f"<h1>Błąd</h1><p>Plik CSV jest uszkodzony lub nieprawidłowy. Błąd: {e}</p>", status_code=400)
-
-        try:
-            df, missing_data_info = handle_missing_data(df_original.copy(), missing_data_strategy)
-        except ValueError as e:
-            return HTMLResponse(content=f"<h1>Błąd Walidacji Danych</h1><p>{e}</p>", status_code=400)
-
-        profile = ProfileReport(df, title="Część 1: Automatyczny Raport Opisowy (Rozszerzony)")
-        report1_html = profile.to_html()
-        
-        report2_html = run_academic_tests_and_build_table(df.copy(), variable_types, missing_data_info) 
-        
-        final_html = report1_html + "<br><hr style='border: 2px solid #007bff;'>" + report2_html
-        return HTMLResponse(content=final_html)
+        with trace.stage("admission_wait", estimated_bytes=estimate):
+            ticket = await report_admission.acquire(session_id, estimate)
+    except admission.QueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except admission.ReportTooLarge as e:
+        uploads.release(session_storage.pop(session_id, {}).get("upload"))
+        raise HTTPException(status_code=413, detail=str(e))
+
+    retryable = False
+    try:
+        with trace.stage("report_worker"):
+            status_code, content, worker_records = await workers.run_report(
+                session_data["upload"],
+                session_data["variable_types"],
+                session_data["missing_data_strategy"],
+                session_data.get("correction_method", corrections.DEFAULT_METHOD),
+                session_data["out_of_core"],
+            )
+        trace.extend(worker_records)
+        tracing.finish(trace)
+        return HTMLResponse(content=content, status_code=status_code)
+    except workers.WorkerCrashed as e:
+        retryable = True
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "30"})
 
     finally:
+        await report_admission.release(ticket)
         # Upewnij się, że dane sesji są usuwane po użyciu, aby zwolnić pamięć
-        if session_id in session_storage:
-            del session_storage[session_id]
+        if not retryable and session_id in session_storage:
+            uploads.release(session_storage.pop(session_id)["upload"])
+
+# Pozycja raportu w kolejce - frontend odpytuje ją w trakcie oczekiwania na raport
+@app.get("/api/report-queue/{session_id}")
+def report_queue_position(session_id: str):
+    position = report_admission.position(session_id)
+    if position is None:
+        return JSONResponse(status_code=404, content={"state": "unknown"})
+    return position
 
 @app.get("/api/test")
 def smoke_test():
-    return {"status": "ok", "message": "Backend na Render działa!"}
\ No newline at end of file
+    return {"status": "ok", "message": "Backend na Render działa!"}
+
+# Liveness: proces odpowiada. Readiness: procesy raportowe są rozgrzane i mogą przyjąć płatny ruch.
+@app.get("/api/health/live")
+def health_live():
+    return {"status": "ok"}
+
+@app.get("/api/health/ready")
+def health_ready():
+    status = workers.status()
+    status["admission"] = report_admission.status()
+    return JSONResponse(status_code=200 if status["ready"] else 503, content=status)
+
+# Histogramy czasu, CPU i pamięci etapów raportu w formacie tekstowym Prometheusa
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    return PlainTextResponse(tracing.render_prometheus(), media_type="text/plain; version=0.0.4")
\ No newline at end of file
@@ -0,0 +1,234 @@
+"""
+Benchmark backendu na danych syntetycznych z generate_sample_csv.
+
+Dla każdego punktu siatki (liczba wierszy x liczba kolumn x proporcje typów
+x odsetek braków danych) generuje plik CSV (generate_benchmark_csv z katalogu
+głównego repozytorium; pliki są buforowane w --data-dir), a następnie w tym
+samym procesie uruchamia parse_preview, handle_missing_data oraz
+run_academic_tests_and_build_table (po jednorazowej rozgrzewce importów i jąder
+numba, która nie jest mierzona). Czas ścienny, czas CPU i szczytowe RSS
+każdego kroku (wraz z etapami wewnętrznymi z tracing.py) trafiają do pliku JSON,
+który można porównać z wynikiem bazowym (--compare), aby wykryć regresje przed
+wdrożeniem.
+
+Użycie (z katalogu analiza_danych):
+    python benchmark.py --preset quick --output bench.json
+    python benchmark.py --rows 1000 100000 --columns 8 32 --mix balanced --missing 0 0.05
+    python benchmark.py --preset quick --compare bench_main.json --threshold 0.25
+
+Kończy się kodem 1, jeśli którykolwiek przypadek zakończył się błędem albo
+(przy --compare) czas któregoś kroku wzrósł o więcej niż --threshold.
+"""
+import argparse
+import asyncio
+import datetime
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.join(APP_DIR, "..")
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+
+# Proporcje kolumn (ciągłe, binarne, kategoryczne)
+MIXES = {
+    "balanced": (0.5, 0.25, 0.25),
+    "continuous": (0.8, 0.1, 0.1),
+    "categorical": (0.2, 0.2, 0.6),
+}
+
+PRESETS = {
+    "quick": {"rows": [1_000, 10_000], "columns": [8], "mix": ["balanced"], "missing": [0.0, 0.05]},
+    "standard": {"rows": [1_000, 10_000, 100_000], "columns": [8, 32], "mix": list(MIXES), "missing": [0.0, 0.05]},
+    "full": {"rows": [1_000, 10_000, 100_000, 1_000_000, 10_000_000], "columns": [8, 32], "mix": list(MIXES), "missing": [0.0, 0.05]},
+}
+
+STEPS = ["parse_preview", "handle_missing_data", "run_academic_tests_and_build_table"]
+
+
+def case_id(rows, columns, mix, missing):
+    return f"rows={rows}/columns={columns}/mix={mix}/missing={missing:g}"
+
+
+def dataset_path(data_dir, rows, columns, mix, missing, seed):
+    return os.path.join(data_dir, f"bench_r{rows}_c{columns}_{mix}_m{missing:g}_s{seed}.csv")
+
+
+def prepare_dataset(data_dir, rows, columns, mix, missing, seed):
+    """Ścieżka do pliku CSV i typy zmiennych; plik generowany jest tylko raz."""
+    from generate_sample_csv import generate_benchmark_csv
+
+    path = dataset_path(data_dir, rows, columns, mix, missing, seed)
+    types_path = path + ".types.json"
+    if os.path.exists(path) and os.path.exists(types_path):
+        with open(types_path, encoding="utf-8") as f:
+            return path, json.load(f)
+    os.makedirs(data_dir, exist_ok=True)
+    variable_types = generate_benchmark_csv(path + ".tmp", rows, columns, MIXES[mix], missing, seed)
+    os.replace(path + ".tmp", path)
+    with open(types_path, "w", encoding="utf-8") as f:
+        json.dump(variable_types, f, ensure_ascii=False)
+    return path, variable_types
+
+
+def run_case(content, variable_types, strategy):
+    """Jedno przejście potoku; zwraca rekordy etapów (tracing.Trace) lub zgłasza wyjątek."""
+    import pandas as pd
+    from fastapi import UploadFile
+
+    import app
+    import tracing
+    import uploads
+
+    trace = tracing.Trace()
+    with trace.stage("parse_preview", bytes=len(content)):
+        response = asyncio.run(app.parse_preview(UploadFile(file=io.BytesIO(content), filename="bench.csv")))
+        if response.status_code != 200:
+            raise RuntimeError(f"parse_preview zwrócił HTTP {response.status_code}: {response.body[:200]!r}")
+        uploads.discard_token(json.loads(response.body)["upload_token"])
+
+    df = pd.read_csv(io.BytesIO(content), encoding="utf-8")
+    with trace.stage("handle_missing_data", strategy=strategy):
+        df, missing_data_info = app.handle_missing_data(df, strategy)
+    with trace.stage("run_academic_tests_and_build_table"):
+        app.run_academic_tests_and_build_table(df, variable_types, missing_data_info, trace=trace)
+    return trace.records
+
+
+def warm_up():
+    """Jednorazowe przejście na małym pliku (importy, kompilacja JIT) przed pomiarami."""
+    import kernels
+    import workers
+
+    kernels.warm_up()
+    run_case(workers._synthetic_csv(), workers.SAMPLE_VARIABLE_TYPES, "impute")
+
+
+def summarize(runs):
+    """Mediana i minimum czasu każdego etapu z kolejnych powtórzeń."""
+    stages = {}
+    for records in runs:
+        for record in records:
+            entry = stages.setdefault(record["stage"], {"wall_s": [], "cpu_s": [], "peak_rss_bytes": []})
+            for key in entry:
+                entry[key].append(record[key])
+    return {
+        stage: {
+            "wall_s_median": statistics.median(values["wall_s"]),
+            "wall_s_min": min(values["wall_s"]),
+            "cpu_s_median": statistics.median(values["cpu_s"]),
+            "peak_rss_bytes_max": max(values["peak_rss_bytes"]),
+        }
+        for stage, values in stages.items()
+    }
+
+
+def environment():
+    import numpy
+    import pandas
+
+    import kernels
+
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=APP_DIR, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": numpy.__version__,
+        "pandas": pandas.__version__,
+        "numba": kernels.NUMBA_AVAILABLE,
+    }
+
+
+def compare(results, baseline, threshold, min_seconds):
+    """Lista regresji: kroki, których mediana czasu wzrosła o więcej niż threshold."""
+    regressions = []
+    baseline_cases = {case["id"]: case for case in baseline["cases"]}
+    for case in results["cases"]:
+        base = baseline_cases.get(case["id"])
+        if base is None or "stages" not in case or "stages" not in base:
+            continue
+        for step in STEPS:
+            if step not in case["stages"] or step not in base["stages"]:
+                continue
+            new, old = case["stages"][step]["wall_s_median"], base["stages"][step]["wall_s_median"]
+            # Bardzo krótkie kroki pomijamy - ich czas jest zdominowany przez szum pomiaru
+            if old > 0 and max(new, old) >= min_seconds and new > old * (1 + threshold):
+                regressions.append(f"{case['id']} {step}: {old:.3f} s -> {new:.3f} s (+{(new / old - 1) * 100:.0f}%)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark backendu na danych syntetycznych.")
+    parser.add_argument("--preset", choices=PRESETS, default="quick")
+    parser.add_argument("--rows", type=int, nargs="+")
+    parser.add_argument("--columns", type=int, nargs="+")
+    parser.add_argument("--mix", choices=MIXES, nargs="+")
+    parser.add_argument("--missing", type=float, nargs="+")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--data-dir", default=os.path.join(APP_DIR, ".benchmark_data"))
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--compare", help="plik JSON z wynikami bazowymi")
+    parser.add_argument("--threshold", type=float, default=0.25, help="dopuszczalny względny wzrost czasu (0.25 = 25%%)")
+    parser.add_argument("--min-seconds", type=float, default=0.05)
+    args = parser.parse_args()
+
+    grid = dict(PRESETS[args.preset])
+    for key in ("rows", "columns", "mix", "missing"):
+        if getattr(args, key):
+            grid[key] = getattr(args, key)
+
+    warm_up()
+    results = {"environment": environment(), "grid": grid, "repeat": args.repeat, "seed": args.seed, "cases": []}
+    failed = False
+    for rows in grid["rows"]:
+        for columns in grid["columns"]:
+            for mix in grid["mix"]:
+                for missing in grid["missing"]:
+                    cid = case_id(rows, columns, mix, missing)
+                    path, variable_types = prepare_dataset(args.data_dir, rows, columns, mix, missing, args.seed)
+                    with open(path, "rb") as f:
+                        content = f.read()
+                    strategy = "impute" if missing > 0 else "none"
+                    case = {"id": cid, "rows": rows, "columns": columns, "mix": mix, "missing": missing,
+                            "strategy": strategy, "bytes": len(content)}
+                    try:
+                        runs = [run_case(content, variable_types, strategy) for _ in range(args.repeat)]
+                        case["stages"] = summarize(runs)
+                        total = sum(case["stages"][step]["wall_s_median"] for step in STEPS)
+                        print(f"{cid}: {total:.3f} s")
+                    except Exception as e:
+                        case["error"] = f"{type(e).__name__}: {e}"
+                        failed = True
+                        print(f"{cid}: BŁĄD {case['error']}")
+                    results["cases"].append(case)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"Zapisano wyniki do {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold, args.min_seconds)
+        for regression in regressions:
+            print(f"REGRESJA: {regression}")
+        failed = failed or bool(regressions)
+        if not regressions:
+            print("Brak regresji względem wyników bazowych.")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
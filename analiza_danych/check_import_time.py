@@ -0,0 +1,89 @@
+"""
+Kontrola budżetu czasu zimnego startu backendu.
+
+Uruchamia w osobnym procesie `python -X importtime -c "import app"` i sprawdza,
+czy łączny czas importu modułu app mieści się w budżecie, a następnie wysyła
+przykładowy plik do /api/parse-preview i sprawdza, że ani import aplikacji,
+ani podgląd nie załadowały ciężkich bibliotek analitycznych.
+
+Użycie (z katalogu analiza_danych):
+    python check_import_time.py [--budget-ms 2000] [--csv ../small_sample_data.csv]
+
+Kończy się kodem 1, jeśli którykolwiek warunek nie jest spełniony. Te same warunki
+sprawdza automatycznie tests/test_import_time.py (python -m pytest).
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CSV = os.path.join(APP_DIR, "..", "small_sample_data.csv")
+
+# Biblioteki, które mogą być ładowane dopiero w ścieżce generowania raportu
+HEAVY_MODULES = ["ydata_profiling", "pingouin", "statsmodels", "scipy", "numba", "stripe", "matplotlib"]
+
+PREVIEW_PROBE = """
+import sys
+from fastapi.testclient import TestClient
+import app
+loaded_on_import = [m for m in {heavy!r} if m in sys.modules]
+with open({csv!r}, "rb") as f:
+    response = TestClient(app.app).post("/api/parse-preview", files={{"file": ("sample.csv", f, "text/csv")}})
+loaded_on_preview = [m for m in {heavy!r} if m in sys.modules]
+print(response.status_code)
+print(",".join(loaded_on_import))
+print(",".join(loaded_on_preview))
+"""
+
+
+def measure_import_ms():
+    """Łączny (cumulative) czas importu modułu app w milisekundach."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app"],
+        cwd=APP_DIR, capture_output=True, text=True, check=True,
+    )
+    for line in result.stderr.splitlines():
+        parts = [part.strip() for part in line.split("|")]
+        if len(parts) == 3 and parts[2] == "app":
+            return int(parts[1]) / 1000
+    raise RuntimeError("Nie znaleziono modułu app w wyniku -X importtime.")
+
+
+def probe_preview(csv_path):
+    code = PREVIEW_PROBE.format(heavy=HEAVY_MODULES, csv=os.path.abspath(csv_path))
+    result = subprocess.run([sys.executable, "-c", code], cwd=APP_DIR, capture_output=True, text=True, check=True)
+    status, on_import, on_preview = (result.stdout.splitlines() + ["", ""])[:3]
+    return int(status), [m for m in on_import.split(",") if m], [m for m in on_preview.split(",") if m]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Kontrola czasu importu backendu.")
+    parser.add_argument("--budget-ms", type=float, default=float(os.getenv("IMPORT_TIME_BUDGET_MS", "2000")))
+    parser.add_argument("--csv", default=DEFAULT_CSV)
+    args = parser.parse_args()
+
+    failures = []
+    import_ms = measure_import_ms()
+    print(f"Czas importu app: {import_ms:.0f} ms (budżet {args.budget_ms:.0f} ms)")
+    if import_ms > args.budget_ms:
+        failures.append(f"przekroczony budżet czasu importu ({import_ms:.0f} ms > {args.budget_ms:.0f} ms)")
+
+    status, on_import, on_preview = probe_preview(args.csv)
+    print(f"/api/parse-preview: HTTP {status}")
+    if status != 200:
+        failures.append(f"/api/parse-preview zwrócił HTTP {status}")
+    if on_import:
+        failures.append(f"import app ładuje ciężkie biblioteki: {', '.join(on_import)}")
+    if on_preview:
+        failures.append(f"/api/parse-preview ładuje ciężkie biblioteki: {', '.join(on_preview)}")
+
+    for failure in failures:
+        print(f"BŁĄD: {failure}")
+    if not failures:
+        print("OK")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
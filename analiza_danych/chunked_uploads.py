@@ -0,0 +1,200 @@
+"""
+Wznawialne przesyłanie dużych plików fragmentami (init / fragmenty / complete).
+
+Klient zakłada sesję przesyłania (rozmiar pliku, opcjonalnie skrót SHA-256
+całości), a następnie wysyła fragmenty o stałym rozmiarze w dowolnej
+kolejności, każdy z nagłówkiem X-Chunk-SHA256. Fragment z błędną sumą
+kontrolną jest odrzucany, a ponowne wysłanie już przyjętego fragmentu nic nie
+zmienia, więc po zerwaniu połączenia klient pyta o stan sesji i dosyła tylko
+brakujące fragmenty.
+
+Fragmenty są zapisywane na swoje miejsce w pliku .part w UPLOAD_DIR. Serwer
+już w trakcie przesyłania przetwarza ciągły początek pliku: liczy skrót
+całości, liczbę wierszy i odczytuje nagłówek (kolumny są dostępne po pierwszym
+fragmencie). Po complete plik trafia do magazynu z uploads.py tak samo jak
+plik przesłany jednym żądaniem.
+
+Konfiguracja: CHUNKED_UPLOAD_CHUNK_MB (domyślny rozmiar fragmentu, 5 MB),
+CHUNKED_UPLOAD_TTL_S (czas życia nieukończonej sesji od ostatniej aktywności,
+domyślnie 24 h).
+"""
+import csv
+import hashlib
+import io
+import os
+import secrets
+import threading
+import time
+
+import uploads
+
+DEFAULT_CHUNK_SIZE = int(float(os.getenv("CHUNKED_UPLOAD_CHUNK_MB", "5")) * 1024 * 1024)
+MIN_CHUNK_SIZE = 256 * 1024
+MAX_CHUNK_SIZE = 16 * 1024 * 1024
+CHUNKED_UPLOAD_TTL = int(os.getenv("CHUNKED_UPLOAD_TTL_S", str(24 * 3600)))
+
+
+class ChunkedUploadError(ValueError):
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class ChunkedUpload:
+    def __init__(self, filename, size, chunk_size, sha256=None):
+        self.id = secrets.token_urlsafe(16)
+        self.filename = filename
+        self.size = size
+        self.chunk_size = chunk_size
+        self.total_chunks = max(1, -(-size // chunk_size))
+        self.expected_sha256 = sha256.lower() if sha256 else None
+        self.received = set()
+        self.part_path = os.path.join(uploads.UPLOAD_DIR, f"chunked_{self.id}.part")
+        self.lock = threading.Lock()
+        self.updated_at = time.monotonic()
+        # Przetwarzanie ciągłego początku pliku w trakcie przesyłania
+        self._digest = hashlib.sha256()
+        self._processed = 0  # liczba fragmentów od początku pliku wliczonych do skrótu
+        self.line_count = 0
+        self.header = None
+        self.columns = None
+
+        os.makedirs(uploads.UPLOAD_DIR, exist_ok=True)
+        with open(self.part_path, "wb") as f:
+            f.truncate(size)
+
+    def chunk_length(self, index):
+        return min(self.chunk_size, self.size - index * self.chunk_size)
+
+    def write_chunk(self, index, data, checksum):
+        if not 0 <= index < self.total_chunks:
+            raise ChunkedUploadError(f"Nieprawidłowy numer fragmentu: {index}.")
+        if len(data) != self.chunk_length(index):
+            raise ChunkedUploadError(f"Fragment {index} ma {len(data)} B, oczekiwano {self.chunk_length(index)} B.")
+        if not checksum or hashlib.sha256(data).hexdigest() != checksum.lower():
+            raise ChunkedUploadError(f"Suma kontrolna fragmentu {index} się nie zgadza. Wyślij go ponownie.", 422)
+        with self.lock:
+            self.updated_at = time.monotonic()
+            if index in self.received:
+                return
+            with open(self.part_path, "r+b") as f:
+                f.seek(index * self.chunk_size)
+                f.write(data)
+            self.received.add(index)
+            self._advance(data if index == self._processed else None)
+
+    def _advance(self, first_data):
+        """Dolicza do skrótu, liczby wierszy i nagłówka kolejne fragmenty, które tworzą ciągły początek pliku."""
+        with open(self.part_path, "rb") as f:
+            while self._processed in self.received:
+                if first_data is not None:
+                    data, first_data = first_data, None
+                else:
+                    f.seek(self._processed * self.chunk_size)
+                    data = f.read(self.chunk_length(self._processed))
+                self._digest.update(data)
+                self.line_count += data.count(b"\n")
+                if self._processed == 0:
+                    self._sniff_header(data)
+                self._processed += 1
+
+    def _sniff_header(self, data):
+        self.header = data.split(b"\n", 1)[0][:uploads.UPLOAD_CHUNK_SIZE]
+        if uploads.detect_format(data) != "csv":
+            # Kolumny plików binarnych i skompresowanych są znane dopiero po complete (uploads.StoredUpload.inspect)
+            return
+        try:
+            text = self.header.decode("utf-8")
+        except UnicodeDecodeError:
+            text = self.header.decode("latin1")
+        self.columns = next(csv.reader(io.StringIO(text.rstrip("\r"))), [])
+
+    def missing(self):
+        return sorted(set(range(self.total_chunks)) - self.received)
+
+    def status(self):
+        return {
+            "upload_id": self.id,
+            "size": self.size,
+            "chunk_size": self.chunk_size,
+            "total_chunks": self.total_chunks,
+            "received_chunks": sorted(self.received),
+            "complete": not self.missing(),
+            "columns": self.columns,
+        }
+
+    def finish(self):
+        """Sprawdza kompletność i skrót, przenosi plik do magazynu uploads; zwraca StoredUpload."""
+        with self.lock:
+            missing = self.missing()
+            if missing:
+                raise ChunkedUploadError(f"Brakuje {len(missing)} fragmentów (np. {missing[:10]}).", 409)
+            sha256 = self._digest.hexdigest()
+            if self.expected_sha256 and sha256 != self.expected_sha256:
+                raise ChunkedUploadError("Skrót przesłanego pliku nie zgadza się z deklarowanym. Prześlij plik ponownie.", 422)
+            return uploads.store_file(self.part_path, self.size, sha256, self.line_count, self.header or b"")
+
+    def discard(self):
+        try:
+            os.remove(self.part_path)
+        except FileNotFoundError:
+            pass
+
+
+_lock = threading.Lock()
+_sessions = {}
+
+
+def _expire(now):
+    with _lock:
+        expired = [s for s in _sessions.values() if now - s.updated_at > CHUNKED_UPLOAD_TTL]
+        for session in expired:
+            del _sessions[session.id]
+    for session in expired:
+        session.discard()
+
+
+def create(filename, size, chunk_size=None, sha256=None):
+    _expire(time.monotonic())
+    if size <= 0:
+        raise ChunkedUploadError("Plik jest pusty.")
+    if size > uploads.MAX_UPLOAD_BYTES:
+        raise ChunkedUploadError(str(uploads.UploadTooLarge()), 413)
+    chunk_size = min(max(int(chunk_size or DEFAULT_CHUNK_SIZE), MIN_CHUNK_SIZE), MAX_CHUNK_SIZE)
+    session = ChunkedUpload(filename, size, chunk_size, sha256)
+    with _lock:
+        _sessions[session.id] = session
+    return session
+
+
+def get(upload_id):
+    _expire(time.monotonic())
+    with _lock:
+        session = _sessions.get(upload_id)
+    if session is None:
+        raise ChunkedUploadError("Nie znaleziono sesji przesyłania (mogła wygasnąć). Rozpocznij przesyłanie od nowa.", 404)
+    return session
+
+
+def complete(upload_id):
+    """Kończy sesję; zwraca StoredUpload. Przy błędzie skrótu lub formatu sesja jest usuwana, przy brakach zostaje."""
+    session = get(upload_id)
+    try:
+        upload = session.finish()
+    except ChunkedUploadError as e:
+        if e.status_code == 422:
+            remove(upload_id)
+        raise
+    except uploads.UnsupportedFormat as e:
+        remove(upload_id)
+        raise ChunkedUploadError(str(e), 415)
+    with _lock:
+        _sessions.pop(upload_id, None)
+    return upload
+
+
+def remove(upload_id):
+    with _lock:
+        session = _sessions.pop(upload_id, None)
+    if session is not None:
+        session.discard()
@@ -0,0 +1,71 @@
+"""
+Zmniejszenie ramki danych zaraz po wczytaniu, zanim trafi do obsługi braków,
+ProfileReport i testów.
+
+read_csv tworzy kolumny int64/float64, a tekst przechowuje jako obiekty Pythona
+(ok. 50-60 bajtów na komórkę, np. Miasto, Płeć). Kolumna po kolumnie:
+- tekst o powtarzających się wartościach (różnych wartości najwyżej
+  COMPACT_CATEGORY_MAX_RATIO wszystkich) staje się typem 'category' - kod
+  1-4 bajty na wiersz i słownik poziomów,
+- wartości logiczne zapisane jako obiekty (np. Czy_Aktywny ze skoroszytu) dostają
+  typ bool, a z brakami - 'category' o poziomach False/True (typ 'boolean' pandas
+  zmieniłby uzupełnianie braków: mediana zamiast dominanty).
+Kolumny liczbowe zostają int64/float64: float32 zmieniłby wyniki statystyk
+i uzupełnień, a do kolumn int8/int16 ProfileReport przy dyskretyzacji wpisuje
+numery przedziałów int64 (niezgodny typ - FutureWarning, w przyszłym pandas błąd).
+Wartości i kolejność wierszy się nie zmieniają, więc wyniki testów są takie same
+jak na ramce z read_csv.
+
+Konfiguracja: COMPACT_CATEGORY_MAX_RATIO (domyślnie 0.5; 0 wyłącza zamianę tekstu
+na 'category').
+"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+COMPACT_CATEGORY_MAX_RATIO = float(os.getenv("COMPACT_CATEGORY_MAX_RATIO", "0.5"))
+
+
+def _object_bytes(categorical: pd.Series):
+    """Rozmiar kolumny obiektowej (jak memory_usage(deep=True)) z liczności jej poziomów, bez przeglądania wierszy."""
+    codes = categorical.cat.codes.to_numpy()
+    counts = np.bincount(codes + 1, minlength=len(categorical.cat.categories) + 1)
+    sizes = np.array([sys.getsizeof(np.nan)] + [sys.getsizeof(value) for value in categorical.cat.categories], dtype=np.int64)
+    return codes.size * 8 + int(counts @ sizes)
+
+
+def _compact_column(series: pd.Series, max_ratio):
+    """(kolumna w mniejszym typie, rozmiar przed zmianą) albo None, gdy zmiana się nie opłaca lub nie jest bezpieczna."""
+    # Tylko kolumny obiektowe; typy rozszerzeń (np. kategorie i typy Arrow z Parquet) są już zwarte
+    if not len(series) or series.dtype != object:
+        return None
+    kind = pd.api.types.infer_dtype(series, skipna=True)
+    if kind != "boolean" and (kind != "string" or max_ratio <= 0):
+        return None
+    categorical = series.astype("category")
+    if kind == "string" and len(categorical.cat.categories) > max_ratio * categorical.count():
+        return None
+    before = _object_bytes(categorical)
+    if kind == "boolean" and not (categorical.cat.codes < 0).any():
+        return categorical.astype(bool), before
+    return categorical, before
+
+
+def compact_frame(df: pd.DataFrame, max_ratio=COMPACT_CATEGORY_MAX_RATIO):
+    """Zmniejsza typy kolumn w miejscu (kolumna po kolumnie, bez kopii całej ramki).
+
+    Zwraca (liczba zmienionych kolumn, ich rozmiar w bajtach przed zmianą, po zmianie).
+    """
+    changed, before, after = 0, 0, 0
+    for i in range(len(df.columns)):
+        compacted = _compact_column(df.iloc[:, i], max_ratio)
+        if compacted is None:
+            continue
+        series, size = compacted
+        df.isetitem(i, series)
+        changed += 1
+        before += size
+        after += int(series.memory_usage(index=False, deep=True))
+    return changed, before, after
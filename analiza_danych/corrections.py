@@ -0,0 +1,67 @@
+"""
+Korekty na wielokrotne porównania.
+
+Skorygowane p-value dla całego wektora wyników liczone są jednym,
+zwektoryzowanym przebiegiem po posortowanych p-value (NumPy), bez pętli
+po poszczególnych testach. Wartości nieliczbowe i nieskończone (np. "N/A"
+lub inf przy błędzie testu) oznaczają test, który nie został przeprowadzony:
+nie wliczają się do liczby testów m, a ich skorygowane p-value to NaN (jak
+p.adjust w R); wyniki dla pozostałych są zgodne
+z statsmodels.stats.multitest.multipletests.
+"""
+import numpy as np
+
+# Nazwy metod w formie używanej w treści raportu ("po korekcie ...")
+METHODS = {
+    "bonferroni": "Bonferroniego",
+    "holm": "Holma-Bonferroniego",
+    "fdr_bh": "Benjaminiego-Hochberga (FDR)",
+}
+DEFAULT_METHOD = "bonferroni"
+
+
+def _as_pvalues(p_values):
+    p = np.array([v if isinstance(v, (int, float, np.floating)) else np.nan for v in p_values], dtype=np.float64)
+    p[~np.isfinite(p)] = np.nan
+    return np.clip(p, 0.0, 1.0)
+
+
+def _adjust(p, method):
+    m = p.size
+    if method == "bonferroni":
+        return np.minimum(p * m, 1.0)
+
+    order = np.argsort(p, kind="mergesort")
+    p_sorted = p[order]
+    ranks = np.arange(1, m + 1)
+    if method == "holm":
+        adjusted_sorted = np.maximum.accumulate(np.minimum((m - ranks + 1) * p_sorted, 1.0))
+    else:
+        adjusted_sorted = np.minimum.accumulate((m / ranks * p_sorted)[::-1])[::-1]
+        adjusted_sorted = np.minimum(adjusted_sorted, 1.0)
+
+    adjusted = np.empty(m)
+    adjusted[order] = adjusted_sorted
+    return adjusted
+
+
+def adjust_pvalues(p_values, method=DEFAULT_METHOD):
+    """Skorygowane p-value dla metody 'bonferroni', 'holm' lub 'fdr_bh' (Benjamini-Hochberg); NaN dla testów bez wyniku."""
+    if method not in METHODS:
+        raise ValueError(f"Nieznana metoda korekty: {method}.")
+    p = _as_pvalues(p_values)
+    adjusted = np.full(p.size, np.nan)
+    tested = ~np.isnan(p)
+    if tested.any():
+        adjusted[tested] = _adjust(p[tested], method)
+    return adjusted
+
+
+def count_tests(p_values):
+    """Liczba przeprowadzonych testów m (z liczbowym, skończonym p-value)."""
+    return int(np.count_nonzero(~np.isnan(_as_pvalues(p_values))))
+
+
+def adjust_all(p_values):
+    """Słownik: metoda -> skorygowane p-value, dla wszystkich obsługiwanych metod."""
+    return {method: adjust_pvalues(p_values, method) for method in METHODS}
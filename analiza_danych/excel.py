@@ -0,0 +1,420 @@
+"""
+Wczytywanie skoroszytów Excel (.xlsx, .xls).
+
+Podgląd czyta tylko pierwsze wiersze wybranego arkusza (EXCEL_PREVIEW_ROWS,
+domyślnie 1000) w trybie tylko do odczytu openpyxl, który parsuje XML arkusza
+strumieniowo - czas podglądu nie zależy od wielkości skoroszytu. Podpowiedzi
+typów i podsumowanie braków w podglądzie dotyczą wtedy tylko tych wierszy.
+
+Pełne wczytanie .xlsx omija obiekty komórek openpyxl (pd.read_excel potrzebuje
+kilkunastu sekund na 100 tys. wierszy): części pakietu (lista arkuszy,
+współdzielone teksty, style z formatami dat, epoka dat) są czytane z archiwum
+zip, a XML arkusza parsuje strumieniowo xml.etree.ElementTree.iterparse -
+niezależnie od układu XML (wcięcia, przedrostki przestrzeni nazw, kolejność
+atrybutów), więc także skoroszyty z innych programów niż Excel. Wartości komórek
+są zamieniane tak jak w openpyxl (liczby, teksty, wartości logiczne, daty
+według formatu komórki, zapamiętane wyniki formuł), z jego publicznych funkcji
+formatów i dat. Przeczytane wiersze są usuwane z drzewa XML, więc arkusz można
+czytać także porcjami wierszy (outofcore.py). Pliki .xls (format binarny,
+najwyżej 65 536 wierszy) czyta xlrd.
+
+Jak w read_csv: kolumny wyznacza pierwszy niepusty wiersz (nagłówek; komórki
+poza jego zakresem są pomijane), puste wiersze są pomijane, teksty 'NA', 'N/A', '#N/A', 'null' itp. oznaczają brak
+danych, a kolumna z samymi liczbami zapisanymi jako tekst staje się liczbowa.
+
+Konfiguracja: EXCEL_PREVIEW_ROWS.
+"""
+import contextlib
+import io
+import itertools
+import os
+import posixpath
+import zipfile
+from xml.etree import ElementTree
+
+import numpy as np
+import pandas as pd
+
+EXCEL_PREVIEW_ROWS = int(os.getenv("EXCEL_PREVIEW_ROWS", "1000"))
+FORMATS = ("xlsx", "xls")
+
+# Znaczniki braków danych jak domyślne na_values pd.read_csv / pd.read_excel (pandas 2.x), aby CSV i Excel
+# rozpoznawały braki tak samo; lista lokalna, bo pandas udostępnia ją tylko w module prywatnym
+NA_VALUES = frozenset({
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN",
+    "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null",
+})
+
+
+class InvalidWorkbook(ValueError):
+    pass
+
+
+def _column_index(letters):
+    index = 0
+    for letter in letters:
+        index = index * 26 + ord(letter) - 64
+    return index - 1
+
+
+def _local(tag):
+    """Nazwa elementu lub atrybutu XML bez przestrzeni nazw (zwykła i 'Strict' OOXML mają różne)."""
+    return tag.rpartition("}")[2]
+
+
+def _text(element):
+    """Tekst elementu <si> lub <is>: <t> i fragmenty tekstu sformatowanego <r><t>, bez transkrypcji <rPh> (jak openpyxl)."""
+    parts = []
+    for child in element:
+        tag = _local(child.tag)
+        if tag == "t":
+            parts.append(child.text or "")
+        elif tag == "r":
+            parts.extend(t.text or "" for t in child if _local(t.tag) == "t")
+    return "".join(parts)
+
+
+def _relationships(archive, part):
+    """Relacje części pakietu z jej pliku _rels: {identyfikator: (typ, ścieżka docelowej części)}."""
+    folder, name = posixpath.split(part)
+    path = posixpath.join(folder, "_rels", name + ".rels")
+    if path not in archive.NameToInfo:
+        return {}
+    relationships = {}
+    for rel in ElementTree.fromstring(archive.read(path)):
+        if rel.get("TargetMode") == "External":
+            continue
+        target = rel.get("Target", "")
+        target = target.lstrip("/") if target.startswith("/") else posixpath.normpath(posixpath.join(folder, target))
+        relationships[rel.get("Id")] = (rel.get("Type", "").rpartition("/")[2], target)
+    return relationships
+
+
+def _xlsx_book(archive):
+    """(arkusze {nazwa: ścieżka XML} w kolejności skoroszytu, ścieżka współdzielonych tekstów, ścieżka stylów, epoka dat)."""
+    from openpyxl.utils.datetime import CALENDAR_MAC_1904, CALENDAR_WINDOWS_1900
+
+    workbook = next((path for type_, path in _relationships(archive, "").values() if type_ == "officeDocument"),
+                    "xl/workbook.xml")
+    relationships = _relationships(archive, workbook)
+    parts = {type_: path for type_, path in relationships.values()}
+    sheets = {}
+    epoch = CALENDAR_WINDOWS_1900
+    for element in ElementTree.fromstring(archive.read(workbook)).iter():
+        tag = _local(element.tag)
+        if tag == "workbookPr" and element.get("date1904") in ("1", "true"):
+            epoch = CALENDAR_MAC_1904
+        elif tag == "sheet":
+            rel_id = next((value for key, value in element.attrib.items() if _local(key) == "id"), None)
+            type_, path = relationships.get(rel_id, (None, None))
+            # Arkusze wykresów nie zawierają danych
+            if type_ == "worksheet":
+                sheets[element.get("name")] = path
+    return sheets, parts.get("sharedStrings"), parts.get("styles"), epoch
+
+
+def _shared_strings(archive, path):
+    strings = []
+    if path is None:
+        return strings
+    with archive.open(path) as stream:
+        for _, element in ElementTree.iterparse(stream):
+            if _local(element.tag) == "si":
+                # Jak openpyxl: usunięcie przedrostka ucieczki 'x005F_'
+                strings.append(_text(element).replace("x005F_", ""))
+                element.clear()
+    return strings
+
+
+def _date_styles(archive, path):
+    """Numery stylów komórek (cellXfs) z formatem daty i z formatem czasu trwania - jak w openpyxl."""
+    from openpyxl.styles.numbers import builtin_format_code, is_date_format, is_timedelta_format
+
+    dates, timedeltas = set(), set()
+    if path is None:
+        return dates, timedeltas
+    root = ElementTree.fromstring(archive.read(path))
+    custom = {element.get("numFmtId"): element.get("formatCode")
+              for element in root.iter() if _local(element.tag) == "numFmt"}
+    cell_xfs = next((element for element in root if _local(element.tag) == "cellXfs"), ())
+    for style, xf in enumerate(element for element in cell_xfs if _local(element.tag) == "xf"):
+        fmt_id = xf.get("numFmtId", "0")
+        fmt = custom[fmt_id] if fmt_id in custom else builtin_format_code(int(fmt_id))
+        if is_date_format(fmt):
+            dates.add(style)
+        if is_timedelta_format(fmt):
+            timedeltas.add(style)
+    return dates, timedeltas
+
+
+@contextlib.contextmanager
+def _open_xlsx(source, sheet=None):
+    """(archiwum, części skoroszytu z _xlsx_book, nazwa wybranego arkusza); bez nazwy - pierwszy arkusz."""
+    try:
+        archive = zipfile.ZipFile(source)
+    except zipfile.BadZipFile:
+        raise InvalidWorkbook("Plik nie jest poprawnym skoroszytem Excel (.xlsx).")
+    with archive:
+        try:
+            book = _xlsx_book(archive)
+        except (KeyError, ElementTree.ParseError):
+            raise InvalidWorkbook("Plik nie jest poprawnym skoroszytem Excel (.xlsx).")
+        yield archive, book, _check_sheet(list(book[0]), sheet)
+
+
+def _sheet_rows(archive, path):
+    """Kolejne elementy <row> arkusza (z komórkami), parsowane strumieniowo.
+
+    Zdarzenia 'start': wiersz jest kompletny, gdy zaczyna się następny (lub kończy dokument); przeczytany
+    wiersz jest usuwany z drzewa, więc pamięć nie rośnie z liczbą wierszy.
+    """
+    row_tag = data_tag = sheet_data = row = None
+    try:
+        with archive.open(path) as stream:
+            for _, element in ElementTree.iterparse(stream, events=("start",)):
+                if element.tag == row_tag:
+                    if row is not None:
+                        yield row
+                        sheet_data.remove(row)
+                    row = element
+                elif element.tag == data_tag:
+                    sheet_data = element
+                elif row_tag is None:
+                    # Element główny: przestrzeń nazw arkusza ('{...}' albo brak)
+                    namespace = element.tag[:element.tag.rfind("}") + 1]
+                    row_tag, data_tag = namespace + "row", namespace + "sheetData"
+    except (KeyError, ElementTree.ParseError):
+        raise InvalidWorkbook("Arkusz skoroszytu Excel (.xlsx) jest uszkodzony.")
+    if row is not None:
+        yield row
+
+
+def _xlsx_rows(archive, book, sheet):
+    """Niepuste wiersze arkusza jako słowniki {indeks kolumny: wartość}, zamienione na wartości jak w openpyxl."""
+    from openpyxl.utils.datetime import from_excel, from_ISO8601
+
+    sheets, strings_path, styles_path, epoch = book
+    strings = _shared_strings(archive, strings_path)
+    dates, timedeltas = _date_styles(archive, styles_path)
+    columns = {}
+    cell_tag = None
+    for element in _sheet_rows(archive, sheets[sheet]):
+        if cell_tag is None:
+            namespace = element.tag[:-3]
+            cell_tag, value_tag, inline_tag = namespace + "c", namespace + "v", namespace + "is"
+        row = {}
+        col = -1
+        for cell in element:
+            if cell.tag != cell_tag:
+                continue
+            ref = cell.get("r")
+            if ref:
+                letters = ref.rstrip("0123456789")
+                col = columns.get(letters)
+                if col is None:
+                    col = columns[letters] = _column_index(letters)
+            else:
+                col += 1
+            type_ = cell.get("t", "n")
+            if type_ == "inlineStr":
+                inline = cell.find(inline_tag)
+                if inline is not None:
+                    row[col] = _text(inline)
+                continue
+            # Zapamiętana wartość <v> (także wynik formuły <f>)
+            raw = cell.findtext(value_tag)
+            if not raw:
+                continue
+            if type_ == "n":
+                # Jak openpyxl: liczba bez kropki i wykładnika jest całkowita, styl daty zamienia ją na datę
+                value = float(raw) if "." in raw or "E" in raw or "e" in raw else int(raw)
+                style = cell.get("s")
+                if style and int(style) in dates:
+                    try:
+                        value = from_excel(value, epoch, timedelta=int(style) in timedeltas)
+                    except (OverflowError, ValueError):
+                        value = "#VALUE!"
+            elif type_ == "s":
+                value = strings[int(raw)]
+            elif type_ == "b":
+                value = bool(int(raw))
+            elif type_ == "d":
+                value = from_ISO8601(raw)
+            else:  # 'str' (wynik formuły tekstowej) i 'e' (błąd, np. #N/A)
+                value = raw
+            row[col] = value
+        if row:
+            yield row
+
+
+def _openpyxl_rows(ws):
+    """Niepuste wiersze z czytnika strumieniowego openpyxl, w tej samej postaci co _xlsx_rows."""
+    for values in ws.iter_rows(values_only=True):
+        row = {col: value for col, value in enumerate(values) if value is not None}
+        if row:
+            yield row
+
+
+def _xls_rows(sheet):
+    import xlrd
+
+    for r in range(sheet.nrows):
+        row = {}
+        for col, (ctype, value) in enumerate(zip(sheet.row_types(r), sheet.row_values(r))):
+            if ctype in (xlrd.XL_CELL_EMPTY, xlrd.XL_CELL_BLANK, xlrd.XL_CELL_ERROR):
+                continue
+            if ctype == xlrd.XL_CELL_NUMBER and value.is_integer():
+                value = int(value)
+            elif ctype == xlrd.XL_CELL_DATE:
+                value = xlrd.xldate.xldate_as_datetime(value, sheet.book.datemode)
+            elif ctype == xlrd.XL_CELL_BOOLEAN:
+                value = bool(value)
+            row[col] = value
+        if row:
+            yield row
+
+
+@contextlib.contextmanager
+def _open_sheet(source, fmt, sheet=None):
+    """(nazwy arkuszy, nazwa wybranego arkusza, arkusz); bez nazwy - pierwszy arkusz skoroszytu."""
+    if fmt == "xls":
+        import xlrd
+        from xlrd.compdoc import CompDocError
+
+        try:
+            if isinstance(source, io.BytesIO):
+                book = xlrd.open_workbook(file_contents=source.getvalue(), on_demand=True)
+            else:
+                book = xlrd.open_workbook(source, on_demand=True)
+        except (xlrd.XLRDError, CompDocError):
+            raise InvalidWorkbook("Plik nie jest poprawnym skoroszytem Excel (.xls).")
+        try:
+            names = book.sheet_names()
+            sheet = _check_sheet(names, sheet)
+            yield names, sheet, book.sheet_by_name(sheet)
+        finally:
+            book.release_resources()
+        return
+
+    import openpyxl
+    from openpyxl.utils.exceptions import InvalidFileException
+
+    try:
+        workbook = openpyxl.load_workbook(source, read_only=True, data_only=True)
+    except (KeyError, zipfile.BadZipFile, InvalidFileException):
+        raise InvalidWorkbook("Plik nie jest poprawnym skoroszytem Excel (.xlsx).")
+    try:
+        # Arkusze wykresów nie zawierają danych
+        names = [ws.title for ws in workbook.worksheets]
+        sheet = _check_sheet(names, sheet)
+        yield names, sheet, workbook[sheet]
+    finally:
+        workbook.close()
+
+
+def _check_sheet(names, sheet):
+    if not names:
+        raise InvalidWorkbook("Skoroszyt nie zawiera żadnego arkusza z danymi.")
+    if sheet is None:
+        return names[0]
+    if sheet not in names:
+        raise InvalidWorkbook(f"Skoroszyt nie zawiera arkusza '{sheet}'.")
+    return sheet
+
+
+def _count_xlsx_rows(source, sheet):
+    with _open_xlsx(source, sheet) as (archive, book, sheet):
+        return sum(1 for _ in _sheet_rows(archive, book[0][sheet]))
+
+
+def _header(row):
+    """Nazwy kolumn z wiersza nagłówka jak w read_csv: puste - 'Unnamed: i', powtórzone - z przyrostkiem '.1', '.2'."""
+    names = []
+    seen = {}
+    for col in range(max(row) + 1):
+        value = row.get(col)
+        name = f"Unnamed: {col}" if value is None or value == "" else str(value)
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+
+def _column(values):
+    series = pd.Series(values, dtype=object)
+    series = series.mask(series.isna() | series.isin(NA_VALUES))
+    kind = pd.api.types.infer_dtype(series, skipna=True)
+    if kind == "empty":
+        return series.astype(np.float64)
+    if kind in ("string", "mixed", "mixed-integer", "mixed-integer-float"):
+        try:
+            return pd.to_numeric(series)
+        except (ValueError, TypeError):
+            return series
+    return series.infer_objects()
+
+
+def _frame(names, rows):
+    data = {name: _column(values) for name, values in zip(names, zip(*rows))} if rows else {}
+    return pd.DataFrame(data, columns=names)
+
+
+def _frames(rows, columns=None, chunksize=None):
+    """DataFrame'y z wierszy (pierwszy niepusty to nagłówek); chunksize=None - jedna ramka z całego arkusza."""
+    header = next(rows, None)
+    names = _header(header) if header else []
+    positions = list(range(len(names)))
+    if columns is not None:
+        missing = [col for col in columns if col not in names]
+        if missing:
+            raise ValueError(f"Arkusz nie zawiera kolumn: {', '.join(map(str, missing))}.")
+        positions = [names.index(col) for col in columns]
+        names = list(columns)
+    buffer = []
+    yielded = False
+    for row in rows:
+        buffer.append([row.get(position) for position in positions])
+        if chunksize is not None and len(buffer) == chunksize:
+            yield _frame(names, buffer)
+            buffer = []
+            yielded = True
+    if buffer or not yielded:
+        yield _frame(names, buffer)
+
+
+def describe(source, fmt, sheet=None):
+    """(nazwy arkuszy, wybrany arkusz, liczba wierszy z nagłówkiem, nazwy kolumn) bez czytania całego arkusza."""
+    with _open_sheet(source, fmt, sheet) as (names, sheet, ws):
+        if fmt == "xls":
+            n_rows, rows = ws.nrows, _xls_rows(ws)
+        else:
+            # Liczba wierszy z wymiaru arkusza (<dimension>); bez niego - z policzenia wierszy w XML
+            n_rows = ws.max_row if ws.max_row and ws.max_row > 1 else _count_xlsx_rows(source, sheet)
+            rows = _openpyxl_rows(ws)
+        header = next(rows, None)
+        return names, sheet, n_rows, _header(header) if header else []
+
+
+def read_head(source, fmt, sheet, n_rows=EXCEL_PREVIEW_ROWS):
+    """Nagłówek i najwyżej n_rows pierwszych wierszy arkusza (czytnik strumieniowy openpyxl, bez całego arkusza)."""
+    with _open_sheet(source, fmt, sheet) as (_, _, ws):
+        rows = _xls_rows(ws) if fmt == "xls" else _openpyxl_rows(ws)
+        return next(_frames(itertools.islice(rows, n_rows + 1)))
+
+
+def iter_frames(source, fmt, sheet, chunksize=None, columns=None):
+    """Kolejne porcje arkusza po chunksize wierszy (columns - tylko wskazane kolumny); chunksize=None - cały arkusz."""
+    if fmt == "xls":
+        with _open_sheet(source, fmt, sheet) as (_, _, ws):
+            yield from _frames(_xls_rows(ws), columns, chunksize)
+        return
+    with _open_xlsx(source, sheet) as (archive, book, sheet):
+        yield from _frames(_xlsx_rows(archive, book, sheet), columns, chunksize)
+
+
+def read_sheet(source, fmt, sheet, columns=None):
+    with contextlib.closing(iter_frames(source, fmt, sheet, columns=columns)) as frames:
+        return next(frames)
@@ -0,0 +1,348 @@
+"""
+Zaawansowane uzupełnianie braków danych (strategie 'impute_group_median',
+'impute_knn' i 'impute_mice').
+
+Uzupełnianie medianą/dominantą spłaszcza zależności między zmiennymi, które
+raport następnie testuje. Strategie z tego modułu korzystają z pozostałych
+kolumn wiersza:
+- mediana warunkowa: braki w kolumnie liczbowej uzupełniane są medianą w grupie
+  wyznaczonej przez zmienną kategoryczną najsilniej z nią związaną (największe eta^2),
+- k najbliższych sąsiadów: średnia (dla kolumn binarnych - wartość najbliższa
+  średniej, dla kategorycznych - dominanta) k najbliższych wierszy kompletnych
+  w przestrzeni standaryzowanych zmiennych liczbowych; sąsiedzi są wyszukiwani
+  w przybliżeniu (drzewa k-d dla kolejnych wzorców braków) w powtarzalnej
+  losowej próbie wierszy kompletnych (KNN_DONORS), więc koszt rośnie liniowo
+  z liczbą wierszy z brakami,
+- regresja iteracyjna (w stylu MICE): każda kolumna liczbowa z brakami jest
+  kolejno przewidywana regresją liniową na pozostałych kolumnach liczbowych,
+  dopasowywaną na próbie co najwyżej MICE_MAX_FIT_ROWS wierszy, przez
+  co najwyżej MICE_MAX_ITER rund lub do ustabilizowania się uzupełnień.
+
+Wszystkie strategie dają pojedyncze, deterministyczne uzupełnienie. Kolumny
+kategoryczne, dla których metoda nie ma zastosowania, uzupełniane są dominantą.
+Funkcje modyfikują przekazaną ramkę w miejscu i zwracają opis do raportu.
+
+Konfiguracja przez zmienne środowiskowe: KNN_NEIGHBORS (domyślnie 5),
+KNN_DONORS (domyślnie 5000), MICE_MAX_ITER (domyślnie 5), MICE_MAX_FIT_ROWS
+(domyślnie 200000), IMPUTATION_SEED (domyślnie 0).
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+KNN_NEIGHBORS = int(os.getenv("KNN_NEIGHBORS", "5"))
+KNN_DONORS = int(os.getenv("KNN_DONORS", "5000"))
+# Dopuszczalny względny błąd odległości w przybliżonym wyszukiwaniu sąsiadów (cKDTree eps)
+KNN_EPS = 1.0
+# Powyżej tej liczby poziomów kolumna kategoryczna jest uzupełniana dominantą zamiast głosowania sąsiadów
+KNN_MAX_LEVELS = 1000
+MICE_MAX_ITER = int(os.getenv("MICE_MAX_ITER", "5"))
+MICE_MAX_FIT_ROWS = int(os.getenv("MICE_MAX_FIT_ROWS", "200000"))
+# Zbieżność: średnia zmiana uzupełnień w rundzie mniejsza niż ten ułamek odchylenia standardowego kolumny
+MICE_TOL = 1e-3
+IMPUTATION_SEED = int(os.getenv("IMPUTATION_SEED", "0"))
+
+# Zmienne grupujące dla mediany warunkowej
+MAX_GROUPS = 50
+MIN_GROUP_SIZE = 5
+CATEGORICAL_TYPES = ("nominalna", "porządkowa", "kategoryczna")
+GROUPING_TYPES = CATEGORICAL_TYPES + ("binarna",)
+
+
+def _rng(n):
+    return np.random.default_rng([IMPUTATION_SEED, n])
+
+
+def fast_mode(series: pd.Series):
+    """Dominanta przez factorize + bincount; przy remisie najmniejsza wartość, jak Series.mode()[0]."""
+    codes, uniques = pd.factorize(series)
+    if len(uniques) == 0:
+        # Kolumna bez żadnej wartości - nie ma czym uzupełnić (jak mediana pustej kolumny liczbowej)
+        return np.nan
+    counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+    candidates = uniques.take(np.flatnonzero(counts == counts.max()))
+    try:
+        return sorted(candidates)[0]
+    except TypeError:
+        return candidates[0]
+
+
+def _split_columns(df, variable_types):
+    """(kolumny liczbowe, kolumny kategoryczne) według typu danych i typów wskazanych przez użytkownika."""
+    types = {col: str(type_).lower() for col, type_ in (variable_types or {}).items()}
+    numeric, categorical = [], []
+    for col in df.columns:
+        if pd.api.types.is_numeric_dtype(df[col]) and types.get(col) not in CATEGORICAL_TYPES:
+            numeric.append(col)
+        else:
+            categorical.append(col)
+    return numeric, categorical
+
+
+def _binary_levels(values):
+    """Dwie obserwowane wartości kolumny liczbowej (np. 0/1) albo None."""
+    levels = np.unique(values[~np.isnan(values)])
+    return levels if len(levels) == 2 else None
+
+
+def _snap(values, levels):
+    """Zaokrągla uzupełnienia kolumny binarnej do bliższego z dwóch poziomów."""
+    return np.where(values < levels.mean(), levels[0], levels[1])
+
+
+def _fill_with_mode(df, columns):
+    descriptions = []
+    for col in columns:
+        mask = df[col].isnull().to_numpy()
+        if not mask.any():
+            continue
+        value = fast_mode(df[col])
+        with pd.option_context("future.no_silent_downcasting", True):
+            df.fillna(value={col: value}, inplace=True)
+        descriptions.append(f"{col} (dominantą: {value})")
+    return descriptions
+
+
+def _fill_with_median(df, col):
+    value = df[col].median()
+    df.fillna(value={col: value}, inplace=True)
+    return f"{col} (medianą: {value:.2f})"
+
+
+def _summary(method, descriptions):
+    if not descriptions:
+        return "Nie znaleziono brakujących wartości do uzupełnienia."
+    return f"{method} Uzupełniono brakujące wartości w kolumnach: {', '.join(descriptions)}."
+
+
+# --- Mediana warunkowa ---
+
+def _eta_squared(values, codes, n_groups):
+    """Eta^2 (udział wariancji między grupami) na wierszach z obserwowaną wartością i grupą."""
+    ok = ~np.isnan(values) & (codes >= 0)
+    if ok.sum() < 2:
+        return 0.0
+    y, g = values[ok], codes[ok]
+    counts = np.bincount(g, minlength=n_groups)
+    sums = np.bincount(g, weights=y, minlength=n_groups)
+    total_ss = ((y - y.mean()) ** 2).sum()
+    if total_ss <= 0:
+        return 0.0
+    present = counts > 0
+    between_ss = (sums[present] ** 2 / counts[present]).sum() - y.sum() ** 2 / len(y)
+    return float(between_ss / total_ss)
+
+
+def impute_group_median(df: pd.DataFrame, variable_types: dict = None) -> str:
+    numeric, categorical = _split_columns(df, variable_types)
+    types = {col: str(type_).lower() for col, type_ in (variable_types or {}).items()}
+
+    # Kandydaci na zmienne grupujące: kategoryczne i binarne o rozsądnej liczbie poziomów
+    groupings = {}
+    for col in df.columns:
+        if col in categorical or types.get(col) in GROUPING_TYPES:
+            codes, uniques = pd.factorize(df[col])
+            if 2 <= len(uniques) <= MAX_GROUPS:
+                groupings[col] = (codes, len(uniques))
+
+    descriptions = []
+    for col in numeric:
+        values = df[col].to_numpy(dtype=np.float64)
+        missing = np.isnan(values)
+        if not missing.any():
+            continue
+        candidates = {key: _eta_squared(values, codes, n) for key, (codes, n) in groupings.items() if key != col}
+        best = max(candidates, key=candidates.get) if candidates else None
+        if best is None or candidates[best] <= 0:
+            descriptions.append(_fill_with_median(df, col))
+            continue
+
+        codes, n_groups = groupings[best]
+        global_median = np.nanmedian(values)
+        observed = ~missing & (codes >= 0)
+        group_medians = pd.Series(values[observed]).groupby(codes[observed]).median()
+        group_sizes = np.bincount(codes[observed], minlength=n_groups)
+        medians = np.full(n_groups, global_median)
+        medians[group_medians.index] = group_medians.to_numpy()
+        # Zbyt małe grupy i wiersze bez wartości zmiennej grupującej dostają medianę globalną
+        medians[group_sizes < MIN_GROUP_SIZE] = global_median
+        missing_codes = codes[missing]
+        fill = np.where(missing_codes >= 0, medians[np.maximum(missing_codes, 0)], global_median)
+        df.loc[missing, col] = fill
+        descriptions.append(f"{col} (medianą w grupach zmiennej '{best}', eta²={candidates[best]:.3f})")
+
+    descriptions += _fill_with_mode(df, categorical)
+    return _summary(
+        "Metoda: mediana warunkowa - dla każdej kolumny liczbowej mediana w grupach zmiennej kategorycznej "
+        "najsilniej z nią związanej (kolumny kategoryczne: dominanta).",
+        descriptions,
+    )
+
+
+# --- k najbliższych sąsiadów ---
+
+def _nearest_donors(query, observed, donors, k):
+    """Indeksy k najbliższych dawców dla każdego wiersza zapytania (odległość po cechach obserwowanych w wierszu).
+
+    Wiersze są grupowane według wzorca braków, a dla każdego wzorca budowane jest drzewo k-d na
+    odpowiednich kolumnach próby dawców; wyszukiwanie jest przybliżone (KNN_EPS).
+    """
+    from scipy.spatial import cKDTree
+
+    _, pattern = np.unique(np.packbits(observed, axis=1), axis=0, return_inverse=True)
+    pattern = pattern.ravel()
+    order = np.argsort(pattern, kind="stable")
+    neighbours = np.empty((len(query), k), dtype=np.intp)
+    for rows in np.split(order, np.flatnonzero(np.diff(pattern[order])) + 1):
+        features = observed[rows[0]]
+        tree = cKDTree(donors[:, features])
+        _, idx = tree.query(query[np.ix_(rows, features)], k=k, eps=KNN_EPS, workers=-1)
+        neighbours[rows] = idx.reshape(len(rows), k)
+    return neighbours
+
+
+def impute_knn(df: pd.DataFrame, variable_types: dict = None) -> str:
+    numeric, categorical = _split_columns(df, variable_types)
+    # Kolumny bez żadnej obserwowanej wartości nie mogą być cechami odległości - traktujemy je jak w 'impute'
+    empty = [col for col in numeric if df[col].isnull().all()]
+    numeric = [col for col in numeric if col not in empty]
+    k = KNN_NEIGHBORS
+    X = df[numeric].to_numpy(dtype=np.float64) if numeric else np.empty((len(df), 0))
+    missing_numeric = np.isnan(X)
+    targets_numeric = [j for j in range(len(numeric)) if missing_numeric[:, j].any()]
+
+    cat_codes = {}
+    for col in categorical:
+        codes, uniques = pd.factorize(df[col])
+        if (codes < 0).any() and len(uniques) <= KNN_MAX_LEVELS:
+            cat_codes[col] = (codes, uniques)
+
+    needs = missing_numeric.any(axis=1)
+    for codes, _ in cat_codes.values():
+        needs |= codes < 0
+    complete = ~missing_numeric.any(axis=1)
+    for codes, _ in cat_codes.values():
+        complete &= codes >= 0
+    donor_rows = np.flatnonzero(complete)
+
+    if not numeric or len(donor_rows) < k or not needs.any():
+        descriptions = [_fill_with_median(df, col) for col in [numeric[j] for j in targets_numeric] + empty]
+        descriptions += _fill_with_mode(df, categorical)
+        return _summary("Metoda k najbliższych sąsiadów nie miała zastosowania (za mało kompletnych wierszy lub brak zmiennych liczbowych) - użyto mediany/dominanty.", descriptions)
+
+    if len(donor_rows) > KNN_DONORS:
+        donor_rows = np.sort(_rng(len(donor_rows)).choice(donor_rows, KNN_DONORS, replace=False))
+    donors_raw = X[donor_rows]
+    center = donors_raw.mean(axis=0)
+    scale = donors_raw.std(axis=0)
+    scale[scale == 0] = 1.0
+    donors = (donors_raw - center) / scale
+
+    query_rows = np.flatnonzero(needs)
+    observed = ~missing_numeric[query_rows]
+    # Wiersze bez żadnej obserwowanej cechy liczbowej nie mają sąsiadów - uzupełniamy je medianą/dominantą
+    has_features = observed.any(axis=1)
+    query_rows, observed = query_rows[has_features], observed[has_features]
+    query = np.where(observed, (np.nan_to_num(X[query_rows]) - center) / scale, 0.0)
+    neighbours = _nearest_donors(query, observed, donors, k)
+
+    descriptions = []
+    for j in targets_numeric:
+        col = numeric[j]
+        rows = ~observed[:, j]
+        fill = donors_raw[neighbours[rows], j].mean(axis=1)
+        levels = _binary_levels(X[:, j])
+        if levels is not None:
+            fill = _snap(fill, levels)
+        df.loc[df.index[query_rows[rows]], col] = fill
+        descriptions.append(f"{col} ({int(rows.sum())} wartości z sąsiadów)")
+    for col, (codes, uniques) in cat_codes.items():
+        rows = codes[query_rows] < 0
+        votes = codes[donor_rows][neighbours[rows]]
+        counts = np.zeros((len(votes), len(uniques)), dtype=np.int32)
+        np.add.at(counts, (np.arange(len(votes))[:, None], votes), 1)
+        with pd.option_context("future.no_silent_downcasting", True):
+            df.loc[df.index[query_rows[rows]], col] = uniques.take(counts.argmax(axis=1))
+        descriptions.append(f"{col} ({int(rows.sum())} wartości z sąsiadów)")
+
+    # Pozostałe braki: wiersze bez cech liczbowych i kolumny kategoryczne o bardzo wielu poziomach
+    for j in targets_numeric:
+        if df[numeric[j]].isnull().any():
+            descriptions.append(_fill_with_median(df, numeric[j]) + " dla wierszy bez obserwowanych zmiennych liczbowych")
+    descriptions += [_fill_with_median(df, col) for col in empty]
+    descriptions += _fill_with_mode(df, categorical)
+    return _summary(
+        f"Metoda: k najbliższych sąsiadów (k={k}, odległość euklidesowa po standaryzowanych zmiennych liczbowych "
+        f"obserwowanych w danym wierszu; sąsiedzi wyszukiwani wśród {len(donor_rows)} wierszy kompletnych, "
+        f"kolumny liczbowe: średnia sąsiadów, kategoryczne: dominanta sąsiadów).",
+        descriptions,
+    )
+
+
+# --- Regresja iteracyjna (MICE) ---
+
+def impute_mice(df: pd.DataFrame, variable_types: dict = None) -> str:
+    numeric, categorical = _split_columns(df, variable_types)
+    X = df[numeric].to_numpy(dtype=np.float64) if numeric else np.empty((len(df), 0))
+    missing = np.isnan(X)
+    targets = [j for j in range(len(numeric)) if missing[:, j].any() and not missing[:, j].all()]
+
+    if len(numeric) < 2 or not targets:
+        descriptions = [_fill_with_median(df, col) for col in numeric if df[col].isnull().any()]
+        descriptions += _fill_with_mode(df, categorical)
+        return _summary("Regresja iteracyjna wymaga co najmniej dwóch zmiennych liczbowych - użyto mediany/dominanty.", descriptions)
+
+    # Start od median; kolumny bez żadnej obserwacji zostają niewykorzystane jako predyktory
+    medians = np.nanmedian(np.where(missing.all(axis=0), 0.0, X), axis=0)
+    X[missing] = np.take(medians, np.nonzero(missing)[1])
+    usable = ~missing.all(axis=0)
+    stds = {j: np.nanstd(np.where(missing[:, j], np.nan, X[:, j])) or 1.0 for j in targets}
+    bounds = {j: (X[~missing[:, j], j].min(), X[~missing[:, j], j].max()) for j in targets}
+    levels = {j: _binary_levels(np.where(missing[:, j], np.nan, X[:, j])) for j in targets}
+    fit_rows = {}
+    for j in targets:
+        rows = np.flatnonzero(~missing[:, j])
+        if len(rows) > MICE_MAX_FIT_ROWS:
+            rows = np.sort(_rng(len(rows)).choice(rows, MICE_MAX_FIT_ROWS, replace=False))
+        fit_rows[j] = rows
+
+    iterations = 0
+    for iterations in range(1, MICE_MAX_ITER + 1):
+        largest_change = 0.0
+        for j in targets:
+            predictors = [i for i in range(len(numeric)) if i != j and usable[i]]
+            rows = fit_rows[j]
+            design = np.column_stack([np.ones(len(rows)), X[np.ix_(rows, predictors)]])
+            coef, *_ = np.linalg.lstsq(design, X[rows, j], rcond=None)
+            missing_rows = missing[:, j]
+            prediction = coef[0] + X[np.ix_(missing_rows, predictors)] @ coef[1:]
+            prediction = np.clip(prediction, *bounds[j])
+            if levels[j] is not None:
+                prediction = _snap(prediction, levels[j])
+            largest_change = max(largest_change, np.abs(prediction - X[missing_rows, j]).mean() / stds[j])
+            X[missing_rows, j] = prediction
+        if largest_change < MICE_TOL:
+            break
+
+    descriptions = []
+    for j, col in enumerate(numeric):
+        if j in targets:
+            df.loc[missing[:, j], col] = X[missing[:, j], j]
+            descriptions.append(f"{col} ({int(missing[:, j].sum())} wartości z regresji)")
+        elif missing[:, j].any():
+            descriptions.append(_fill_with_median(df, col))
+    descriptions += _fill_with_mode(df, categorical)
+    return _summary(
+        f"Metoda: regresja iteracyjna (MICE) - każda kolumna liczbowa przewidywana regresją liniową na pozostałych "
+        f"zmiennych liczbowych, {iterations} rund(y), model dopasowywany na co najwyżej {MICE_MAX_FIT_ROWS} wierszach "
+        f"(kolumny kategoryczne: dominanta).",
+        descriptions,
+    )
+
+
+STRATEGIES = {
+    "impute_group_median": impute_group_median,
+    "impute_knn": impute_knn,
+    "impute_mice": impute_mice,
+}
@@ -0,0 +1,320 @@
+"""
+Jądra obliczeniowe dla baterii testów statystycznych.
+
+Jeśli numba jest dostępna, pętle wewnętrzne (korelacje Spearmana parami z obsługą NaN,
+momenty grup dla testu t, zliczanie U Manna-Whitneya, tabele kontyngencji)
+są kompilowane JIT i zrównoleglone przez `prange`. W przeciwnym razie
+używana jest implementacja w czystym NumPy, dająca te same wyniki.
+Zmienna środowiskowa ANALIZA_DISABLE_NUMBA=1 wymusza ścieżkę NumPy.
+"""
+import os
+
+import numpy as np
+from scipy import stats
+
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = os.getenv("ANALIZA_DISABLE_NUMBA", "0") != "1"
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+
+# --- Implementacje numba ---
+
+if NUMBA_AVAILABLE:
+
+    @njit(cache=True)
+    def _rank_avg_nb(a):
+        n = a.size
+        order = np.argsort(a, kind="mergesort")
+        ranks = np.empty(n, dtype=np.float64)
+        tie_term = 0.0
+        i = 0
+        while i < n:
+            j = i
+            while j + 1 < n and a[order[j + 1]] == a[order[i]]:
+                j += 1
+            rank = 0.5 * (i + j) + 1.0
+            for k in range(i, j + 1):
+                ranks[order[k]] = rank
+            t = j - i + 1
+            tie_term += t * t * t - t
+            i = j + 1
+        return ranks, tie_term
+
+    @njit(cache=True)
+    def _pearson_nb(x, y):
+        n = x.size
+        mx = 0.0
+        my = 0.0
+        for k in range(n):
+            mx += x[k]
+            my += y[k]
+        mx /= n
+        my /= n
+        sxx = 0.0
+        syy = 0.0
+        sxy = 0.0
+        for k in range(n):
+            dx = x[k] - mx
+            dy = y[k] - my
+            sxx += dx * dx
+            syy += dy * dy
+            sxy += dx * dy
+        if sxx == 0.0 or syy == 0.0:
+            return np.nan
+        return sxy / np.sqrt(sxx * syy)
+
+    @njit(cache=True)
+    def _complete_pair_nb(X, i, j):
+        n = X.shape[0]
+        count = 0
+        for k in range(n):
+            if not (np.isnan(X[k, i]) or np.isnan(X[k, j])):
+                count += 1
+        x = np.empty(count, dtype=np.float64)
+        y = np.empty(count, dtype=np.float64)
+        m = 0
+        for k in range(n):
+            if not (np.isnan(X[k, i]) or np.isnan(X[k, j])):
+                x[m] = X[k, i]
+                y[m] = X[k, j]
+                m += 1
+        return x, y
+
+    @njit(parallel=True, cache=True)
+    def _pairwise_spearman_nb(X, pairs_i, pairs_j):
+        p = X.shape[1]
+        r = np.full((p, p), np.nan)
+        counts = np.zeros((p, p), dtype=np.int64)
+        for q in prange(pairs_i.size):
+            i = pairs_i[q]
+            j = pairs_j[q]
+            x, y = _complete_pair_nb(X, i, j)
+            counts[i, j] = x.size
+            counts[j, i] = x.size
+            if x.size < 2:
+                continue
+            x, _ = _rank_avg_nb(x)
+            y, _ = _rank_avg_nb(y)
+            value = _pearson_nb(x, y)
+            r[i, j] = value
+            r[j, i] = value
+        for i in range(p):
+            r[i, i] = 1.0
+        return r, counts
+
+    @njit(cache=True)
+    def _group_moments_nb(values, codes, k):
+        n = np.zeros(k, dtype=np.int64)
+        mean = np.zeros(k, dtype=np.float64)
+        m2 = np.zeros(k, dtype=np.float64)
+        for idx in range(values.size):
+            g = codes[idx]
+            v = values[idx]
+            if g < 0 or np.isnan(v):
+                continue
+            n[g] += 1
+            delta = v - mean[g]
+            mean[g] += delta / n[g]
+            m2[g] += delta * (v - mean[g])
+        return n, mean, m2
+
+    @njit(cache=True)
+    def _mwu_u_nb(x, y):
+        n1 = x.size
+        combined = np.concatenate((x, y))
+        ranks, tie_term = _rank_avg_nb(combined)
+        r1 = 0.0
+        for k in range(n1):
+            r1 += ranks[k]
+        return r1 - n1 * (n1 + 1) / 2.0, tie_term
+
+    @njit(parallel=True, cache=True)
+    def _contingency_nb(codes_a, codes_b, ka, kb, n_chunks):
+        n = codes_a.size
+        partial = np.zeros((n_chunks, ka, kb), dtype=np.int64)
+        chunk = (n + n_chunks - 1) // n_chunks
+        for c in prange(n_chunks):
+            start = c * chunk
+            stop = min(start + chunk, n)
+            for idx in range(start, stop):
+                a = codes_a[idx]
+                b = codes_b[idx]
+                if a >= 0 and b >= 0:
+                    partial[c, a, b] += 1
+        return partial.sum(axis=0)
+
+
+# --- Implementacje NumPy (fallback) ---
+
+def _pairwise_spearman_np(X, pairs_i, pairs_j):
+    p = X.shape[1]
+    r = np.full((p, p), np.nan)
+    counts = np.zeros((p, p), dtype=np.int64)
+    finite = ~np.isnan(X)
+    for i, j in zip(pairs_i, pairs_j):
+        mask = finite[:, i] & finite[:, j]
+        x, y = X[mask, i], X[mask, j]
+        counts[i, j] = counts[j, i] = x.size
+        if x.size < 2:
+            continue
+        x, y = stats.rankdata(x), stats.rankdata(y)
+        dx, dy = x - x.mean(), y - y.mean()
+        denom = np.sqrt((dx @ dx) * (dy @ dy))
+        r[i, j] = r[j, i] = (dx @ dy) / denom if denom > 0 else np.nan
+    np.fill_diagonal(r, 1.0)
+    return r, counts
+
+
+def _group_moments_np(values, codes, k):
+    mask = (codes >= 0) & ~np.isnan(values)
+    v, g = values[mask], codes[mask]
+    n = np.bincount(g, minlength=k)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.bincount(g, weights=v, minlength=k) / n
+    mean = np.nan_to_num(mean)
+    m2 = np.bincount(g, weights=(v - mean[g]) ** 2, minlength=k)
+    return n, mean, m2
+
+
+def _mwu_u_np(x, y):
+    combined = np.concatenate((x, y))
+    ranks = stats.rankdata(combined)
+    _, t = np.unique(combined, return_counts=True)
+    tie_term = float((t.astype(np.float64) ** 3 - t).sum())
+    n1 = x.size
+    return ranks[:n1].sum() - n1 * (n1 + 1) / 2.0, tie_term
+
+
+def _contingency_np(codes_a, codes_b, ka, kb):
+    mask = (codes_a >= 0) & (codes_b >= 0)
+    flat = codes_a[mask].astype(np.int64) * kb + codes_b[mask]
+    return np.bincount(flat, minlength=ka * kb).reshape(ka, kb)
+
+
+# --- Publiczne API ---
+
+def _upper_pairs(p):
+    pairs_i, pairs_j = np.triu_indices(p, k=1)
+    return pairs_i.astype(np.int64), pairs_j.astype(np.int64)
+
+
+def pairwise_spearman(X):
+    """Macierz korelacji Spearmana i liczebności; rangi liczone na parach kompletnych."""
+    X = np.ascontiguousarray(X, dtype=np.float64)
+    pairs_i, pairs_j = _upper_pairs(X.shape[1])
+    if NUMBA_AVAILABLE:
+        return _pairwise_spearman_nb(X, pairs_i, pairs_j)
+    return _pairwise_spearman_np(X, pairs_i, pairs_j)
+
+
+def group_moments(values, codes, k):
+    """Liczebność, średnia i suma kwadratów odchyleń (M2) w każdej z k grup."""
+    values = np.ascontiguousarray(values, dtype=np.float64)
+    codes = np.ascontiguousarray(codes, dtype=np.int64)
+    if NUMBA_AVAILABLE:
+        return _group_moments_nb(values, codes, k)
+    return _group_moments_np(values, codes, k)
+
+
+def mwu_statistic(x, y):
+    """Statystyka U dla próby x oraz składnik korekty na rangi wiązane (suma t^3 - t)."""
+    x = np.ascontiguousarray(x, dtype=np.float64)
+    y = np.ascontiguousarray(y, dtype=np.float64)
+    if NUMBA_AVAILABLE:
+        return _mwu_u_nb(x, y)
+    return _mwu_u_np(x, y)
+
+
+def contingency_table(codes_a, codes_b, ka, kb):
+    """Tabela liczebności ka x kb; kody ujemne (braki danych) są pomijane."""
+    codes_a = np.ascontiguousarray(codes_a, dtype=np.int64)
+    codes_b = np.ascontiguousarray(codes_b, dtype=np.int64)
+    if NUMBA_AVAILABLE:
+        n_chunks = max(1, min(os.cpu_count() or 1, codes_a.size // 100_000 + 1))
+        return _contingency_nb(codes_a, codes_b, ka, kb, n_chunks)
+    return _contingency_np(codes_a, codes_b, ka, kb)
+
+
+# --- Statystyki testowe na podstawie wyników jąder ---
+
+def correlation_pvalue(r, n):
+    """Dwustronne p-value dla współczynnika korelacji (rozkład t, n - 2 stopni swobody)."""
+    if n < 3 or np.isnan(r):
+        return np.nan
+    if abs(r) >= 1.0:
+        return 0.0
+    t_stat = r * np.sqrt((n - 2) / ((1.0 + r) * (1.0 - r)))
+    return float(2 * stats.t.sf(abs(t_stat), n - 2))
+
+
+def ttest_from_moments(n, mean, m2, equal_var):
+    """Test t dla dwóch niezależnych grup z momentów; zwraca (t, dof, p-value, d Cohena)."""
+    n1, n2 = float(n[0]), float(n[1])
+    v1, v2 = m2[0] / (n1 - 1), m2[1] / (n2 - 1)
+    diff = mean[0] - mean[1]
+    pooled_var = ((n1 - 1) * v1 + (n2 - 1) * v2) / (n1 + n2 - 2)
+    if equal_var:
+        dof = n1 + n2 - 2
+        se = np.sqrt(pooled_var * (1 / n1 + 1 / n2))
+    else:
+        a, b = v1 / n1, v2 / n2
+        dof = (a + b) ** 2 / (a ** 2 / (n1 - 1) + b ** 2 / (n2 - 1))
+        se = np.sqrt(a + b)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t_stat = diff / se
+        cohen_d = abs(diff / np.sqrt(pooled_var))
+    p_value = float(2 * stats.t.sf(abs(t_stat), dof))
+    return float(t_stat), float(dof), p_value, float(cohen_d)
+
+
+def mwu_test(x, y):
+    """Dwustronny test U Manna-Whitneya zgodny z scipy (method='auto'); zwraca (U, p-value, RBC)."""
+    n1, n2 = len(x), len(y)
+    u1, tie_term = mwu_statistic(x, y)
+    if (n1 <= 8 or n2 <= 8) and tie_term == 0:
+        p_value = stats.mannwhitneyu(x, y, alternative="two-sided", method="exact").pvalue
+    else:
+        n = n1 + n2
+        u = max(u1, n1 * n2 - u1)
+        s = np.sqrt(n1 * n2 / 12 * ((n + 1) - tie_term / (n * (n - 1))))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            z = (u - n1 * n2 / 2 - 0.5) / s
+        p_value = min(1.0, 2 * stats.norm.sf(z))
+    rbc = 1 - 2 * (n1 * n2 - u1) / (n1 * n2)
+    return float(u1), float(p_value), float(rbc)
+
+
+def chi2_from_table(observed, correction=True):
+    """Test niezależności chi-kwadrat (Pearson, z korektą Yatesa dla 1 stopnia swobody).
+
+    Zwraca (chi2, dof, p-value, V Craméra, tabela liczebności oczekiwanych).
+    """
+    observed = np.asarray(observed, dtype=np.float64)
+    n = observed.sum()
+    expected = np.outer(observed.sum(axis=1), observed.sum(axis=0)) / n
+    dof = (observed.shape[0] - 1) * (observed.shape[1] - 1)
+    if dof == 0:
+        return 0.0, 0, 1.0, np.nan, expected
+    if dof == 1 and correction:
+        observed = observed + 0.5 * np.sign(expected - observed)
+    chi2 = float(((observed - expected) ** 2 / expected).sum())
+    p_value = float(stats.chi2.sf(chi2, dof))
+    cramer = float(np.sqrt(chi2 / (n * (min(expected.shape) - 1))))
+    return chi2, dof, p_value, cramer, expected
+
+
+def warm_up():
+    """Kompiluje jądra numba na małych danych, aby pierwsze żądanie nie płaciło za kompilację."""
+    if not NUMBA_AVAILABLE:
+        return False
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(32, 3))
+    X[0, 0] = np.nan
+    pairwise_spearman(X)
+    codes = np.arange(32, dtype=np.int64) % 2
+    group_moments(X[:, 1], codes, 2)
+    mwu_statistic(X[:16, 1], X[16:, 1])
+    contingency_table(codes, codes[::-1].copy(), 2, 2)
+    return True
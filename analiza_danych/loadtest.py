@@ -0,0 +1,345 @@
+"""
+Test obciążeniowy ścieżki zakupu (podgląd -> płatność -> raport) przez HTTP.
+
+Uruchamia lokalną atrapę API Stripe (tworzenie i pobieranie sesji Checkout,
+konfigurowalne opóźnienie, część sesji może pozostać nieopłacona), następnie
+startuje backend (uvicorn) z STRIPE_API_BASE wskazującym na atrapę i po jego
+rozgrzaniu (/api/health/ready) wykonuje współbieżnie zadaną liczbę przepływów
+na plikach z test_datasets (opcjonalnie powielonych do zadanego rozmiaru).
+
+Raportowane są: przepustowość, opóźnienia p50/p95/p99 każdego kroku, kody
+odpowiedzi oraz szczytowa pamięć RSS procesu serwera i procesów raportowych.
+
+Użycie (z katalogu analiza_danych):
+    python loadtest.py --flows 40 --concurrency 8 --workers 2
+    python loadtest.py --datasets titanic.csv boston.csv --upload-kb 2048 --stripe-latency-ms 300 \\
+        --unpaid-ratio 0.1 --output loadtest.json
+"""
+import argparse
+import asyncio
+import io
+import itertools
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+import httpx
+import numpy as np
+import pandas as pd
+import psutil
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+DATASETS_DIR = os.path.join(APP_DIR, "..", "test_datasets")
+
+STEPS = ["preview", "payment", "report"]
+
+
+# --- Atrapa Stripe ---
+
+class FakeStripe:
+    """Minimalna atrapa /v1/checkout/sessions zgodna z biblioteką stripe."""
+
+    def __init__(self, latency_ms=0, unpaid_ratio=0.0, seed=0):
+        self.latency = latency_ms / 1000
+        self.unpaid_ratio = unpaid_ratio
+        self.sessions = {}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def _create(self, params):
+        with self._lock:
+            paid = self._rng.random() >= self.unpaid_ratio
+        session_id = f"cs_test_{uuid.uuid4().hex}"
+        session = {
+            "id": session_id,
+            "object": "checkout.session",
+            "mode": params.get("mode", ["payment"])[0],
+            "payment_status": "paid" if paid else "unpaid",
+            "status": "complete" if paid else "open",
+            "url": f"{self.url}/pay/{session_id}",
+        }
+        with self._lock:
+            self.sessions[session_id] = session
+        return 200, session
+
+    def _retrieve(self, session_id):
+        with self._lock:
+            session = self.sessions.get(session_id)
+        if session is None:
+            return 404, {"error": {"type": "invalid_request_error", "message": f"No such checkout.session: '{session_id}'"}}
+        return 200, session
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _reply(self, status, body):
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_POST(self):
+                time.sleep(fake.latency)
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0))).decode()
+                if self.path.rstrip("/") == "/v1/checkout/sessions":
+                    self._reply(*fake._create(parse_qs(body)))
+                else:
+                    self._reply(404, {"error": {"type": "invalid_request_error", "message": "Unrecognized request URL"}})
+
+            def do_GET(self):
+                time.sleep(fake.latency)
+                prefix = "/v1/checkout/sessions/"
+                if self.path.startswith(prefix):
+                    self._reply(*fake._retrieve(self.path[len(prefix):].split("?")[0]))
+                else:
+                    self._reply(404, {"error": {"type": "invalid_request_error", "message": "Unrecognized request URL"}})
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def stop(self):
+        self.server.shutdown()
+
+
+# --- Dane wejściowe ---
+
+def guess_variable_types(df):
+    """Proste typy zmiennych dla backendu: liczbowe 0/1 -> binarna, liczbowe -> ciągła, mało poziomów -> nominalna."""
+    types = {}
+    for col in df.columns:
+        unique = df[col].dropna().unique()
+        if pd.api.types.is_numeric_dtype(df[col]):
+            types[col] = "binarna" if len(unique) == 2 else "ciągła"
+        elif len(unique) <= 20:
+            types[col] = "binarna" if len(unique) == 2 else "nominalna"
+        else:
+            types[col] = "pomiń"
+    return types
+
+
+def load_upload(name, upload_kb):
+    """Zawartość pliku z test_datasets (powielona do ok. upload_kb KB) i typy zmiennych."""
+    with open(os.path.join(DATASETS_DIR, name), "rb") as f:
+        content = f.read()
+    df = pd.read_csv(io.BytesIO(content))
+    if upload_kb and len(content) < upload_kb * 1024:
+        copies = -(-upload_kb * 1024 // len(content))
+        content = pd.concat([df] * copies, ignore_index=True).to_csv(index=False).encode("utf-8")
+    strategy = "impute" if df.isnull().values.any() else "none"
+    return {"name": name, "content": content, "variable_types": guess_variable_types(df), "strategy": strategy}
+
+
+# --- Serwer aplikacji i pomiar pamięci ---
+
+def start_app(port, workers, stripe_url):
+    env = dict(os.environ, STRIPE_API_KEY="sk_test_loadtest", STRIPE_API_BASE=stripe_url, REPORT_WORKERS=str(workers))
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=APP_DIR, env=env,
+    )
+
+
+def wait_ready(base_url, server, timeout):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"Serwer zakończył działanie z kodem {server.returncode}.")
+        try:
+            response = httpx.get(f"{base_url}/api/health/ready", timeout=2)
+            if response.status_code == 200:
+                return response.json()
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    raise TimeoutError(f"Serwer nie zgłosił gotowości w ciągu {timeout} s.")
+
+
+class MemorySampler:
+    """Szczytowe RSS procesu serwera i jego procesów potomnych (procesy raportowe, forkserver)."""
+
+    def __init__(self, pid, interval=0.2):
+        self.root = psutil.Process(pid)
+        self.interval = interval
+        self.peaks = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _role(self, proc):
+        if proc.pid == self.root.pid:
+            return "server"
+        cmdline = " ".join(proc.cmdline())
+        if "forkserver" in cmdline:
+            # Procesy robocze są forkowane z forkservera i dziedziczą jego wiersz poleceń
+            parent = proc.parent()
+            return "report_worker" if parent and "forkserver" in " ".join(parent.cmdline()) else "forkserver"
+        if "resource_tracker" in cmdline:
+            return "resource_tracker"
+        return "report_worker"
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                procs = [self.root] + self.root.children(recursive=True)
+            except psutil.NoSuchProcess:
+                return
+            for proc in procs:
+                try:
+                    rss = proc.memory_info().rss
+                    entry = self.peaks.setdefault(proc.pid, {"pid": proc.pid, "role": self._role(proc), "peak_rss_bytes": 0})
+                    entry["peak_rss_bytes"] = max(entry["peak_rss_bytes"], rss)
+                except psutil.NoSuchProcess:
+                    pass
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+# --- Przepływy ---
+
+async def run_flow(client, upload, results):
+    """Jeden przepływ: podgląd, utworzenie sesji płatności, generowanie raportu."""
+    files = {"file": (upload["name"], upload["content"], "text/csv")}
+
+    async def step(name, request):
+        start = time.perf_counter()
+        try:
+            response = await request
+            status = response.status_code
+        except httpx.HTTPError as e:
+            response, status = None, type(e).__name__
+        results.append({"step": name, "status": status, "latency_s": time.perf_counter() - start, "bytes": len(upload["content"])})
+        return response
+
+    response = await step("preview", client.post("/api/parse-preview", files=files))
+    if response is None or response.status_code != 200:
+        return
+    # Jak frontend: płatność odwołuje się do pliku tokenem z podglądu, bez ponownego przesłania
+    response = await step("payment", client.post("/api/create-payment-session", data={
+        "upload_token": response.json()["upload_token"],
+        "variable_types_json": json.dumps(upload["variable_types"]),
+        "missing_data_strategy": upload["strategy"],
+    }))
+    if response is None or response.status_code != 200:
+        return
+    await step("report", client.post("/api/generate-report", json={"session_id": response.json()["id"]}))
+
+
+async def drive(base_url, uploads, flows, concurrency, timeout):
+    results = []
+    queue = asyncio.Queue()
+    for upload in itertools.islice(itertools.cycle(uploads), flows):
+        queue.put_nowait(upload)
+
+    async def user(client):
+        while not queue.empty():
+            await run_flow(client, queue.get_nowait(), results)
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(user(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    return results, elapsed
+
+
+def summarize(results, elapsed, flows):
+    summary = {"flows": flows, "elapsed_s": round(elapsed, 3), "steps": {}}
+    for name in STEPS:
+        step_results = [r for r in results if r["step"] == name]
+        if not step_results:
+            continue
+        latencies = np.array([r["latency_s"] for r in step_results])
+        statuses = {}
+        for r in step_results:
+            statuses[str(r["status"])] = statuses.get(str(r["status"]), 0) + 1
+        summary["steps"][name] = {
+            "requests": len(step_results),
+            "p50_s": round(float(np.percentile(latencies, 50)), 4),
+            "p95_s": round(float(np.percentile(latencies, 95)), 4),
+            "p99_s": round(float(np.percentile(latencies, 99)), 4),
+            "max_s": round(float(latencies.max()), 4),
+            "statuses": statuses,
+        }
+    completed = sum(1 for r in results if r["step"] == "report" and r["status"] == 200)
+    summary["completed_reports"] = completed
+    summary["throughput_reports_per_s"] = round(completed / elapsed, 4) if elapsed else None
+    summary["throughput_requests_per_s"] = round(len(results) / elapsed, 4) if elapsed else None
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Test obciążeniowy ścieżki podgląd -> płatność -> raport.")
+    parser.add_argument("--datasets", nargs="+", default=["mtcars.csv", "iris.csv", "titanic.csv"])
+    parser.add_argument("--upload-kb", type=int, default=0, help="powiel wiersze pliku do co najmniej tylu KB (0 = bez zmian)")
+    parser.add_argument("--flows", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--workers", type=int, default=1, help="REPORT_WORKERS dla uruchamianego serwera")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--stripe-latency-ms", type=float, default=100)
+    parser.add_argument("--unpaid-ratio", type=float, default=0.0, help="odsetek sesji, które pozostaną nieopłacone (oczekiwane 402)")
+    parser.add_argument("--ready-timeout", type=float, default=300)
+    parser.add_argument("--request-timeout", type=float, default=600)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="plik JSON z wynikami")
+    args = parser.parse_args()
+
+    uploads = [load_upload(name, args.upload_kb) for name in args.datasets]
+    fake_stripe = FakeStripe(args.stripe_latency_ms, args.unpaid_ratio, args.seed)
+    fake_stripe.start()
+    base_url = f"http://127.0.0.1:{args.port}"
+    server = start_app(args.port, args.workers, fake_stripe.url)
+    try:
+        ready = wait_ready(base_url, server, args.ready_timeout)
+        print(f"Serwer gotowy: {ready}")
+        with MemorySampler(server.pid) as memory:
+            results, elapsed = asyncio.run(drive(base_url, uploads, args.flows, args.concurrency, args.request_timeout))
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            server.kill()
+        fake_stripe.stop()
+
+    summary = summarize(results, elapsed, args.flows)
+    summary["config"] = {key: value for key, value in vars(args).items() if key != "output"}
+    summary["uploads"] = [{"name": u["name"], "bytes": len(u["content"])} for u in uploads]
+    summary["memory"] = sorted(memory.peaks.values(), key=lambda entry: entry["pid"])
+
+    print(f"Przepływy: {args.flows}, współbieżność: {args.concurrency}, czas: {summary['elapsed_s']} s")
+    print(f"Przepustowość: {summary['throughput_reports_per_s']} raportów/s, {summary['throughput_requests_per_s']} żądań/s")
+    for name, step in summary["steps"].items():
+        print(f"  {name:8s} n={step['requests']:4d}  p50={step['p50_s']:.3f} s  p95={step['p95_s']:.3f} s  "
+              f"p99={step['p99_s']:.3f} s  kody={step['statuses']}")
+    for entry in summary["memory"]:
+        print(f"  pamięć {entry['role']:16s} pid={entry['pid']:7d}  szczyt RSS={entry['peak_rss_bytes'] / 2 ** 20:.0f} MB")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+        print(f"Zapisano wyniki do {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Pamięć podręczna statystyk dostatecznych dla jednego raportu.
+
+Średnie, wariancje oraz pełna macierz iloczynów krzyżowych (macierz Grama)
+kolumn ciągłych są liczone raz, z obsługą braków danych parami (dla każdej
+pary kolumn osobne liczebności, średnie i sumy kwadratów na wierszach
+kompletnych). Dla kolumn binarnych dodatkowo przechowywane są sumy w grupach,
+dzięki czemu momenty potrzebne w regresji i teście t nie wymagają
+ponownego przeglądania surowych wierszy.
+
+Sumy są zbierane blokami wierszy: poza wartościami kolumn i maską obecności
+(bool) pomocnicze macierze (maska jako liczby, wartości centrowane, ich
+kwadraty, wskaźniki grup) istnieją tylko dla bieżącego bloku, najwyżej
+BLOCK_BYTES bajtów każda, a nie n×p liczb float64 każda.
+"""
+import numpy as np
+import pandas as pd
+
+BLOCK_BYTES = 16 * 1024 * 1024
+
+
+def _row_blocks(n_rows, n_cols):
+    step = max(1, BLOCK_BYTES // (8 * max(n_cols, 1)))
+    return (slice(start, start + step) for start in range(0, n_rows, step))
+
+
+class SufficientStatistics:
+    def __init__(self, df: pd.DataFrame, continuous_cols: list, binary_cols: list = ()):
+        self.columns = list(continuous_cols)
+        self.index = {col: i for i, col in enumerate(self.columns)}
+
+        X = df[self.columns].to_numpy(dtype=np.float64)
+        self.values = X
+        present = ~np.isnan(X)
+        self.present = present
+        n, p = X.shape
+
+        self.count = present.sum(axis=0)
+        total = np.zeros(p)
+        for rows in _row_blocks(n, p):
+            total += np.where(present[rows], X[rows], 0.0).sum(axis=0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            self.mean = total / self.count
+        # Centrowanie średnimi kolumn poprawia stabilność numeryczną sum kwadratów
+        self.center = np.nan_to_num(self.mean)
+
+        # Kody grup dla kolumn binarnych (grupa 1 = pierwszy poziom w kolumnie, -1 = brak)
+        self.binary_index = {}
+        binary_codes = []
+        for col in binary_cols:
+            codes, levels = pd.factorize(df[col])
+            if len(levels) != 2:
+                continue
+            self.binary_index[col] = len(binary_codes)
+            binary_codes.append(codes)
+        codes = np.column_stack(binary_codes) if binary_codes else np.empty((n, 0), dtype=np.intp)
+        k = codes.shape[1]
+
+        self.pair_count = np.zeros((p, p))
+        self._sum = np.zeros((p, p))     # [i, j]: suma z_i na wierszach, gdzie obecne i oraz j
+        self._sum_sq = np.zeros((p, p))  # [i, j]: suma z_i^2 na tych samych wierszach
+        self.gram = np.zeros((p, p))     # [i, j]: suma z_i * z_j na wierszach kompletnych
+        group_sums = [np.zeros((p, k)) for _ in range(6)]
+        for rows in _row_blocks(n, p + 2 * k):
+            mask = present[rows].astype(np.float64)
+            Z = np.where(present[rows], X[rows] - self.center, 0.0)
+            Z2 = Z * Z
+            self.pair_count += mask.T @ mask
+            self._sum += Z.T @ mask
+            self._sum_sq += Z2.T @ mask
+            self.gram += Z.T @ Z
+            if k:
+                ind = (codes[rows] == 0).astype(np.float64)
+                ind_present = (codes[rows] >= 0).astype(np.float64)
+                for group_total, (left, right) in zip(group_sums, [(mask, ind), (Z, ind), (Z2, ind),
+                                                             (mask, ind_present), (Z, ind_present), (Z2, ind_present)]):
+                    group_total += left.T @ right
+        (self._g1_count, self._g1_sum, self._g1_sum_sq,
+         self._gt_count, self._gt_sum, self._gt_sum_sq) = group_sums
+        with np.errstate(invalid="ignore", divide="ignore"):
+            self.var = np.diag(self._sum_sq) / (self.count - 1) - np.diag(self._sum) ** 2 / (self.count * (self.count - 1))
+
+    def complete_rows(self, col1, col2):
+        """Indeksy wierszy, w których obie kolumny mają wartości."""
+        i, j = self.index[col1], self.index[col2]
+        return np.flatnonzero(self.present[:, i] & self.present[:, j])
+
+    def pair(self, col1, col2):
+        """(n, średnia x, średnia y, Sxx, Syy, Sxy) na wierszach kompletnych dla pary kolumn."""
+        i, j = self.index[col1], self.index[col2]
+        n = self.pair_count[i, j]
+        if n == 0:
+            return 0, np.nan, np.nan, 0.0, 0.0, 0.0
+        sum_x, sum_y = self._sum[i, j], self._sum[j, i]
+        sxx = self._sum_sq[i, j] - sum_x * sum_x / n
+        syy = self._sum_sq[j, i] - sum_y * sum_y / n
+        sxy = self.gram[i, j] - sum_x * sum_y / n
+        return int(n), sum_x / n + self.center[i], sum_y / n + self.center[j], sxx, syy, sxy
+
+    def group_moments(self, col, bin_col):
+        """Liczebności, średnie i M2 kolumny ciągłej w dwóch grupach zmiennej binarnej."""
+        i, b = self.index[col], self.binary_index[bin_col]
+        n1, s1, q1 = self._g1_count[i, b], self._g1_sum[i, b], self._g1_sum_sq[i, b]
+        n0 = self._gt_count[i, b] - n1
+        s0 = self._gt_sum[i, b] - s1
+        q0 = self._gt_sum_sq[i, b] - q1
+        n = np.array([n1, n0])
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean_centered = np.array([s1, s0]) / n
+        m2 = np.array([q1, q0]) - n * mean_centered ** 2
+        return n, mean_centered + self.center[i], m2
@@ -0,0 +1,137 @@
+"""
+Mapa braków danych liczona raz przy wczytaniu pliku.
+
+Dla każdej kolumny przechowywana jest spakowana maska braków (1 bit na
+wiersz, np.packbits), więc mapa dla miliona wierszy i 30 kolumn zajmuje
+około 4 MB. Z tej jednej mapy podgląd odczytuje liczbę braków w kolumnach,
+pierwsze lokalizacje braków, skutki strategii usuwania (ile wierszy usunie
+'delete_rows', ile kolumn 'delete_cols') oraz najczęstsze wzorce
+współwystępowania braków, a raport - czy i które wiersze zawierają braki,
+bez ponownego skanowania ramki.
+"""
+import numpy as np
+import pandas as pd
+
+# Liczba ustawionych bitów dla każdej wartości bajtu
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+# Mnożnik skrótu wzorca braków, gdy kolumn z brakami jest więcej niż bitów klucza
+_PATTERN_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+
+
+class NullBitmap:
+    def __init__(self, columns, n_rows, bits):
+        self.columns = list(columns)
+        self.n_rows = n_rows
+        self.bits = bits  # uint8, kształt (liczba kolumn, ceil(n_rows / 8))
+        self.counts = _POPCOUNT[bits].sum(axis=1, dtype=np.int64) if bits.size else np.zeros(len(self.columns), dtype=np.int64)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame):
+        n_bytes = -(-len(df) // 8)
+        bits = np.zeros((len(df.columns), n_bytes), dtype=np.uint8)
+        for i in range(len(df.columns)):
+            bits[i] = np.packbits(df.iloc[:, i].isnull().to_numpy())
+        return cls(df.columns, len(df), bits)
+
+    @classmethod
+    def concat(cls, bitmaps):
+        """Mapa całego pliku z map kolejnych porcji wierszy (każda porcja poza ostatnią ma wielokrotność 8 wierszy)."""
+        if any(bitmap.n_rows % 8 for bitmap in bitmaps[:-1]):
+            raise ValueError("Porcje wierszy (poza ostatnią) muszą mieć wielokrotność 8 wierszy.")
+        n_rows = sum(bitmap.n_rows for bitmap in bitmaps)
+        bits = np.concatenate([bitmap.bits for bitmap in bitmaps], axis=1)
+        return cls(bitmaps[0].columns, n_rows, bits)
+
+    def select(self, columns):
+        """Mapa tylko wskazanych kolumn (np. gdy raport wczytuje część kolumn); None, gdy mapa nie obejmuje którejś z nich."""
+        positions = {col: i for i, col in enumerate(self.columns)}
+        if any(col not in positions for col in columns):
+            return None
+        return NullBitmap(columns, self.n_rows, self.bits[[positions[col] for col in columns]])
+
+    def matches(self, df: pd.DataFrame):
+        """Czy mapa opisuje tę ramkę (te same kolumny i liczba wierszy)."""
+        return self.n_rows == len(df) and self.columns == list(df.columns)
+
+    @property
+    def total(self):
+        return int(self.counts.sum())
+
+    def columns_with_missing(self):
+        return [col for col, count in zip(self.columns, self.counts) if count > 0]
+
+    def _any_bits(self):
+        if not len(self.columns):
+            return np.zeros(-(-self.n_rows // 8), dtype=np.uint8)
+        return np.bitwise_or.reduce(self.bits, axis=0)
+
+    def row_mask(self):
+        """Maska wierszy zawierających co najmniej jeden brak."""
+        return np.unpackbits(self._any_bits(), count=self.n_rows).astype(bool)
+
+    def rows_with_missing(self):
+        return int(_POPCOUNT[self._any_bits()].sum(dtype=np.int64))
+
+    def first_locations(self, limit=5):
+        """Pierwsze braki w kolejności wierszy, potem kolumn: lista (indeks wiersza, nazwa kolumny)."""
+        locations = []
+        any_bits = self._any_bits()
+        for byte_index in np.flatnonzero(any_bits):
+            block = np.unpackbits(self.bits[:, byte_index]).reshape(len(self.columns), 8)
+            for offset, col_idx in sorted((offset, col) for col, offset in zip(*np.nonzero(block))):
+                locations.append((byte_index * 8 + offset, self.columns[col_idx]))
+                if len(locations) >= limit:
+                    return locations
+        return locations
+
+    def patterns(self, limit=5):
+        """Najczęstsze wzorce braków: lista (kolumny z brakami w wierszu, liczba takich wierszy)."""
+        missing_cols = np.flatnonzero(self.counts)
+        if not len(missing_cols):
+            return []
+        rows = np.flatnonzero(self.row_mask())
+        # Klucz zbioru kolumn z brakami w każdym wierszu, liczony kolumna po kolumnie (pamięć O(liczba wierszy)):
+        # dokładna maska bitowa do 64 kolumn z brakami, powyżej skrót wielomianowy
+        exact = len(missing_cols) <= 64
+        key = np.zeros(len(rows), dtype=np.uint64)
+        for position, col_idx in enumerate(missing_cols):
+            bit = np.unpackbits(self.bits[col_idx], count=self.n_rows)[rows].astype(np.uint64)
+            if exact:
+                key |= bit << np.uint64(position)
+            else:
+                key = key * _PATTERN_MULTIPLIER + bit
+        _, first, counts = np.unique(key, return_index=True, return_counts=True)
+        order = np.argsort(-counts, kind="stable")[:limit]
+        result = []
+        for i in order:
+            row = rows[first[i]]
+            byte_index, offset = divmod(row, 8)
+            cols = [self.columns[c] for c in missing_cols if self.bits[c, byte_index] & (0x80 >> offset)]
+            result.append((cols, int(counts[i])))
+        return result
+
+    def summary(self, pattern_limit=5):
+        """Opis braków do podglądu: liczby w kolumnach, skutki strategii usuwania i wzorce współwystępowania."""
+        rows_with_missing = self.rows_with_missing()
+        n_rows = max(self.n_rows, 1)
+        return {
+            "total_rows": self.n_rows,
+            "total_missing": self.total,
+            "missing_counts": {
+                col: {"count": int(count), "percent": round(100 * count / n_rows, 2)}
+                for col, count in zip(self.columns, self.counts) if count > 0
+            },
+            "delete_rows_impact": {
+                "rows_removed": rows_with_missing,
+                "rows_remaining": self.n_rows - rows_with_missing,
+                "percent_removed": round(100 * rows_with_missing / n_rows, 2),
+            },
+            "delete_cols_impact": {
+                "columns_removed": len(self.columns_with_missing()),
+                "columns_remaining": len(self.columns) - len(self.columns_with_missing()),
+            },
+            "patterns": [
+                {"columns": cols, "rows": count, "percent": round(100 * count / n_rows, 2)}
+                for cols, count in self.patterns(pattern_limit)
+            ],
+        }
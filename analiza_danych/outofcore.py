@@ -0,0 +1,554 @@
+"""
+Tryb dla plików większych niż pamięć instancji (out-of-core).
+
+Gdy szacunek pamięci raportu (admission.estimate_report_memory) przekracza
+budżet instancji, plik nie jest wczytywany w całości: raport czyta go
+porcjami po OUT_OF_CORE_CHUNK_ROWS wierszy (tylko analizowane kolumny)
+i każdą porcję dolicza do statystyk, które dają się scalać:
+- sumy, sumy kwadratów i iloczyny krzyżowe kolumn ciągłych parami (przesunięte
+  o średnie z pierwszej porcji, jak centrowanie w moments.py) - regresja
+  i korelacja ze statystyk dostatecznych (regression.fit_from_moments),
+- te same sumy w dwóch grupach każdej zmiennej binarnej - test t z momentów
+  grup (kernels.ttest_from_moments),
+- tabele kontyngencji par zmiennych kategorycznych, rozszerzane o nowe
+  poziomy; kolumna z więcej niż MAX_TRACKED_LEVELS poziomami przestaje być
+  śledzona, a o jej losie decydują szkice z sketches.py,
+- powtarzalna losowa próba wierszy (reservoir, OUT_OF_CORE_SAMPLE_ROWS
+  wierszy, klucze losowe z ziarnem) - diagnostyka założeń (Shapiro-Wilk,
+  Levene, Breusch-Pagan), testy rangowe (U Manna-Whitneya, Spearman)
+  oraz część opisowa raportu (ProfileReport).
+Pamięć raportu zależy więc od rozmiaru porcji i próby, a nie od liczby
+wierszy pliku. Podgląd dużego pliku również czyta go porcjami (mapa braków
+z nullmap.NullBitmap.concat, typy i podgląd z pierwszej porcji).
+
+Strategie braków danych: 'none', 'delete_rows', 'delete_cols' w jednym
+przebiegu, 'impute' w dwóch (mediany z losowej próby, dominanty ze szkiców).
+Strategie imputacji zależne od innych wierszy (imputation.py) wymagają całej
+ramki w pamięci i w tym trybie są niedostępne.
+
+Konfiguracja: OUT_OF_CORE_MODE ('auto' - domyślnie, 'always', 'never'),
+OUT_OF_CORE_CHUNK_ROWS (domyślnie 200000), OUT_OF_CORE_SAMPLE_ROWS
+(domyślnie 50000), OUT_OF_CORE_SEED (domyślnie 0). Maksymalny rozmiar
+przesyłanego pliku nadal ogranicza MAX_UPLOAD_MB (uploads.py).
+"""
+import html
+import itertools
+import os
+
+import numpy as np
+import pandas as pd
+
+import admission
+import corrections
+import nullmap
+import sketches
+import tracing
+import uploads
+
+OUT_OF_CORE_MODE = os.getenv("OUT_OF_CORE_MODE", "auto")
+# Wielokrotność 8, aby mapy braków kolejnych porcji dało się złączyć bajt do bajtu (nullmap.NullBitmap.concat)
+OUT_OF_CORE_CHUNK_ROWS = -(-int(os.getenv("OUT_OF_CORE_CHUNK_ROWS", "200000")) // 8) * 8
+OUT_OF_CORE_SAMPLE_ROWS = int(os.getenv("OUT_OF_CORE_SAMPLE_ROWS", "50000"))
+OUT_OF_CORE_SEED = int(os.getenv("OUT_OF_CORE_SEED", "0"))
+
+if OUT_OF_CORE_MODE not in ("auto", "always", "never"):
+    raise ValueError("OUT_OF_CORE_MODE musi mieć wartość 'auto', 'always' lub 'never'.")
+
+
+
+class MissingValuesFound(ValueError):
+    pass
+
+
+# Powyżej tej liczby poziomów kolumna nie ma tabel kontyngencji (szkic i tak ją zwinie albo pominie)
+MAX_TRACKED_LEVELS = sketches.TOPK_CAPACITY
+STRATEGIES = ("none", "delete_rows", "delete_cols", "impute")
+CATEGORICAL_TYPES = ("nominalna", "porządkowa", "kategoryczna", "binarna")
+
+
+def use_out_of_core(estimate, memory_budget):
+    """Czy raport (o szacowanej pamięci `estimate` w trybie zwykłym) liczyć porcjami."""
+    if OUT_OF_CORE_MODE == "always":
+        return True
+    if OUT_OF_CORE_MODE == "never":
+        return False
+    return estimate > memory_budget
+
+
+def estimate_memory(upload, variable_types):
+    """Szacunek pamięci raportu w trybie porcjami: porcja danych i losowa próba zamiast całego pliku."""
+    return admission.estimate_streaming_memory(upload, variable_types, OUT_OF_CORE_CHUNK_ROWS + OUT_OF_CORE_SAMPLE_ROWS)
+
+
+def _scan(upload, state, columns=None, **csv_kwargs):
+    """Przekazuje kolejne porcje pliku do state.update(); przy błędzie dekodowania UTF-8 zaczyna od nowa w latin1."""
+    for encoding in ("utf-8", "latin1"):
+        current = state()
+        try:
+            for chunk in uploads.read_chunks(upload, OUT_OF_CORE_CHUNK_ROWS, columns, encoding, **csv_kwargs):
+                current.update(chunk)
+            return current
+        except UnicodeDecodeError:
+            if encoding == "latin1":
+                raise
+
+
+# --- Podgląd ---
+
+class _PreviewScan:
+    def __init__(self):
+        self.head = None
+        self.bitmaps = []
+
+    def update(self, chunk):
+        if self.head is None:
+            self.head = chunk
+        self.bitmaps.append(nullmap.NullBitmap.from_frame(chunk))
+
+
+def scan_preview(upload):
+    """Pierwsza porcja pliku (podgląd, podpowiedzi typów) i mapa braków całego pliku, bez wczytywania go w całości."""
+    scan = _scan(upload, _PreviewScan)
+    return scan.head, nullmap.NullBitmap.concat(scan.bitmaps)
+
+
+# --- Statystyki scalane porcja po porcji ---
+
+class Reservoir:
+    """Powtarzalna losowa próba wierszy stałej wielkości: wiersze o najmniejszych kluczach losowych."""
+
+    def __init__(self, size=OUT_OF_CORE_SAMPLE_ROWS, seed=OUT_OF_CORE_SEED):
+        self.size = size
+        self.rng = np.random.default_rng(seed)
+        self.keys = np.empty(0)
+        self.frame = None
+        self.seen = 0
+
+    def update(self, chunk):
+        keys = self.rng.random(len(chunk))
+        self.seen += len(chunk)
+        if self.frame is not None and len(self.keys) >= self.size:
+            take = keys < self.keys.max()
+            chunk, keys = chunk[take], keys[take]
+        frame = chunk if self.frame is None else pd.concat([self.frame, chunk], ignore_index=True)
+        keys = np.concatenate([self.keys, keys])
+        if len(keys) > self.size:
+            # Zachowana kolejność wierszy z pliku (np. kolejność poziomów zmiennej binarnej)
+            keep = np.sort(np.argpartition(keys, self.size - 1)[:self.size])
+            frame, keys = frame.iloc[keep], keys[keep]
+        self.frame = frame.reset_index(drop=True)
+        self.keys = keys
+
+
+class StreamingStatistics:
+    def __init__(self, continuous_cols, binary_cols, categorical_cols):
+        self.continuous = list(continuous_cols)
+        self.binary = list(binary_cols)
+        self.categorical = list(categorical_cols)
+        # Pozycje w macierzach momentów są stałe, także gdy 'delete_cols' usunie potem część kolumn z list
+        self.index = {col: i for i, col in enumerate(self.continuous)}
+        self.binary_index = {col: k for k, col in enumerate(self.binary)}
+        self.columns = list(dict.fromkeys(self.continuous + self.binary + self.categorical))
+        p, b = len(self.continuous), len(self.binary)
+
+        self.rows = 0
+        self.shift = None
+        self.pair_count = np.zeros((p, p))
+        self._sum = np.zeros((p, p))
+        self._sum_sq = np.zeros((p, p))
+        self.gram = np.zeros((p, p))
+
+        # Poziomy zmiennych binarnych w kolejności wystąpienia (grupa 1 = pierwszy poziom, jak w moments.py)
+        self.binary_levels = {col: [] for col in self.binary}
+        self._group_count = np.zeros((2, p, b))
+        self._group_sum = np.zeros((2, p, b))
+        self._group_sum_sq = np.zeros((2, p, b))
+
+        self.levels = {col: [] for col in self.categorical}
+        self.overflow = set()
+        self.tables = {pair: np.zeros((0, 0), dtype=np.int64) for pair in itertools.combinations(self.categorical, 2)}
+        self.sketches = {col: sketches.ColumnSketch() for col in self.categorical}
+        self.sample = Reservoir()
+
+    def update(self, chunk):
+        import kernels
+
+        self.rows += len(chunk)
+        self.sample.update(chunk)
+        if self.continuous:
+            self._update_moments(chunk)
+        codes = {col: self._codes(col, chunk[col]) for col in self.categorical}
+        for (col1, col2), table in list(self.tables.items()):
+            if col1 in self.overflow or col2 in self.overflow:
+                continue
+            k1, k2 = len(self.levels[col1]), len(self.levels[col2])
+            if table.shape != (k1, k2):
+                table = np.pad(table, ((0, k1 - table.shape[0]), (0, k2 - table.shape[1])))
+            self.tables[col1, col2] = table + kernels.contingency_table(codes[col1], codes[col2], k1, k2)
+        for col in self.categorical:
+            self.sketches[col].update(chunk[col])
+
+    def _update_moments(self, chunk):
+        X = chunk[self.continuous].to_numpy(dtype=np.float64)
+        present = ~np.isnan(X)
+        if self.shift is None:
+            with np.errstate(invalid="ignore", divide="ignore"):
+                self.shift = np.nan_to_num(np.where(present, X, 0.0).sum(axis=0) / present.sum(axis=0))
+        mask = present.astype(np.float64)
+        Z = np.where(present, X - self.shift, 0.0)
+        Z2 = Z * Z
+        self.pair_count += mask.T @ mask
+        self._sum += Z.T @ mask
+        self._sum_sq += Z2.T @ mask
+        self.gram += Z.T @ Z
+
+        for k, col in enumerate(self.binary):
+            values = chunk[col].to_numpy(dtype=np.float64)
+            levels = self.binary_levels[col]
+            if len(levels) < 3:
+                for level in pd.unique(values[~np.isnan(values)]):
+                    if level not in levels:
+                        levels.append(level)
+            for g, level in enumerate(levels[:2]):
+                indicator = (values == level).astype(np.float64)
+                self._group_count[g, :, k] += mask.T @ indicator
+                self._group_sum[g, :, k] += Z.T @ indicator
+                self._group_sum_sq[g, :, k] += Z2.T @ indicator
+
+    def _codes(self, col, values):
+        """Kody poziomów w porcji (braki = -1); nowe poziomy są dopisywane na koniec listy."""
+        if col in self.overflow:
+            return None
+        levels = self.levels[col]
+        uniques = pd.unique(values.dropna())
+        new = uniques[pd.Index(levels).get_indexer(uniques) < 0] if levels else uniques
+        levels.extend(new)
+        if len(levels) > MAX_TRACKED_LEVELS:
+            self.overflow.add(col)
+            for pair in [pair for pair in self.tables if col in pair]:
+                del self.tables[pair]
+            return None
+        return pd.Index(levels).get_indexer(values)
+
+    def drop_columns(self, dropped):
+        """Pomija kolumny w testach (strategia 'delete_cols'); pozycje w macierzach momentów się nie zmieniają."""
+        self.continuous = [col for col in self.continuous if col not in dropped]
+        self.binary = [col for col in self.binary if col not in dropped]
+        self.categorical = [col for col in self.categorical if col not in dropped]
+        self.tables = {pair: table for pair, table in self.tables.items() if not set(pair) & set(dropped)}
+
+    def sample_frame(self):
+        """Losowa próba wierszy (pusta ramka z kolumnami, gdy plik nie ma wierszy danych)."""
+        return self.sample.frame if self.sample.frame is not None else pd.DataFrame(columns=self.columns)
+
+    def pair(self, col1, col2):
+        """(n, średnia x, średnia y, Sxx, Syy, Sxy) na wierszach kompletnych, jak moments.SufficientStatistics.pair."""
+        i, j = self.index[col1], self.index[col2]
+        n = self.pair_count[i, j]
+        if n == 0:
+            return 0, np.nan, np.nan, 0.0, 0.0, 0.0
+        sum_x, sum_y = self._sum[i, j], self._sum[j, i]
+        sxx = self._sum_sq[i, j] - sum_x * sum_x / n
+        syy = self._sum_sq[j, i] - sum_y * sum_y / n
+        sxy = self.gram[i, j] - sum_x * sum_y / n
+        return int(n), sum_x / n + self.shift[i], sum_y / n + self.shift[j], sxx, syy, sxy
+
+    def group_moments(self, col, bin_col):
+        """Liczebności, średnie i M2 kolumny ciągłej w dwóch grupach zmiennej binarnej."""
+        i, k = self.index[col], self.binary_index[bin_col]
+        n = self._group_count[:, i, k]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean_shifted = self._group_sum[:, i, k] / n
+        m2 = self._group_sum_sq[:, i, k] - n * mean_shifted ** 2
+        return n, mean_shifted + self.shift[i], m2
+
+    def table(self, col1, col2, plans):
+        """Tabela kontyngencji pary po zwinięciu rzadkich poziomów według planów ze szkiców."""
+        observed = self.tables[col1, col2]
+        k1, k2 = len(self.levels[col1]), len(self.levels[col2])
+        observed = np.pad(observed, ((0, k1 - observed.shape[0]), (0, k2 - observed.shape[1])))
+        for axis, col in enumerate((col1, col2)):
+            action, levels, _ = plans[col]
+            if action == "collapse":
+                keep = pd.Index(self.levels[col]).get_indexer(levels)
+                rest = np.setdiff1d(np.arange(observed.shape[axis]), keep)
+                other = observed.take(rest, axis=axis).sum(axis=axis, keepdims=True)
+                observed = np.concatenate([observed.take(keep, axis=axis), other], axis=axis)
+        return observed
+
+
+# --- Obsługa braków danych porcjami ---
+
+class _ImputeScan:
+    """Pierwszy przebieg strategii 'impute': liczby braków, próba wartości liczbowych i szkice kategorii."""
+
+    def __init__(self, numeric_cols, columns):
+        self.numeric = numeric_cols
+        self.columns = columns
+        self.null_counts = pd.Series(0, index=columns, dtype=np.int64)
+        self.sample = Reservoir()
+        self.sketches = {col: sketches.ColumnSketch() for col in columns if col not in numeric_cols}
+
+    def update(self, chunk):
+        self.null_counts += chunk.isnull().sum()
+        for col in self.numeric:
+            chunk[col] = pd.to_numeric(chunk[col], errors="coerce")
+        self.sample.update(chunk[self.numeric])
+        for col, sketch in self.sketches.items():
+            sketch.update(chunk[col])
+
+    def fill_values(self):
+        cols_with_missing = [col for col in self.columns if self.null_counts[col] > 0]
+        fills = {}
+        self.median_rows = len(self.sample.keys)
+        for col in cols_with_missing:
+            if col in self.numeric:
+                fills[col] = self.sample.frame[col].median()
+            else:
+                top = self.sketches[col].topk.top(1)
+                fills[col] = top.index[0] if len(top) else np.nan
+        return fills
+
+
+class _MissingData:
+    """Strategia braków danych stosowana do każdej porcji przed doliczeniem jej do statystyk."""
+
+    def __init__(self, strategy, numeric_cols, fills=None, median_rows=0):
+        self.strategy = strategy
+        self.numeric = numeric_cols
+        self.fills = fills or {}
+        self.median_rows = median_rows
+        self.rows_removed = 0
+        self.cols_with_missing = set()
+
+    def apply(self, chunk):
+        if self.strategy == "none":
+            if chunk.isnull().values.any():
+                raise MissingValuesFound("Wybrano opcję 'brak braków danych', ale plik zawiera brakujące wartości. Proszę oczyścić dane lub wybrać inną strategię.")
+        elif self.strategy == "delete_rows":
+            rows = len(chunk)
+            chunk = chunk.dropna(axis=0)
+            self.rows_removed += rows - len(chunk)
+        elif self.strategy == "delete_cols":
+            nulls = chunk.isnull().any()
+            self.cols_with_missing.update(nulls.index[nulls])
+        # isetitem: porcja po dropna jest nową ramką, zamiana kolumny nie wymaga ostrzeżenia SettingWithCopy
+        for col in self.numeric:
+            chunk.isetitem(chunk.columns.get_loc(col), pd.to_numeric(chunk[col], errors="coerce"))
+        if self.fills:
+            with pd.option_context("future.no_silent_downcasting", True):
+                chunk = chunk.fillna(value=self.fills)
+        return chunk
+
+    def info(self):
+        if self.strategy == "none":
+            return "Sprawdzono - plik nie zawiera brakujących wartości."
+        if self.strategy == "delete_rows":
+            if not self.rows_removed:
+                return "Nie znaleziono wierszy z brakującymi wartościami do usunięcia."
+            return f"Usunięto {self.rows_removed} wierszy zawierających brakujące wartości."
+        if self.strategy == "delete_cols":
+            if not self.cols_with_missing:
+                return "Nie znaleziono kolumn z brakującymi wartościami do usunięcia."
+            return f"Usunięto kolumny z brakującymi wartościami: {', '.join(sorted(map(str, self.cols_with_missing)))}."
+        if not self.fills:
+            return "Nie znaleziono brakujących wartości do uzupełnienia."
+        imputed_cols = [
+            f"{col} (medianą: {value:.2f})" if col in self.numeric else f"{col} (dominantą: {value})"
+            for col, value in self.fills.items()
+        ]
+        info = f"Uzupełniono brakujące wartości w kolumnach: {', '.join(imputed_cols)}."
+        if any(col in self.numeric for col in self.fills):
+            info += f" Mediany oszacowano na losowej próbie {self.median_rows} wierszy."
+        return info
+
+
+class _ReportScan:
+    def __init__(self, strategy, fills, median_rows, continuous, binary, categorical):
+        self.missing = _MissingData(strategy, continuous + binary, fills, median_rows)
+        self.stats = StreamingStatistics(continuous, binary, categorical)
+        self.rows_read = 0
+
+    def update(self, chunk):
+        self.rows_read += len(chunk)
+        self.stats.update(self.missing.apply(chunk))
+
+
+# --- Testy na statystykach scalonych ---
+
+def _error_row(name, analysis, e):
+    return {"Zmienne": name, "Typ Analizy": analysis, "Użyty Test": "N/A", "p-value": float('inf'), "Siła Efektu": "N/A", "Uwagi": f"Błąd: {html.escape(str(e))}", "assumptions_met": False, "is_robust": False}
+
+
+def run_tests(stats_acc: StreamingStatistics, trace=tracing.NULL_TRACE):
+    """Scenariusze testów jak app.run_academic_tests; zwraca (lista wyników, notatki o zmiennych kategorycznych)."""
+    from scipy import stats
+    import kernels
+    import regression
+    import sampling
+
+    all_results = []
+    category_notes = []
+    sample = stats_acc.sample_frame()
+
+    # --- SCENARIUSZ 1: Ciągła vs. Binarna (test t z momentów grup, założenia i test U na próbie) ---
+    with trace.stage("scenario_1_continuous_binary", pairs=len(stats_acc.continuous) * len(stats_acc.binary)):
+        for cont_col, bin_col in itertools.product(stats_acc.continuous, stats_acc.binary):
+            name = f"{cont_col} vs. {bin_col}"
+            try:
+                levels = stats_acc.binary_levels[bin_col]
+                if len(levels) != 2:
+                    all_results.append({"Zmienne": name, "Typ Analizy": "Ciągła vs. Binarna", "Użyty Test": "N/A", "p-value": "N/A", "Siła Efektu": "N/A", "Uwagi": f"Kolumna '{bin_col}' nie jest binarna.", "assumptions_met": False, "is_robust": False})
+                    continue
+                n, mean, m2 = stats_acc.group_moments(cont_col, bin_col)
+                if n.sum() < 10: continue
+
+                sampled = sample[[cont_col, bin_col]].dropna()
+                values = sampled[cont_col].to_numpy(dtype=float)
+                group1, group2 = values[sampled[bin_col] == levels[0]], values[sampled[bin_col] == levels[1]]
+                is_normal = min(sampling.normality_pvalue(group1), sampling.normality_pvalue(group2)) > 0.05
+                _, p_levene = stats.levene(group1, group2)
+                is_homoscedastic = p_levene > 0.05
+
+                test_name = "Test T-Studenta" if is_homoscedastic else "Test T (Welch)"
+                _, _, p_value_ttest, cohen_d = kernels.ttest_from_moments(n, mean, m2, equal_var=is_homoscedastic)
+                uwagi_ttest = []
+                if not is_normal: uwagi_ttest.append("niespełnione założenie o normalności rozkładu")
+                if not is_homoscedastic: uwagi_ttest.append("niespełnione założenie o równości wariancji")
+                if not uwagi_ttest: uwagi_ttest.append("Założenia spełnione.")
+                all_results.append({"Zmienne": name, "Typ Analizy": "Ciągła vs. Binarna", "Użyty Test": test_name, "p-value": p_value_ttest, "Siła Efektu": f"d Cohena = {cohen_d:.3f}", "Uwagi": "; ".join(uwagi_ttest), "assumptions_met": is_normal and is_homoscedastic, "is_robust": False})
+
+                if not is_normal:
+                    _, p_value_mwu, effect_size_mwu = kernels.mwu_test(group1, group2)
+                    all_results.append({"Zmienne": name, "Typ Analizy": "Ciągła vs. Binarna", "Użyty Test": "Test U Manna-Whitneya (odporny)", "p-value": p_value_mwu, "Siła Efektu": f"RBC = {effect_size_mwu:.3f}", "Uwagi": f"Użyty z powodu braku normalności rozkładu; obliczony na losowej próbie {len(values)} wierszy.", "assumptions_met": True, "is_robust": True})
+            except Exception as e:
+                all_results.append(_error_row(name, "Ciągła vs. Binarna", e))
+
+    # --- SCENARIUSZ 2: Ciągła vs. Ciągła (regresja ze scalonych momentów, diagnostyka i Spearman na próbie) ---
+    with trace.stage("scenario_2_continuous_continuous", pairs=len(stats_acc.continuous) * (len(stats_acc.continuous) - 1) // 2):
+        X = sample[list(stats_acc.index)].to_numpy(dtype=np.float64)
+        spearman_r, spearman_n = kernels.pairwise_spearman(X) if stats_acc.continuous else (None, None)
+        for col1, col2 in itertools.combinations(stats_acc.continuous, 2):
+            name = f"{col1} vs. {col2}"
+            try:
+                pair_moments = stats_acc.pair(col1, col2)
+                if pair_moments[0] < 10: continue
+                model = regression.fit_from_moments(*pair_moments)
+
+                i, j = stats_acc.index[col1], stats_acc.index[col2]
+                rows = np.flatnonzero(~np.isnan(X[:, i]) & ~np.isnan(X[:, j]))
+                sample_rows = rows
+                if sampling.is_large(len(rows)):
+                    sample_rows = rows[sampling.stratified_indices(sampling.quantile_strata(X[rows, i]), sampling.ASSUMPTION_MAX_N)]
+                normality_rows = rows if sampling.ASSUMPTION_LARGE_N_POLICY == "moments" else sample_rows
+                p_shapiro = sampling.normality_pvalue(regression.residuals(model, X[normality_rows, i], X[normality_rows, j]))
+                is_resid_normal = p_shapiro > 0.05
+                x_sample = X[sample_rows, i]
+                _, p_bp = regression.breusch_pagan(regression.residuals(model, x_sample, X[sample_rows, j]), x_sample)
+                is_homoscedastic = p_bp > 0.05
+
+                uwagi_reg = []
+                if not is_resid_normal: uwagi_reg.append(f"niespełnione założenie o normalności reszt (p={p_shapiro:.3f})")
+                if not is_homoscedastic: uwagi_reg.append(f"niespełnione założenie o homoskedastyczności (p={p_bp:.3f})")
+                if not uwagi_reg: uwagi_reg.append("Założenia (normalność reszt, homoskedastyczność) spełnione.")
+                all_results.append({"Zmienne": name, "Typ Analizy": "Ciągła vs. Ciągła", "Użyty Test": "Regresja Liniowa", "p-value": model["p_value"], "Siła Efektu": f"R-kwadrat = {model['r_squared']:.3f}", "Uwagi": "; ".join(uwagi_reg), "assumptions_met": is_resid_normal and is_homoscedastic, "is_robust": False})
+
+                # Rangi wymagają całej kolumny, więc korelację Spearmana (i jej p-value) liczymy na próbie
+                rho = spearman_r[i, j]
+                p_value_spearman = kernels.correlation_pvalue(rho, spearman_n[i, j])
+                all_results.append({"Zmienne": name, "Typ Analizy": "Ciągła vs. Ciągła", "Użyty Test": "Korelacja Spearmana (odporna)", "p-value": p_value_spearman, "Siła Efektu": f"rho = {rho:.3f}", "Uwagi": f"Test nieparametryczny, odporny na brak normalności i nieliniowe zależności monotoniczne; obliczony na losowej próbie {int(spearman_n[i, j])} wierszy.", "assumptions_met": True, "is_robust": True})
+            except Exception as e:
+                all_results.append(_error_row(name, "Ciągła vs. Ciągła", e))
+
+    # --- SCENARIUSZ 3: Kategoryczna vs. Kategoryczna (tabele kontyngencji doliczane porcjami) ---
+    with trace.stage("scenario_3_categorical_categorical", pairs=len(stats_acc.tables)):
+        plans = {}
+        for col in stats_acc.categorical:
+            action, levels, reason = sketches.plan_categorical(stats_acc.sketches[col])
+            if action == "collapse" and col in stats_acc.overflow:
+                action, reason = "skip", (
+                    f"ok. {stats_acc.sketches[col].distinct()} poziomów - w trybie dla dużych plików tabele kontyngencji "
+                    f"są śledzone do {MAX_TRACKED_LEVELS} poziomów, więc pominięto kolumnę w testach zależności kategorycznych"
+                )
+            if action != "keep":
+                category_notes.append(f"{col}: {reason}.")
+            plans[col] = (action, levels, reason)
+
+        for col1, col2 in itertools.combinations(stats_acc.categorical, 2):
+            if plans[col1][0] == "skip" or plans[col2][0] == "skip" or (col1, col2) not in stats_acc.tables:
+                continue
+            name = f"{col1} vs. {col2}"
+            try:
+                observed = stats_acc.table(col1, col2, plans)
+                observed = observed[observed.sum(axis=1) > 0][:, observed.sum(axis=0) > 0]
+                if observed.size == 0 or min(observed.shape) < 2: continue
+
+                _, _, p_value_chi2, cramer_v, expected = kernels.chi2_from_table(observed)
+                assumption_met_chi2 = expected.min() >= 5
+                uwagi_chi2 = "Założenie o liczebnościach oczekiwanych (>=5) spełnione." if assumption_met_chi2 else "Niespełnione założenie o liczebnościach oczekiwanych (>=5)."
+                all_results.append({"Zmienne": name, "Typ Analizy": "Kategoryczna vs. Kategoryczna", "Użyty Test": "Test Chi-kwadrat", "p-value": p_value_chi2, "Siła Efektu": f"V Craméra = {cramer_v:.3f}", "Uwagi": uwagi_chi2, "assumptions_met": assumption_met_chi2, "is_robust": False})
+
+                if not assumption_met_chi2 and observed.shape == (2, 2):
+                    _, p_fisher = stats.fisher_exact(observed)
+                    all_results.append({"Zmienne": name, "Typ Analizy": "Kategoryczna vs. Kategoryczna", "Użyty Test": "Dokładny test Fishera (odporny)", "p-value": p_fisher, "Siła Efektu": "N/A", "Uwagi": "Użyty z powodu małych liczebności oczekiwanych w tabeli 2x2.", "assumptions_met": True, "is_robust": True})
+            except Exception as e:
+                all_results.append(_error_row(name, "Kategoryczna vs. Kategoryczna", e))
+
+    return all_results, category_notes
+
+
+def build_report(upload, variable_types: dict, missing_data_strategy: str, correction_method: str = corrections.DEFAULT_METHOD, trace=tracing.NULL_TRACE):
+    """Raport dla pliku czytanego porcjami; zwraca (kod HTTP, HTML) jak app.build_report."""
+    import app
+    import sampling
+
+    if missing_data_strategy not in STRATEGIES:
+        return 400, f"<h1>Błąd Walidacji Danych</h1><p>Strategia '{html.escape(missing_data_strategy)}' wymaga wczytania całego pliku do pamięci i nie jest dostępna dla tak dużych plików.</p>"
+
+    types = {col: type_.lower() for col, type_ in variable_types.items()}
+    columns = [col for col, type_ in types.items() if type_ != "pomiń"]
+    continuous = [col for col in columns if types[col] == "ciągła"]
+    binary = [col for col in columns if types[col] == "binarna"]
+    categorical = [col for col in columns if types[col] in CATEGORICAL_TYPES]
+    numeric = continuous + binary
+    # Tylko analizowane kolumny; kolumny wyłącznie kategoryczne jako tekst (bez zgadywania typu w każdej porcji)
+    read_kwargs = {"columns": columns, "dtype": {col: str for col in categorical if col not in binary}}
+
+    fills, median_rows = None, 0
+    try:
+        if missing_data_strategy == "impute":
+            with trace.stage("impute_scan"):
+                impute_scan = _scan(upload, lambda: _ImputeScan(numeric, columns), **read_kwargs)
+                fills = impute_scan.fill_values()
+                median_rows = impute_scan.median_rows
+        with trace.stage("streaming_statistics", chunk_rows=OUT_OF_CORE_CHUNK_ROWS) as stage:
+            scan = _scan(upload, lambda: _ReportScan(missing_data_strategy, fills, median_rows, continuous, binary, categorical), **read_kwargs)
+            stage.update(rows=scan.rows_read)
+    except MissingValuesFound as e:
+        return 400, f"<h1>Błąd Walidacji Danych</h1><p>{e}</p>"
+    except Exception as e:
+        return 400, f"<h1>Błąd</h1><p>Plik CSV jest uszkodzony lub nieprawidłowy. Błąd: {e}</p>"
+
+    missing, stats_acc = scan.missing, scan.stats
+    # Statystyki są liczone parami, więc pominięcie kolumn na końcu daje ten sam wynik co usunięcie ich przed analizą
+    stats_acc.drop_columns(missing.cols_with_missing)
+    sample = stats_acc.sample_frame().drop(columns=list(missing.cols_with_missing))
+    missing_data_info = missing.info()
+
+    with trace.stage("profile_report", rows=len(sample)):
+        from ydata_profiling import ProfileReport
+        profile = ProfileReport(sample, title=f"Część 1: Automatyczny Raport Opisowy (losowa próba {len(sample)} z {stats_acc.rows} wierszy)")
+    with trace.stage("profile_to_html"):
+        report1_html = profile.to_html()
+
+    all_results, category_notes = run_tests(stats_acc, trace)
+    mode_note = (
+        f"Plik ({scan.rows_read} wierszy) przekracza pamięć serwera, więc przeczytano go porcjami po {OUT_OF_CORE_CHUNK_ROWS} wierszy. "
+        "Test t, regresję liniową i test chi-kwadrat obliczono na wszystkich wierszach ze statystyk scalanych porcja po porcji; "
+        f"testy założeń, test U Manna-Whitneya, korelację Spearmana oraz część opisową - na powtarzalnej losowej próbie "
+        f"{len(sample)} wierszy (ziarno {OUT_OF_CORE_SEED})."
+    )
+    with trace.stage("html_assembly", results=len(all_results)):
+        assumptions_sampled = sampling.is_large(len(sample))
+        report2_html = app.build_results_html(all_results, missing_data_info, correction_method, assumptions_sampled, category_notes, mode_note)
+    return 200, report1_html + "<br><hr style='border: 2px solid #007bff;'>" + report2_html
@@ -0,0 +1,61 @@
+"""
+Prosta regresja liniowa (y = a + b*x) w postaci zamkniętej.
+
+Wszystkie wielkości raportowane dla pary zmiennych ciągłych - nachylenie,
+wyraz wolny, błąd standardowy, statystyka t i p-value, R-kwadrat oraz reszty -
+wynikają z pięciu statystyk dostatecznych (n, średnie, Sxx, Syy, Sxy), więc nie
+ma potrzeby budowania pełnego modelu statsmodels dla każdej pary.
+Wyniki są zgodne z sm.OLS(y, sm.add_constant(x)).fit() oraz het_breuschpagan
+(testy zgodności: tests/test_regression.py).
+"""
+import numpy as np
+from scipy import stats
+
+
+def fit_from_moments(n, mean_x, mean_y, sxx, syy, sxy):
+    """Dopasowanie regresji ze statystyk dostatecznych (sumy kwadratów odchyleń od średnich).
+
+    Zwraca słownik z kluczami: n, slope, intercept, se_slope, t, p_value, r_squared.
+    """
+    if n < 3:
+        raise ValueError("Za mało obserwacji do dopasowania regresji.")
+    if sxx <= 0:
+        raise ValueError("Zmienna objaśniająca jest stała - nie można dopasować regresji.")
+    slope = sxy / sxx
+    intercept = mean_y - slope * mean_x
+    sse = max(syy - slope * sxy, 0.0)
+    se_slope = np.sqrt(sse / (n - 2) / sxx)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t_stat = slope / se_slope
+        r_squared = sxy * sxy / (sxx * syy) if syy > 0 else np.nan
+    p_value = float(2 * stats.t.sf(abs(t_stat), n - 2))
+    return {
+        "n": int(n),
+        "slope": float(slope),
+        "intercept": float(intercept),
+        "se_slope": float(se_slope),
+        "t": float(t_stat),
+        "p_value": p_value,
+        "r_squared": float(r_squared),
+    }
+
+
+def residuals(model, x, y):
+    """Reszty dopasowanego modelu dla wskazanych obserwacji."""
+    return np.asarray(y, dtype=np.float64) - (model["intercept"] + model["slope"] * np.asarray(x, dtype=np.float64))
+
+
+def breusch_pagan(resid, x):
+    """Test Breuscha-Pagana (wariant Koenkera, jak domyślnie w statsmodels) dla jednego predyktora.
+
+    Statystyka LM = n * R^2 regresji pomocniczej kwadratów reszt na x; przy jednym
+    predyktorze R^2 to kwadrat korelacji x z kwadratami reszt. Zwraca (LM, p-value).
+    """
+    resid = np.asarray(resid, dtype=np.float64)
+    x = np.asarray(x, dtype=np.float64)
+    u2 = resid * resid
+    dx, du = x - x.mean(), u2 - u2.mean()
+    denom = (dx @ dx) * (du @ du)
+    r_squared = (dx @ du) ** 2 / denom if denom > 0 else 0.0
+    lm = resid.size * r_squared
+    return float(lm), float(stats.chi2.sf(lm, 1))
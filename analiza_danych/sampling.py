@@ -0,0 +1,87 @@
+"""
+Strategia próbkowania dla testów założeń przy dużych próbach.
+
+Test Shapiro-Wilka jest wolny i mało informatywny powyżej ~5000 obserwacji
+(scipy ostrzega o niedokładnym p-value), a test Breuscha-Pagana dopasowuje
+pomocniczą regresję na wszystkich danych. Dla dużych prób diagnostyka
+założeń jest więc wykonywana na powtarzalnej próbie warstwowej (albo, w trybie
+'moments', testem D'Agostino-Pearsona opartym na momentach), podczas gdy
+główne estymaty efektów nadal korzystają ze wszystkich wierszy.
+
+Konfiguracja przez zmienne środowiskowe:
+- ASSUMPTION_MAX_N - maksymalna liczność próby dla testów założeń (domyślnie 5000),
+- ASSUMPTION_LARGE_N_POLICY - 'subsample' (domyślnie) lub 'moments',
+- ASSUMPTION_SEED - ziarno generatora losowego (domyślnie 0).
+"""
+import os
+
+import numpy as np
+from scipy import stats
+
+ASSUMPTION_MAX_N = int(os.getenv("ASSUMPTION_MAX_N", "5000"))
+ASSUMPTION_LARGE_N_POLICY = os.getenv("ASSUMPTION_LARGE_N_POLICY", "subsample")
+ASSUMPTION_SEED = int(os.getenv("ASSUMPTION_SEED", "0"))
+
+if ASSUMPTION_LARGE_N_POLICY not in ("subsample", "moments"):
+    raise ValueError("ASSUMPTION_LARGE_N_POLICY musi mieć wartość 'subsample' lub 'moments'.")
+
+N_STRATA = 10
+
+
+def _rng(n):
+    # Ziarno zależy od liczności, więc te same dane zawsze dają tę samą próbę
+    return np.random.default_rng([ASSUMPTION_SEED, n])
+
+
+def stratified_indices(strata, size):
+    """Indeksy powtarzalnej próby warstwowej z alokacją proporcjonalną do liczności warstw."""
+    strata = np.asarray(strata)
+    n = strata.size
+    if n <= size:
+        return np.arange(n)
+    rng = _rng(n)
+    levels, codes, counts = np.unique(strata, return_inverse=True, return_counts=True)
+    allocation = np.maximum(1, np.floor(counts * size / n).astype(np.int64))
+    order = np.argsort(codes, kind="stable")
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    chosen = [
+        rng.choice(order[start:start + count], size=min(k, count), replace=False)
+        for start, count, k in zip(starts, counts, allocation)
+    ]
+    return np.sort(np.concatenate(chosen))
+
+
+def quantile_strata(x, n_strata=N_STRATA):
+    """Kody warstw według kwantyli zmiennej (np. predyktora w regresji)."""
+    x = np.asarray(x, dtype=float)
+    edges = np.unique(np.quantile(x, np.linspace(0, 1, n_strata + 1)[1:-1]))
+    return np.searchsorted(edges, x, side="right")
+
+
+def is_large(n):
+    return n > ASSUMPTION_MAX_N
+
+
+def normality_pvalue(x):
+    """p-value testu normalności; dla dużych prób zgodnie z polityką ASSUMPTION_LARGE_N_POLICY."""
+    x = np.asarray(x, dtype=float)
+    if not is_large(x.size):
+        return stats.shapiro(x).pvalue
+    if ASSUMPTION_LARGE_N_POLICY == "moments":
+        return stats.normaltest(x).pvalue
+    idx = _rng(x.size).choice(x.size, size=ASSUMPTION_MAX_N, replace=False)
+    return stats.shapiro(x[idx]).pvalue
+
+
+def policy_note():
+    """Opis polityki próbkowania do sekcji uwag w raporcie."""
+    if ASSUMPTION_LARGE_N_POLICY == "moments":
+        normality = "testem D'Agostino-Pearsona (oparty na skośności i kurtozie) na pełnych danych"
+    else:
+        normality = f"testem Shapiro-Wilka na powtarzalnej próbie {ASSUMPTION_MAX_N} obserwacji"
+    return (
+        f"Dla zmiennych z więcej niż {ASSUMPTION_MAX_N} obserwacjami normalność sprawdzono {normality}, "
+        f"a homoskedastyczność reszt regresji testem Breuscha-Pagana na powtarzalnej próbie warstwowej "
+        f"({ASSUMPTION_MAX_N} obserwacji, warstwy według decyli predyktora, ziarno {ASSUMPTION_SEED}). "
+        "Estymaty efektów i p-value testów głównych obliczono na wszystkich obserwacjach."
+    )
@@ -0,0 +1,168 @@
+"""
+Szkice strumieniowe dla kolumn kategorycznych: liczba różnych wartości
+(HyperLogLog) i najczęstsze wartości (podsumowanie częstych elementów
+Misra-Gries, dualne do space-saving).
+
+Oba szkice mają stały rozmiar, są aktualizowane fragmentami danych w jednym
+przebiegu i dają się scalać (max rejestrów / suma liczników), więc nadają się
+także do danych czytanych porcjami. Raport używa ich, zanim zaalokuje tabelę
+kontyngencji: kolumnę o bardzo wielu poziomach, w której kilka poziomów
+obejmuje większość wierszy, zwija do najczęstszych poziomów i poziomu
+zbiorczego, a kolumnę przypominającą identyfikator lub tekst swobodny pomija
+z wyjaśnieniem.
+
+Konfiguracja: CATEGORICAL_MAX_LEVELS (maksymalna liczba poziomów zmiennej
+w tabeli kontyngencji, domyślnie 50).
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+CATEGORICAL_MAX_LEVELS = int(os.getenv("CATEGORICAL_MAX_LEVELS", "50"))
+# Minimalny udział wierszy objętych przez najczęstsze poziomy, aby zwinąć rzadkie poziomy zamiast pominąć kolumnę
+MIN_COLLAPSE_COVERAGE = 0.8
+# Powyżej tego udziału różnych wartości wśród wierszy kolumna przypomina identyfikator
+ID_DISTINCT_RATIO = 0.5
+OTHER_LEVEL = "Inne (rzadkie poziomy)"
+
+HLL_PRECISION = 12  # 4096 rejestrów, błąd względny ok. 1.6%
+TOPK_CAPACITY = 4 * CATEGORICAL_MAX_LEVELS
+SKETCH_CHUNK_ROWS = 1_000_000
+
+
+def hash_values(values):
+    """64-bitowe skróty wartości (bez braków danych)."""
+    return pd.util.hash_array(np.asarray(values))
+
+
+def value_counts(values: pd.Series):
+    """Liczności wartości w kolejności pierwszego wystąpienia, jak value_counts(sort=False) kolumny obiektowej.
+
+    Dla kolumny typu 'category' value_counts zwraca poziomy w kolejności kategorii, także nieobecne (liczność 0),
+    co zmieniałoby rozstrzyganie remisów w szkicu częstych elementów.
+    """
+    if not isinstance(values.dtype, pd.CategoricalDtype):
+        return values.value_counts(sort=False)
+    codes = values.cat.codes.to_numpy()
+    order = pd.unique(codes)
+    counts = np.bincount(codes, minlength=len(values.cat.categories))
+    return pd.Series(counts[order], index=values.cat.categories[order], name="count")
+
+
+class HyperLogLog:
+    def __init__(self, precision=HLL_PRECISION):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def update_hashes(self, hashes):
+        if not len(hashes):
+            return
+        width = 64 - self.precision
+        index = (hashes >> np.uint64(width)).astype(np.intp)
+        rest = hashes & np.uint64((1 << width) - 1)
+        # Pozycja pierwszej jedynki w pozostałych bitach; rest < 2^52, więc frexp jest dokładne
+        _, bit_length = np.frexp(rest.astype(np.float64))
+        rank = (width - bit_length + 1).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def merge(self, other):
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def estimate(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * m and zeros:
+            # Poprawka dla małych liczności (linear counting)
+            return m * np.log(m / zeros)
+        return raw
+
+
+class TopK:
+    """Częste elementy (Misra-Gries): liczniki zaniżone najwyżej o `error`, scalane przez dodanie i przycięcie."""
+
+    def __init__(self, capacity=TOPK_CAPACITY):
+        self.capacity = capacity
+        self.counts = pd.Series(dtype=np.int64)
+        self.error = 0
+        self.total = 0
+
+    def update_counts(self, counts: pd.Series):
+        """Dolicza liczności wartości z kolejnego fragmentu danych (np. value_counts fragmentu)."""
+        self.total += int(counts.sum())
+        self._add(counts)
+
+    def merge(self, other):
+        self.total += other.total
+        self.error += other.error
+        self._add(other.counts)
+
+    def _add(self, counts):
+        merged = self.counts.add(counts, fill_value=0) if len(self.counts) else counts
+        if len(merged) > self.capacity:
+            # Odjęcie (capacity+1)-tej liczności od wszystkich liczników zostawia najwyżej capacity elementów
+            threshold = merged.nlargest(self.capacity + 1).iloc[-1]
+            merged = merged[merged > threshold] - threshold
+            self.error += int(threshold)
+        self.counts = merged.astype(np.int64)
+
+    def top(self, k):
+        """k najczęstszych wartości z dolnymi oszacowaniami liczności."""
+        return self.counts.nlargest(k)
+
+
+class ColumnSketch:
+    def __init__(self):
+        self.hll = HyperLogLog()
+        self.topk = TopK()
+        self.non_null = 0
+
+    def update(self, values: pd.Series):
+        values = values.dropna()
+        self.non_null += len(values)
+        self.hll.update_hashes(hash_values(values.to_numpy()))
+        self.topk.update_counts(value_counts(values))
+
+    def merge(self, other):
+        self.hll.merge(other.hll)
+        self.topk.merge(other.topk)
+        self.non_null += other.non_null
+
+    def distinct(self):
+        if self.topk.error == 0:
+            # Wszystkie wartości mieszczą się w szkicu częstych elementów - liczba dokładna
+            return len(self.topk.counts)
+        estimate = min(self.hll.estimate(), self.non_null)
+        return int(round(max(estimate, len(self.topk.counts))))
+
+
+def sketch_column(series: pd.Series, chunk_rows=SKETCH_CHUNK_ROWS):
+    sketch = ColumnSketch()
+    for start in range(0, len(series), chunk_rows):
+        sketch.update(series.iloc[start:start + chunk_rows])
+    return sketch
+
+
+def plan_categorical(sketch: ColumnSketch, max_levels=CATEGORICAL_MAX_LEVELS):
+    """Decyzja dla kolumny kategorycznej: ('keep'|'collapse'|'skip', poziomy do zachowania, uzasadnienie)."""
+    distinct = sketch.distinct()
+    if distinct <= max_levels:
+        return "keep", None, None
+    if sketch.non_null and distinct / sketch.non_null > ID_DISTINCT_RATIO:
+        return "skip", None, (
+            f"ok. {distinct} różnych wartości na {sketch.non_null} wierszy - kolumna przypomina identyfikator "
+            f"lub tekst swobodny, więc pominięto ją w testach zależności kategorycznych"
+        )
+    top = sketch.topk.top(max_levels - 1)
+    coverage = top.sum() / sketch.non_null if sketch.non_null else 0.0
+    if coverage >= MIN_COLLAPSE_COVERAGE:
+        return "collapse", list(top.index), (
+            f"ok. {distinct} poziomów; {len(top)} najczęstszych (co najmniej {coverage:.0%} wierszy) zachowano, "
+            f"pozostałe połączono w poziom '{OTHER_LEVEL}'"
+        )
+    return "skip", None, (
+        f"ok. {distinct} poziomów, a {max_levels - 1} najczęstszych obejmuje tylko {coverage:.0%} wierszy - "
+        f"tabela kontyngencji byłaby zbyt rozproszona, więc pominięto kolumnę w testach zależności kategorycznych"
+    )
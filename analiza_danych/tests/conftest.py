@@ -0,0 +1,5 @@
+"""Moduły aplikacji importowane płasko (jak przy uruchomieniu z katalogu analiza_danych)."""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
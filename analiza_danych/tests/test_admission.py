@@ -0,0 +1,77 @@
+import asyncio
+
+import pytest
+
+import admission
+
+
+def _run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_waiting_reports_start_in_fifo_order():
+    async def scenario():
+        controller = admission.AdmissionController(max_concurrent=1, memory_budget=1000)
+        started = []
+        first = await controller.acquire("a", 10)
+
+        async def report(key):
+            ticket = await controller.acquire(key, 10)
+            started.append(key)
+            await asyncio.sleep(0)
+            await controller.release(ticket)
+
+        tasks = []
+        for key in ["b", "c", "d"]:
+            tasks.append(asyncio.create_task(report(key)))
+            await asyncio.sleep(0)
+        assert [controller.position(key)["position"] for key in ["b", "c", "d"]] == [1, 2, 3]
+        assert controller.position("a") == {"state": "running"}
+
+        await controller.release(first)
+        await asyncio.gather(*tasks)
+        return started
+
+    assert _run(scenario()) == ["b", "c", "d"]
+
+
+def test_memory_budget_blocks_and_small_reports_do_not_jump_the_queue():
+    async def scenario():
+        controller = admission.AdmissionController(max_concurrent=3, memory_budget=100)
+        large = await controller.acquire("duży", 60)
+        waiting = asyncio.create_task(controller.acquire("średni", 50))
+        await asyncio.sleep(0)
+        # Mieści się w budżecie, ale czeka za wcześniejszym raportem (FIFO bez zagładzania dużych raportów)
+        small = asyncio.create_task(controller.acquire("mały", 10))
+        await asyncio.sleep(0)
+        assert controller.status()["running"] == 1 and controller.status()["queued"] == 2
+
+        await controller.release(large)
+        tickets = await asyncio.gather(waiting, small)
+        return controller.status(), [ticket.key for ticket in tickets]
+
+    status, keys = _run(scenario())
+    assert keys == ["średni", "mały"]
+    assert status["memory_reserved"] == 60 and status["queued"] == 0
+
+
+def test_report_over_budget_is_rejected():
+    controller = admission.AdmissionController(max_concurrent=2, memory_budget=100)
+
+    with pytest.raises(admission.ReportTooLarge):
+        _run(controller.acquire("a", 101))
+    assert controller.status()["running"] == 0
+
+
+def test_full_queue_is_rejected_with_retry_after():
+    async def scenario():
+        controller = admission.AdmissionController(max_concurrent=1, memory_budget=100, queue_max=1)
+        await controller.acquire("a", 10)
+        queued = asyncio.create_task(controller.acquire("b", 10))
+        await asyncio.sleep(0)
+        with pytest.raises(admission.QueueFull) as error:
+            await controller.acquire("c", 10)
+        queued.cancel()
+        return error.value.retry_after
+
+    assert _run(scenario()) == admission.DEFAULT_RETRY_AFTER
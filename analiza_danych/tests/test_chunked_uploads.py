@@ -0,0 +1,91 @@
+import hashlib
+import os
+
+import pytest
+
+import chunked_uploads
+import uploads
+
+CONTENT = b"wiek,miasto\n" + b"".join(f"{20 + i},Krak\xc3\xb3w\n".encode() for i in range(12))
+CHUNK_SIZE = 16
+
+
+@pytest.fixture(autouse=True)
+def upload_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(uploads, "UPLOAD_DIR", str(tmp_path))
+    monkeypatch.setattr(chunked_uploads, "MIN_CHUNK_SIZE", 1)
+    monkeypatch.setattr(chunked_uploads, "_sessions", {})
+    return tmp_path
+
+
+def _chunk(index):
+    return CONTENT[index * CHUNK_SIZE:(index + 1) * CHUNK_SIZE]
+
+
+def _send(session, index, data=None):
+    data = _chunk(index) if data is None else data
+    session.write_chunk(index, data, hashlib.sha256(data).hexdigest())
+
+
+def test_out_of_order_and_duplicate_chunks_assemble_the_file():
+    session = chunked_uploads.create("dane.csv", len(CONTENT), CHUNK_SIZE, hashlib.sha256(CONTENT).hexdigest())
+    order = list(range(session.total_chunks))[::-1]
+
+    for index in order[:-1]:
+        _send(session, index)
+    # Bez pierwszego fragmentu nagłówek nie jest jeszcze znany
+    assert session.columns is None
+    _send(session, 3)
+    _send(session, order[-1])
+    # Ponowne wysłanie przyjętego fragmentu (także z inną treścią) nic nie zmienia
+    _send(session, 0)
+    _send(session, 1, b"x" * CHUNK_SIZE)
+    assert session.status()["complete"] and session.columns == ["wiek", "miasto"]
+
+    upload = chunked_uploads.complete(session.id)
+    try:
+        with open(upload.path, "rb") as f:
+            assert f.read() == CONTENT
+        assert upload.sha256 == hashlib.sha256(CONTENT).hexdigest()
+        assert upload.line_count == CONTENT.count(b"\n")
+        assert not os.path.exists(session.part_path)
+        with pytest.raises(chunked_uploads.ChunkedUploadError):
+            chunked_uploads.get(session.id)
+    finally:
+        uploads.release(upload)
+
+
+def test_chunk_with_wrong_checksum_is_rejected():
+    session = chunked_uploads.create("dane.csv", len(CONTENT), CHUNK_SIZE)
+
+    with pytest.raises(chunked_uploads.ChunkedUploadError) as error:
+        session.write_chunk(0, _chunk(0), hashlib.sha256(b"inne").hexdigest())
+    assert error.value.status_code == 422
+    with pytest.raises(chunked_uploads.ChunkedUploadError):
+        session.write_chunk(0, _chunk(0)[:-1], hashlib.sha256(_chunk(0)[:-1]).hexdigest())
+    assert session.status()["received_chunks"] == []
+
+
+def test_complete_with_missing_chunks_keeps_the_session():
+    session = chunked_uploads.create("dane.csv", len(CONTENT), CHUNK_SIZE)
+    _send(session, 0)
+
+    with pytest.raises(chunked_uploads.ChunkedUploadError) as error:
+        chunked_uploads.complete(session.id)
+    assert error.value.status_code == 409
+    assert chunked_uploads.get(session.id) is session
+
+
+def test_final_sha256_mismatch_discards_the_session():
+    session = chunked_uploads.create("dane.csv", len(CONTENT), CHUNK_SIZE, hashlib.sha256(b"inny plik").hexdigest())
+    for index in range(session.total_chunks):
+        _send(session, index)
+
+    with pytest.raises(chunked_uploads.ChunkedUploadError) as error:
+        chunked_uploads.complete(session.id)
+    assert error.value.status_code == 422
+    assert not os.path.exists(session.part_path)
+    with pytest.raises(chunked_uploads.ChunkedUploadError) as error:
+        chunked_uploads.get(session.id)
+    assert error.value.status_code == 404
+    assert os.listdir(uploads.UPLOAD_DIR) == []
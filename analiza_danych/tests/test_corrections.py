@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+from statsmodels.stats.multitest import multipletests
+
+import corrections
+
+
+@pytest.mark.parametrize("method", list(corrections.METHODS))
+def test_matches_statsmodels_with_ties(method):
+    rng = np.random.default_rng(0)
+    # Zaokrąglenie daje wiele równych p-value
+    p = np.round(rng.random(200) ** 3, 2)
+    p[:5] = 0.0
+
+    expected = multipletests(p, method=method)[1]
+
+    np.testing.assert_allclose(corrections.adjust_pvalues(p, method), expected)
+
+
+@pytest.mark.parametrize("method", list(corrections.METHODS))
+def test_failed_tests_are_excluded_from_m(method):
+    p_values = [0.01, "N/A", 0.04, float("inf"), 0.03, np.nan, 0.04]
+    tested = np.array([0.01, 0.04, 0.03, 0.04])
+
+    adjusted = corrections.adjust_pvalues(p_values, method)
+
+    assert np.isnan(adjusted[[1, 3, 5]]).all()
+    np.testing.assert_allclose(adjusted[[0, 2, 4, 6]], multipletests(tested, method=method)[1])
+    assert corrections.count_tests(p_values) == 4
+
+
+def test_no_tests():
+    assert np.isnan(corrections.adjust_pvalues(["N/A"])).all()
+    assert corrections.adjust_pvalues([]).size == 0
+    assert corrections.count_tests([]) == 0
@@ -0,0 +1,89 @@
+import datetime
+import io
+import zipfile
+from xml.etree import ElementTree
+
+import pandas as pd
+import pytest
+
+import excel
+
+
+def test_na_markers_match_read_csv_defaults():
+    markers = sorted(value for value in excel.NA_VALUES if value)
+    parsed = pd.read_csv(io.StringIO("kolumna\n" + "\n".join(markers) + "\ntekst\n"), keep_default_na=True, skip_blank_lines=False)
+
+    assert parsed["kolumna"].isna().tolist() == [True] * len(markers) + [False]
+
+
+def _workbook():
+    import openpyxl
+
+    workbook = openpyxl.Workbook()
+    ws = workbook.active
+    ws.title = "Dane"
+    ws.append(["Imię", "Wiek", "Data", "Aktywny", "Uwagi"])
+    ws.append(["Anna", 31, datetime.datetime(2024, 1, 5), True, "a & b"])
+    ws.append(["Jan", None, datetime.datetime(2023, 12, 31), False, "NA"])
+    ws.append(["Ola", 2.5, None, True, None])
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+
+def _rewritten(content, transform):
+    """Kopia skoroszytu z XML arkusza zmienionym przez transform(element główny)."""
+    source = zipfile.ZipFile(io.BytesIO(content))
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as target:
+        for item in source.infolist():
+            data = source.read(item)
+            if item.filename == "xl/worksheets/sheet1.xml":
+                root = ElementTree.fromstring(data)
+                transform(root)
+                data = ElementTree.tostring(root, xml_declaration=True, encoding="UTF-8")
+            target.writestr(item, data)
+    return buffer.getvalue()
+
+
+def _third_party_style(root):
+    # Bez <dimension>, z wcięciami i przedrostkiem przestrzeni nazw (np. s:c), jak z innych programów niż Excel
+    for dimension in [child for child in root if child.tag.endswith("}dimension")]:
+        root.remove(dimension)
+    ElementTree.indent(root)
+
+
+def test_read_sheet_values():
+    frame = excel.read_sheet(io.BytesIO(_workbook()), "xlsx", "Dane")
+
+    assert list(frame.columns) == ["Imię", "Wiek", "Data", "Aktywny", "Uwagi"]
+    assert frame["Imię"].tolist() == ["Anna", "Jan", "Ola"]
+    assert frame["Wiek"].tolist()[0::2] == [31, 2.5] and pd.isna(frame["Wiek"][1])
+    assert frame["Data"].tolist()[:2] == [pd.Timestamp(2024, 1, 5), pd.Timestamp(2023, 12, 31)]
+    assert frame["Aktywny"].tolist() == [True, False, True]
+    assert frame["Uwagi"][0] == "a & b" and frame["Uwagi"][1:].isna().all()
+
+
+def test_pretty_printed_sheet_reads_like_excel_output():
+    content = _workbook()
+    rewritten = _rewritten(content, _third_party_style)
+    assert b"\n" in zipfile.ZipFile(io.BytesIO(rewritten)).read("xl/worksheets/sheet1.xml").split(b"?>", 1)[1]
+
+    expected = excel.read_sheet(io.BytesIO(content), "xlsx", "Dane")
+    pd.testing.assert_frame_equal(excel.read_sheet(io.BytesIO(rewritten), "xlsx", "Dane"), expected)
+    chunks = list(excel.iter_frames(io.BytesIO(rewritten), "xlsx", "Dane", chunksize=2))
+    assert [chunk["Imię"].tolist() for chunk in chunks] == [["Anna", "Jan"], ["Ola"]]
+    assert excel.describe(io.BytesIO(rewritten), "xlsx")[1:] == ("Dane", 4, list(expected.columns))
+
+
+def test_damaged_sheet_raises_invalid_workbook():
+    content = _workbook()
+    source = zipfile.ZipFile(io.BytesIO(content))
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as target:
+        for item in source.infolist():
+            data = source.read(item)
+            target.writestr(item, data[:len(data) // 2] if item.filename == "xl/worksheets/sheet1.xml" else data)
+
+    with pytest.raises(excel.InvalidWorkbook):
+        excel.read_sheet(io.BytesIO(buffer.getvalue()), "xlsx", "Dane")
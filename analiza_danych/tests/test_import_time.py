@@ -0,0 +1,18 @@
+"""Regresja zimnego startu: budżet czasu importu app i brak ciężkich bibliotek w imporcie i podglądzie (zob. check_import_time.py)."""
+import os
+
+import check_import_time
+
+IMPORT_TIME_BUDGET_MS = float(os.getenv("IMPORT_TIME_BUDGET_MS", "2000"))
+
+
+def test_app_import_fits_the_budget():
+    assert check_import_time.measure_import_ms() <= IMPORT_TIME_BUDGET_MS
+
+
+def test_import_and_preview_do_not_load_heavy_modules():
+    status, on_import, on_preview = check_import_time.probe_preview(check_import_time.DEFAULT_CSV)
+
+    assert status == 200
+    assert on_import == []
+    assert on_preview == []
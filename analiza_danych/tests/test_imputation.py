@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import imputation
+
+VARIABLE_TYPES = {"wiek": "ciągła", "dochód": "ciągła", "dzieci": "ciągła", "aktywny": "binarna", "miasto": "nominalna", "płeć": "nominalna"}
+
+
+@pytest.fixture
+def frame():
+    rng = np.random.default_rng(0)
+    n = 600
+    wiek = rng.normal(40, 10, n)
+    df = pd.DataFrame({
+        "wiek": wiek,
+        "dochód": 1000 + 80 * wiek + rng.normal(0, 300, n),
+        "dzieci": rng.integers(0, 4, n).astype(np.float64),
+        "aktywny": rng.integers(0, 2, n).astype(np.float64),
+        "miasto": pd.Categorical(rng.choice(["Kraków", "Gdańsk", "Łódź"], n)),
+        "płeć": rng.choice(["K", "M"], n).astype(object),
+    }, index=pd.RangeIndex(100, 100 + n))
+    for col in df.columns:
+        df.loc[df.index[rng.random(n) < 0.15], col] = np.nan
+    return df
+
+
+@pytest.mark.parametrize("strategy", list(imputation.STRATEGIES))
+def test_strategy_fills_all_missing_and_keeps_shape(frame, strategy):
+    original = frame.copy()
+
+    description = imputation.STRATEGIES[strategy](frame, VARIABLE_TYPES)
+
+    assert not frame.isna().any().any()
+    assert frame.index.equals(original.index)
+    assert frame.dtypes.to_dict() == original.dtypes.to_dict()
+    # Wartości obserwowane się nie zmieniają, uzupełnione mieszczą się w zakresie obserwowanym
+    observed = original.notna()
+    for col in original.columns:
+        assert frame.loc[observed[col], col].equals(original.loc[observed[col], col])
+    assert set(frame["aktywny"]) <= {0.0, 1.0}
+    assert set(frame["miasto"]) <= {"Kraków", "Gdańsk", "Łódź"}
+    assert frame["dzieci"].between(0, 3).all()
+    assert "Uzupełniono" in description
+
+
+@pytest.mark.parametrize("max_iter", [1, 3])
+def test_mice_respects_max_iter(frame, max_iter, monkeypatch):
+    monkeypatch.setattr(imputation, "MICE_MAX_ITER", max_iter)
+    # Próg zbieżności 0 - przerwanie tylko po MICE_MAX_ITER rundach
+    monkeypatch.setattr(imputation, "MICE_TOL", 0.0)
+    fits = []
+    lstsq = np.linalg.lstsq
+    monkeypatch.setattr(np.linalg, "lstsq", lambda *args, **kwargs: fits.append(1) or lstsq(*args, **kwargs))
+
+    description = imputation.impute_mice(frame, VARIABLE_TYPES)
+
+    assert f"{max_iter} rund(y)" in description
+    # Jedna regresja na rundę dla każdej kolumny liczbowej z brakami
+    assert len(fits) == max_iter * 4
+    assert not frame.isna().any().any()
@@ -0,0 +1,37 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import moments
+
+
+@pytest.fixture
+def frame():
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(rng.normal(size=(1001, 3)) * [1, 10, 1000] + [0, 5, 1e6], columns=["a", "b", "c"])
+    df = df.mask(rng.random(df.shape) < 0.2)
+    df["grupa"] = rng.choice(["x", "y", None], len(df))
+    return df
+
+
+@pytest.mark.parametrize("block_bytes", [moments.BLOCK_BYTES, 8 * 5 * 37])
+def test_pair_and_group_moments_match_pandas(frame, block_bytes, monkeypatch):
+    monkeypatch.setattr(moments, "BLOCK_BYTES", block_bytes)
+    stats = moments.SufficientStatistics(frame, ["a", "b", "c"], ["grupa"])
+
+    complete = frame[["a", "c"]].dropna()
+    n, mean_x, mean_y, sxx, syy, sxy = stats.pair("a", "c")
+    assert n == len(complete)
+    assert (mean_x, mean_y) == pytest.approx((complete["a"].mean(), complete["c"].mean()))
+    assert sxx == pytest.approx(complete["a"].var() * (n - 1))
+    assert syy == pytest.approx(complete["c"].var() * (n - 1))
+    assert sxy == pytest.approx(complete.cov().loc["a", "c"] * (n - 1))
+    np.testing.assert_allclose(stats.var, frame[["a", "b", "c"]].var().to_numpy())
+
+    counts, means, m2 = stats.group_moments("b", "grupa")
+    groups = frame.dropna(subset=["b", "grupa"]).groupby("grupa")["b"]
+    first = frame["grupa"].dropna().iloc[0]
+    second = "y" if first == "x" else "x"
+    np.testing.assert_allclose(counts, groups.count()[[first, second]].to_numpy())
+    np.testing.assert_allclose(means, groups.mean()[[first, second]].to_numpy())
+    np.testing.assert_allclose(m2, (groups.var() * (groups.count() - 1))[[first, second]].to_numpy())
@@ -0,0 +1,74 @@
+import collections
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import nullmap
+
+
+def _frame(n_rows, n_cols=5, seed=0):
+    rng = np.random.default_rng([seed, n_rows])
+    df = pd.DataFrame(rng.normal(size=(n_rows, n_cols)), columns=[f"k{i}" for i in range(n_cols)])
+    df = df.mask(rng.random(df.shape) < 0.3)
+    df["tekst"] = rng.choice(["a", "b", None], n_rows)
+    df["pełna"] = 1.0
+    return df
+
+
+def _expected_patterns(df):
+    missing = df.isna()
+    return collections.Counter(
+        tuple(col for col in df.columns if row[col]) for _, row in missing[missing.any(axis=1)].iterrows()
+    )
+
+
+@pytest.mark.parametrize("n_rows", [0, 1, 7, 13, 64, 1001])
+def test_summary_matches_isna(n_rows):
+    df = _frame(n_rows)
+    missing = df.isna()
+
+    summary = nullmap.NullBitmap.from_frame(df).summary(pattern_limit=1000)
+
+    assert summary["total_rows"] == n_rows
+    assert summary["total_missing"] == int(missing.to_numpy().sum())
+    expected_counts = {col: int(count) for col, count in missing.sum().items() if count}
+    assert {col: item["count"] for col, item in summary["missing_counts"].items()} == expected_counts
+    assert summary["delete_rows_impact"]["rows_removed"] == int(missing.any(axis=1).sum())
+    assert summary["delete_cols_impact"]["columns_removed"] == len(expected_counts)
+    patterns = {tuple(item["columns"]): item["rows"] for item in summary["patterns"]}
+    assert patterns == dict(_expected_patterns(df))
+    assert [item["rows"] for item in summary["patterns"]] == sorted(patterns.values(), reverse=True)
+
+
+@pytest.mark.parametrize("n_rows", [1, 13, 1001])
+def test_row_mask_and_first_locations(n_rows):
+    df = _frame(n_rows)
+    bitmap = nullmap.NullBitmap.from_frame(df)
+    missing = df.isna().to_numpy()
+
+    assert bitmap.row_mask().tolist() == missing.any(axis=1).tolist()
+    rows, cols = np.nonzero(missing)
+    assert bitmap.first_locations(7) == [(int(r), df.columns[c]) for r, c in zip(rows, cols)][:7]
+
+
+def test_concat_and_select_match_whole_frame():
+    df = _frame(1001)
+    parts = [nullmap.NullBitmap.from_frame(df.iloc[start:start + 160]) for start in range(0, len(df), 160)]
+
+    whole = nullmap.NullBitmap.concat(parts)
+
+    assert whole.summary() == nullmap.NullBitmap.from_frame(df).summary()
+    selected = whole.select(["tekst", "k1"])
+    assert selected.counts.tolist() == df[["tekst", "k1"]].isna().sum().tolist()
+    assert whole.select(["brak"]) is None
+    with pytest.raises(ValueError):
+        nullmap.NullBitmap.concat([nullmap.NullBitmap.from_frame(df.iloc[:13]), whole])
+
+
+def test_patterns_with_more_than_64_missing_columns():
+    df = _frame(333, n_cols=80, seed=1)
+
+    patterns = nullmap.NullBitmap.from_frame(df).patterns(limit=1000)
+
+    assert {tuple(cols): count for cols, count in patterns} == dict(_expected_patterns(df))
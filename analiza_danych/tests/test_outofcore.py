@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import app
+import outofcore
+import uploads
+
+VARIABLE_TYPES = {"x": "ciągła", "y": "ciągła", "grupa": "binarna", "miasto": "nominalna", "kolor": "nominalna", "opis": "pomiń"}
+
+
+def _csv(encoding, n_rows=301):
+    rng = np.random.default_rng(0)
+    x = rng.normal(10, 2, n_rows)
+    df = pd.DataFrame({
+        "x": x,
+        "y": 3 * x + rng.normal(0, 4, n_rows),
+        "grupa": rng.integers(0, 2, n_rows),
+        # Znaki spoza ASCII zapisane w latin1 nie są poprawnym UTF-8
+        "miasto": rng.choice(["Kraków", "Bytów", "Zürich"], n_rows),
+        "kolor": rng.choice(["czerwony", "zielony"], n_rows),
+        "opis": "ąę" if encoding == "utf-8" else "éè",
+    })
+    for col in ["x", "y", "miasto"]:
+        df.loc[rng.random(n_rows) < 0.1, col] = np.nan
+    return df.to_csv(index=False).encode(encoding)
+
+
+def _results(upload, strategy, out_of_core, monkeypatch):
+    import ydata_profiling
+
+    captured = {}
+
+    def build_results_html(all_results, missing_data_info, *args, **kwargs):
+        captured["results"] = {(res["Zmienne"], res["Użyty Test"]): res["p-value"] for res in all_results}
+        captured["info"] = missing_data_info
+        return ""
+
+    class ProfileReport:
+        # Część opisowa nie wpływa na wyniki testów
+        def __init__(self, df, **kwargs):
+            captured["profiled_rows"] = len(df)
+
+        def to_html(self):
+            return ""
+
+    monkeypatch.setattr(app, "build_results_html", build_results_html)
+    monkeypatch.setattr(ydata_profiling, "ProfileReport", ProfileReport)
+    status_code, _ = app.build_report(upload, VARIABLE_TYPES, strategy, out_of_core=out_of_core)
+    assert status_code == 200
+    return captured
+
+
+@pytest.mark.parametrize("encoding", ["utf-8", "latin1"])
+@pytest.mark.parametrize("strategy", ["delete_rows", "impute"])
+def test_out_of_core_matches_in_memory(encoding, strategy, monkeypatch):
+    monkeypatch.setattr(outofcore, "OUT_OF_CORE_CHUNK_ROWS", 64)
+    upload = uploads.StoredUpload.from_bytes(_csv(encoding))
+
+    in_memory = _results(upload, strategy, False, monkeypatch)
+    chunked = _results(upload, strategy, True, monkeypatch)
+
+    assert chunked["results"].keys() == in_memory["results"].keys()
+    for key, p_value in in_memory["results"].items():
+        assert chunked["results"][key] == pytest.approx(p_value, rel=1e-6), key
+    assert chunked["profiled_rows"] == in_memory["profiled_rows"]
+    if strategy == "delete_rows":
+        assert chunked["info"] == in_memory["info"]
+
+
+@pytest.mark.parametrize("encoding", ["utf-8", "latin1"])
+def test_scan_preview_matches_whole_file(encoding, monkeypatch):
+    monkeypatch.setattr(outofcore, "OUT_OF_CORE_CHUNK_ROWS", 64)
+    upload = uploads.StoredUpload.from_bytes(_csv(encoding))
+    whole = uploads.read_frame(upload)
+
+    head, bitmap = outofcore.scan_preview(upload)
+
+    pd.testing.assert_frame_equal(head, whole.iloc[:64])
+    assert "Zürich" in set(head["miasto"])
+    assert bitmap.n_rows == len(whole)
+    assert bitmap.counts.tolist() == whole.isna().sum().tolist()
+    assert bitmap.row_mask().tolist() == whole.isna().any(axis=1).tolist()
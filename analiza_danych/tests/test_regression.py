@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+import pytest
+import statsmodels.api as sm
+from statsmodels.stats.diagnostic import het_breuschpagan
+
+import moments
+import regression
+
+
+def _datasets():
+    rng = np.random.default_rng(28)
+    x = rng.normal(50, 10, 500)
+    small = rng.uniform(0, 1, 12)
+    return [
+        pytest.param(x, 3.0 + 0.4 * x + rng.normal(0, 2, x.size), id="liniowa"),
+        pytest.param(x, 1.0 - 0.2 * x + rng.normal(0, 1, x.size) * np.abs(x - 40), id="heteroskedastyczna"),
+        pytest.param(x, rng.normal(0, 1, x.size), id="bez_zaleznosci"),
+        pytest.param(small, 2 * small + rng.normal(0, 0.5, small.size), id="mala_proba"),
+    ]
+
+
+@pytest.mark.parametrize("x, y", _datasets())
+def test_fit_from_moments_matches_statsmodels_ols(x, y):
+    frame = pd.DataFrame({"x": x, "y": y})
+    model = regression.fit_from_moments(*moments.SufficientStatistics(frame, ["x", "y"], []).pair("x", "y"))
+    ols = sm.OLS(y, sm.add_constant(x)).fit()
+
+    assert model["n"] == ols.nobs
+    assert model["intercept"] == pytest.approx(ols.params[0], rel=1e-9)
+    assert model["slope"] == pytest.approx(ols.params[1], rel=1e-9)
+    assert model["se_slope"] == pytest.approx(ols.bse[1], rel=1e-9)
+    assert model["t"] == pytest.approx(ols.tvalues[1], rel=1e-9)
+    assert model["p_value"] == pytest.approx(ols.pvalues[1], rel=1e-7, abs=1e-300)
+    assert model["r_squared"] == pytest.approx(ols.rsquared, rel=1e-9)
+    np.testing.assert_allclose(regression.residuals(model, x, y), ols.resid, rtol=1e-9, atol=1e-9)
+
+
+@pytest.mark.parametrize("x, y", _datasets())
+def test_breusch_pagan_matches_statsmodels(x, y):
+    ols = sm.OLS(y, sm.add_constant(x)).fit()
+    lm, p_value = regression.breusch_pagan(ols.resid, x)
+    expected_lm, expected_p, _, _ = het_breuschpagan(ols.resid, sm.add_constant(x))
+
+    assert lm == pytest.approx(expected_lm, rel=1e-9)
+    assert p_value == pytest.approx(expected_p, rel=1e-7, abs=1e-300)
+
+
+def test_constant_predictor_is_rejected():
+    with pytest.raises(ValueError):
+        regression.fit_from_moments(10, 1.0, 2.0, 0.0, 5.0, 0.0)
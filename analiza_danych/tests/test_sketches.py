@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import sketches
+
+
+@pytest.mark.parametrize("cardinality", [100, 1000, 20_000, 300_000])
+def test_hyperloglog_relative_error(cardinality):
+    hll = sketches.HyperLogLog()
+    values = np.arange(cardinality, dtype=np.int64) * 7919
+    # Powtórzenia nie zmieniają oszacowania
+    hll.update_hashes(sketches.hash_values(np.concatenate([values, values[: cardinality // 3]])))
+
+    # Błąd standardowy ok. 1.6% dla 4096 rejestrów; 5% to ok. 3 odchylenia
+    assert hll.estimate() == pytest.approx(cardinality, rel=0.05)
+
+
+def test_hyperloglog_merge_equals_union():
+    values = pd.Series([f"wartość {i}" for i in range(50_000)])
+    whole, left, right = sketches.HyperLogLog(), sketches.HyperLogLog(), sketches.HyperLogLog()
+    whole.update_hashes(sketches.hash_values(values.to_numpy()))
+    left.update_hashes(sketches.hash_values(values[:30_000].to_numpy()))
+    right.update_hashes(sketches.hash_values(values[20_000:].to_numpy()))
+
+    left.merge(right)
+
+    assert np.array_equal(left.registers, whole.registers)
+
+
+def _zipf_column(n_rows, n_levels, seed=0):
+    rng = np.random.default_rng(seed)
+    weights = 1 / np.arange(1, n_levels + 1) ** 1.1
+    return pd.Series(rng.choice([f"p{i}" for i in range(n_levels)], n_rows, p=weights / weights.sum()))
+
+
+def _assert_misra_gries_bounds(topk, column):
+    true_counts = column.value_counts()
+    estimated = topk.counts.reindex(true_counts.index, fill_value=0)
+    assert topk.total == len(column)
+    assert topk.error <= topk.total / (topk.capacity + 1)
+    # Liczniki są zaniżone najwyżej o error i nigdy zawyżone
+    assert (estimated <= true_counts).all()
+    assert (estimated >= true_counts - topk.error).all()
+    # Każda wartość częstsza niż total / (capacity + 1) pozostaje w szkicu
+    assert set(true_counts[true_counts > topk.total / (topk.capacity + 1)].index) <= set(topk.counts.index)
+
+
+def test_misra_gries_guarantees_over_chunks_and_merge():
+    column = _zipf_column(200_000, 5_000)
+    topk = sketches.TopK(capacity=40)
+    for start in range(0, len(column), 25_000):
+        topk.update_counts(sketches.value_counts(column[start:start + 25_000]))
+    _assert_misra_gries_bounds(topk, column)
+    assert len(topk.counts) <= topk.capacity
+
+    left, right = sketches.TopK(capacity=40), sketches.TopK(capacity=40)
+    left.update_counts(sketches.value_counts(column[:120_000]))
+    right.update_counts(sketches.value_counts(column[120_000:]))
+    left.merge(right)
+    _assert_misra_gries_bounds(left, column)
+    assert list(left.top(5).index) == list(column.value_counts().index[:5])
+
+
+def test_plan_keep_when_few_levels():
+    sketch = sketches.sketch_column(pd.Series(["a", "b", "c", None] * 100))
+
+    assert sketch.distinct() == 3
+    assert sketches.plan_categorical(sketch, max_levels=10) == ("keep", None, None)
+
+
+def test_plan_collapse_when_top_levels_cover_most_rows():
+    # 9 częstych poziomów (90% wierszy) i 500 rzadkich
+    frequent = [f"częsty {i}" for i in range(9)] * 1000
+    rare = [f"rzadki {i}" for i in range(500)] * 2
+    sketch = sketches.sketch_column(pd.Series(frequent + rare), chunk_rows=997)
+
+    action, levels, reason = sketches.plan_categorical(sketch, max_levels=10)
+
+    assert action == "collapse"
+    assert sorted(levels) == sorted(set(frequent))
+    assert sketches.OTHER_LEVEL in reason
+
+
+def test_plan_skip_identifier_like_column():
+    sketch = sketches.sketch_column(pd.Series([f"id-{i}" for i in range(5000)]))
+
+    action, levels, reason = sketches.plan_categorical(sketch, max_levels=10)
+
+    assert (action, levels) == ("skip", None)
+    assert "identyfikator" in reason
+
+
+def test_plan_skip_dispersed_column():
+    # 200 równolicznych poziomów: 9 najczęstszych obejmuje tylko ok. 4.5% wierszy
+    sketch = sketches.sketch_column(pd.Series([f"p{i}" for i in range(200)] * 50))
+
+    action, levels, reason = sketches.plan_categorical(sketch, max_levels=10)
+
+    assert (action, levels) == ("skip", None)
+    assert "rozproszona" in reason
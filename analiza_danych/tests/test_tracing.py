@@ -0,0 +1,25 @@
+import io
+import logging.config
+import time
+
+from uvicorn.config import LOGGING_CONFIG
+
+import tracing
+
+
+def test_report_summary_is_logged_under_uvicorn_logging_config():
+    logging.config.dictConfig(LOGGING_CONFIG)
+    stream = io.StringIO()
+    handler = tracing.logger.handlers[0]
+    previous = handler.setStream(stream)
+    try:
+        trace = tracing.Trace(report_id="test-report")
+        with trace.stage("read_csv", rows=3):
+            time.sleep(0.001)
+        tracing.finish(trace)
+    finally:
+        handler.setStream(previous)
+
+    output = stream.getvalue()
+    assert '"report_id": "test-report"' in output
+    assert "read_csv" in output
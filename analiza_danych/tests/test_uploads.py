@@ -0,0 +1,105 @@
+import bz2
+import gzip
+import hashlib
+import io
+import os
+
+import pandas as pd
+import pytest
+
+import uploads
+
+
+def test_oldest_tokens_are_evicted_over_the_memory_cap(monkeypatch):
+    monkeypatch.setattr(uploads, "_tokens", {})
+    monkeypatch.setattr(uploads, "UPLOAD_TOKEN_MAX_BYTES", 250)
+    content = b"a,b\n" + b"1,2\n" * 24  # 100 bajtów
+    tokens = [uploads.issue_token(uploads.StoredUpload.from_bytes(content), ["a", "b"]) for _ in range(4)]
+
+    assert [uploads.redeem_token(token) is None for token in tokens] == [True, True, False, False]
+
+
+def test_token_count_is_capped(monkeypatch):
+    monkeypatch.setattr(uploads, "_tokens", {})
+    monkeypatch.setattr(uploads, "UPLOAD_TOKEN_MAX_COUNT", 2)
+    tokens = [uploads.issue_token(uploads.StoredUpload.from_bytes(b"a\n1\n"), ["a"]) for _ in range(3)]
+
+    assert uploads.redeem_token(tokens[0]) is None
+    assert uploads.redeem_token(tokens[2]) is not None
+
+
+CSV = "a,b,c\n1,x,1.5\n2,y,\n3,z,4.0\n".encode("utf-8")
+EXPECTED = pd.read_csv(io.BytesIO(CSV))
+
+
+def _compress(fmt):
+    if fmt == "gzip":
+        return gzip.compress(CSV)
+    if fmt == "bz2":
+        return bz2.compress(CSV)
+    zstandard = pytest.importorskip("zstandard")
+    return zstandard.ZstdCompressor().compress(CSV)
+
+
+def _columnar(fmt):
+    pytest.importorskip("pyarrow")
+    buffer = io.BytesIO()
+    if fmt == "parquet":
+        EXPECTED.to_parquet(buffer, index=False)
+    else:
+        EXPECTED.to_feather(buffer)
+    return buffer.getvalue()
+
+
+def _stored(tmp_path, monkeypatch, content):
+    monkeypatch.setattr(uploads, "UPLOAD_DIR", str(tmp_path / "store"))
+    monkeypatch.setattr(uploads, "_refs", {})
+    part = tmp_path / "upload.part"
+    part.write_bytes(content)
+    return uploads.store_file(
+        str(part), len(content), hashlib.sha256(content).hexdigest(), content.count(b"\n"), content.split(b"\n", 1)[0]
+    )
+
+
+def _assert_round_trip(upload):
+    # Dla CSV liczba znaków nowej linii (z nagłówkiem), dla Parquet/Arrow liczba wierszy z metadanych
+    columnar = upload.format in ("parquet", "arrow")
+    assert upload.line_count == len(EXPECTED) + (0 if columnar else 1)
+    assert uploads.column_names(upload) == ["a", "b", "c"]
+    pd.testing.assert_frame_equal(uploads.read_frame(upload), EXPECTED)
+    pd.testing.assert_frame_equal(uploads.read_frame(upload, columns=["a", "c"]), EXPECTED[["a", "c"]])
+    chunks = list(uploads.read_chunks(upload, 2))
+    assert [len(chunk) for chunk in chunks] == [2, 1]
+    assert [row for chunk in chunks for row in chunk.astype(str).values.tolist()] == EXPECTED.astype(str).values.tolist()
+
+
+@pytest.mark.parametrize("fmt, extension", [("gzip", ".csv.gz"), ("bz2", ".csv.bz2"), ("zstd", ".csv.zst")])
+def test_compressed_csv_round_trip(tmp_path, monkeypatch, fmt, extension):
+    content = _compress(fmt)
+    assert uploads.detect_format(content) == fmt
+    _assert_round_trip(uploads.StoredUpload.from_bytes(content))
+
+    upload = _stored(tmp_path, monkeypatch, content)
+    assert upload.format == fmt and upload.path.endswith(extension)
+    _assert_round_trip(upload)
+    uploads.release(upload)
+    assert not os.path.exists(upload.path)
+
+
+@pytest.mark.parametrize("fmt, extension", [("parquet", ".parquet"), ("arrow", ".arrow")])
+def test_columnar_round_trip(tmp_path, monkeypatch, fmt, extension):
+    content = _columnar(fmt)
+    assert uploads.detect_format(content) == fmt
+    _assert_round_trip(uploads.StoredUpload.from_bytes(content))
+
+    upload = _stored(tmp_path, monkeypatch, content)
+    assert upload.format == fmt and upload.path.endswith(extension)
+    _assert_round_trip(upload)
+    uploads.release(upload)
+
+
+def test_plain_csv_keeps_csv_extension(tmp_path, monkeypatch):
+    upload = _stored(tmp_path, monkeypatch, CSV)
+    assert upload.path == os.path.join(uploads.UPLOAD_DIR, hashlib.sha256(CSV).hexdigest() + ".csv")
+    _assert_round_trip(upload)
+    uploads.release(upload)
@@ -0,0 +1,184 @@
+"""
+Lekki pomiar czasu etapów potoku raportu.
+
+Każdy raport dostaje obiekt Trace, w którym etapy (pobranie sesji Stripe,
+read_csv, handle_missing_data, ProfileReport, to_html, poszczególne scenariusze
+testów z liczbą par, składanie HTML) zapisują czas ścienny, czas CPU oraz
+szczytowe zużycie pamięci (RSS) procesu w trakcie etapu. Po zakończeniu raportu
+podsumowanie trafia do logu w postaci jednej linii JSON, a zagregowane
+histogramy są dostępne w formacie tekstowym Prometheusa (endpoint /metrics).
+
+Logger podsumowań ("analiza_danych.report") ma własny poziom i handler (stderr):
+pod konfiguracją logowania uvicorn bez nich dziedziczyłby poziom WARNING
+i podsumowania nie trafiałyby do logu.
+
+Konfiguracja: REPORT_LOG_LEVEL (poziom logu podsumowań, domyślnie INFO).
+"""
+import json
+import logging
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger("analiza_danych.report")
+REPORT_LOG_LEVEL = os.getenv("REPORT_LOG_LEVEL", "INFO").upper()
+if not logger.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    logger.addHandler(_handler)
+logger.setLevel(REPORT_LOG_LEVEL)
+logger.propagate = False
+
+RSS_SAMPLE_INTERVAL = 0.02
+
+WALL_BUCKETS = [0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600]
+RSS_BUCKETS = [2 ** p * 1024 * 1024 for p in range(5, 14)]  # 32 MB ... 8 GB
+
+try:
+    import psutil
+    _process = psutil.Process(os.getpid())
+except ImportError:
+    psutil = None
+
+
+def _rss():
+    global _process
+    if psutil is None:
+        return 0
+    if _process.pid != os.getpid():
+        # Proces potomny (pula raportów) - uchwyt musi wskazywać bieżący proces
+        _process = psutil.Process(os.getpid())
+    return _process.memory_info().rss
+
+
+class _PeakRssSampler:
+    def __init__(self):
+        self.peak = _rss()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(RSS_SAMPLE_INTERVAL):
+            self.peak = max(self.peak, _rss())
+
+    def __enter__(self):
+        if psutil is not None:
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        self.peak = max(self.peak, _rss())
+
+
+class Trace:
+    def __init__(self, report_id=None):
+        self.report_id = report_id
+        self.records = []
+
+    @contextmanager
+    def stage(self, name, **attrs):
+        """Mierzy etap; zwrócony słownik można uzupełnić atrybutami (np. liczbą par)."""
+        record = {"stage": name, **attrs}
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        with _PeakRssSampler() as sampler:
+            try:
+                yield record
+            finally:
+                record["wall_s"] = round(time.perf_counter() - wall_start, 6)
+                record["cpu_s"] = round(time.process_time() - cpu_start, 6)
+        record["peak_rss_bytes"] = sampler.peak
+        self.records.append(record)
+
+    def extend(self, records):
+        self.records.extend(records)
+
+    def summary(self):
+        return {"report_id": self.report_id, "stages": self.records}
+
+
+class _NullTrace:
+    """Zastępuje Trace, gdy pomiar nie jest potrzebny (np. wywołania poza serwerem)."""
+
+    @contextmanager
+    def stage(self, name, **attrs):
+        yield dict(attrs)
+
+    def extend(self, records):
+        pass
+
+
+NULL_TRACE = _NullTrace()
+
+
+# --- Agregacja i eksport w formacie Prometheusa ---
+
+class _Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.total += value
+        self.count += 1
+
+
+_metrics_lock = threading.Lock()
+_histograms = {}  # (metryka, etap) -> _Histogram
+_pairs_total = {}  # etap -> liczba par
+
+METRICS = {
+    "report_stage_wall_seconds": ("Czas ścienny etapu generowania raportu (s).", "wall_s", WALL_BUCKETS),
+    "report_stage_cpu_seconds": ("Czas CPU etapu generowania raportu (s).", "cpu_s", WALL_BUCKETS),
+    "report_stage_peak_rss_bytes": ("Szczytowa pamięć RSS procesu w trakcie etapu (B).", "peak_rss_bytes", RSS_BUCKETS),
+}
+
+
+def observe(records):
+    with _metrics_lock:
+        for record in records:
+            for metric, (_, key, buckets) in METRICS.items():
+                if key in record:
+                    hist = _histograms.setdefault((metric, record["stage"]), _Histogram(buckets))
+                    hist.observe(record[key])
+            if "pairs" in record:
+                _pairs_total[record["stage"]] = _pairs_total.get(record["stage"], 0) + record["pairs"]
+
+
+def finish(trace):
+    """Loguje podsumowanie raportu i dolicza jego etapy do histogramów."""
+    logger.info(json.dumps(trace.summary(), ensure_ascii=False))
+    observe(trace.records)
+
+
+def _format_bound(bound):
+    return "+Inf" if math.isinf(bound) else repr(float(bound))
+
+
+def render_prometheus():
+    lines = []
+    with _metrics_lock:
+        for metric, (help_text, _, _) in METRICS.items():
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} histogram")
+            for (name, stage), hist in sorted(_histograms.items()):
+                if name != metric:
+                    continue
+                for bound, count in zip(hist.buckets + [math.inf], hist.counts + [hist.count]):
+                    lines.append(f'{metric}_bucket{{stage="{stage}",le="{_format_bound(bound)}"}} {count}')
+                lines.append(f'{metric}_sum{{stage="{stage}"}} {hist.total}')
+                lines.append(f'{metric}_count{{stage="{stage}"}} {hist.count}')
+        lines.append("# HELP report_stage_pairs_total Liczba par zmiennych przetworzonych w scenariuszu testów.")
+        lines.append("# TYPE report_stage_pairs_total counter")
+        for stage, pairs in sorted(_pairs_total.items()):
+            lines.append(f'report_stage_pairs_total{{stage="{stage}"}} {pairs}')
+    return "\n".join(lines) + "\n"
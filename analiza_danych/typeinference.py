@@ -0,0 +1,129 @@
+"""
+Podpowiedzi typów zmiennych w podglądzie pliku.
+
+Dla każdej kolumny na powtarzalnej próbie co najwyżej TYPE_INFERENCE_SAMPLE_ROWS
+wierszy liczone są: odsetek wartości dających się odczytać jako liczby, liczba
+różnych wartości i ich udział w próbie (kolumny identyfikatorów), długość
+i liczba słów tekstu (tekst swobodny, np. opis) oraz zgodność z formatem daty.
+Na tej podstawie proponowany jest typ (ciągła, binarna, nominalna, porządkowa,
+pomiń) z oceną pewności 0-1 i krótkim uzasadnieniem. Czas działania nie zależy
+od liczby wierszy, a po przekroczeniu TYPE_INFERENCE_TIME_BUDGET_S pozostałe
+kolumny dostają 'pomiń' z pewnością 0 - użytkownik i tak może zmienić każdy typ.
+
+Liczba różnych wartości jest liczona dokładnie na próbie, a nie szkicem
+HyperLogLog (sketches.py) na całej kolumnie: szkic wymaga przejrzenia
+wszystkich wierszy każdej kolumny, a progi klasyfikacji porównują małe liczby
+(1, 2, do MAX_ORDINAL_LEVELS poziomów), dla których oszacowanie z błędem
+względnym ok. 1.6% nie wystarcza. Próba może pominąć rzadkie poziomy - wtedy
+podpowiedź zaniża liczbę kategorii; raport i tak wyznacza poziomy kolumn
+kategorycznych ze szkiców całej kolumny (sketches.plan_categorical), więc od
+próby zależy tylko podpowiedź typu.
+
+Konfiguracja: TYPE_INFERENCE_SAMPLE_ROWS (domyślnie 10000),
+TYPE_INFERENCE_TIME_BUDGET_S (domyślnie 2).
+"""
+import os
+import re
+import time
+
+import numpy as np
+import pandas as pd
+
+TYPE_INFERENCE_SAMPLE_ROWS = int(os.getenv("TYPE_INFERENCE_SAMPLE_ROWS", "10000"))
+TYPE_INFERENCE_TIME_BUDGET = float(os.getenv("TYPE_INFERENCE_TIME_BUDGET_S", "2"))
+
+# Progi klasyfikacji
+NUMERIC_PARSE_RATIO = 0.95
+MAX_ORDINAL_LEVELS = 7
+MAX_NOMINAL_LEVELS = 50
+ID_UNIQUE_RATIO = 0.95
+FREE_TEXT_MEAN_LENGTH = 40
+FREE_TEXT_MEAN_WORDS = 5
+DATE_RATIO = 0.9
+
+ID_NAME = re.compile(r"(^|[_\W])(id|uuid|guid|pesel|nip|regon|kod|numer|nr)([_\W]|$)", re.IGNORECASE)
+DATE_PATTERN = re.compile(r"^\s*(\d{4}[-/.]\d{1,2}[-/.]\d{1,2}|\d{1,2}[-/.]\d{1,2}[-/.]\d{4})([ T]\d{1,2}:\d{2}(:\d{2})?)?\s*$")
+
+
+def _suggestion(type_, confidence, reason):
+    return {"type": type_, "confidence": round(float(confidence), 2), "reason": reason}
+
+
+def sample_rows(df: pd.DataFrame, size=TYPE_INFERENCE_SAMPLE_ROWS):
+    """Powtarzalna próba wierszy (pierwsze wiersze pliku + losowe z całości)."""
+    n = len(df)
+    if n <= size:
+        return df
+    head = np.arange(min(size // 10, n))
+    rest = np.random.default_rng([0, n]).choice(np.arange(len(head), n), size - len(head), replace=False)
+    return df.iloc[np.concatenate([head, np.sort(rest)])]
+
+
+def infer_column(name, series: pd.Series):
+    """Propozycja typu dla jednej kolumny (próby): słownik type / confidence / reason."""
+    values = series.dropna()
+    if values.empty:
+        return _suggestion("pomiń", 1.0, "kolumna nie zawiera wartości")
+
+    n_values = len(values)
+    n_unique = values.nunique()
+    unique_ratio = n_unique / n_values
+    if pd.api.types.is_bool_dtype(values):
+        return _suggestion("binarna", 0.99, "wartości logiczne")
+
+    if pd.api.types.is_numeric_dtype(values):
+        numeric = values.astype(np.float64)
+        parse_ratio = 1.0
+    else:
+        text = values.astype(str)
+        numeric = pd.to_numeric(text.str.replace(",", ".", regex=False), errors="coerce").dropna()
+        parse_ratio = len(numeric) / n_values
+
+    if n_unique == 2:
+        if parse_ratio == 1.0:
+            return _suggestion("binarna", 0.98, "dwie wartości liczbowe")
+        # Kolumny binarne są w raporcie zamieniane na liczby, więc tekstowe dwie kategorie
+        # (np. K/M, tak/nie) analizujemy jako zmienną nominalną
+        return _suggestion("nominalna", 0.8, "dwie kategorie tekstowe")
+    if n_unique == 1:
+        return _suggestion("pomiń", 0.95, "stała wartość")
+
+    if parse_ratio >= NUMERIC_PARSE_RATIO:
+        is_integer = bool(np.all(np.mod(numeric, 1) == 0))
+        if is_integer and unique_ratio >= ID_UNIQUE_RATIO and n_values >= 20 and (
+            ID_NAME.search(name) or numeric.is_monotonic_increasing
+        ):
+            return _suggestion("pomiń", 0.9, "prawdopodobnie identyfikator (unikalne liczby całkowite)")
+        if is_integer and n_unique <= MAX_ORDINAL_LEVELS:
+            return _suggestion("porządkowa", 0.55, f"liczby całkowite o {n_unique} poziomach (skala lub liczność)")
+        confidence = parse_ratio * (0.95 if n_unique >= 20 else 0.7)
+        reason = "wartości liczbowe" if parse_ratio == 1 else f"{parse_ratio:.0%} wartości liczbowych"
+        return _suggestion("ciągła", confidence, reason)
+
+    text = values.astype(str)
+    if text.str.match(DATE_PATTERN).mean() >= DATE_RATIO:
+        return _suggestion("pomiń", 0.85, "daty")
+    lengths = text.str.len()
+    if lengths.mean() >= FREE_TEXT_MEAN_LENGTH or text.str.count(r"\s+").mean() + 1 >= FREE_TEXT_MEAN_WORDS:
+        return _suggestion("pomiń", 0.9, "tekst swobodny")
+    if unique_ratio >= ID_UNIQUE_RATIO and n_values >= 20:
+        return _suggestion("pomiń", 0.9, "prawdopodobnie identyfikator (unikalne wartości)")
+    if n_unique <= MAX_NOMINAL_LEVELS:
+        confidence = 0.9 if n_unique <= 20 else 0.7
+        if parse_ratio > 0.5:
+            confidence -= 0.2
+        return _suggestion("nominalna", confidence, f"{n_unique} kategorii")
+    return _suggestion("pomiń", 0.6, f"zbyt wiele kategorii ({n_unique}) do analizy")
+
+
+def infer_types(df: pd.DataFrame, time_budget=TYPE_INFERENCE_TIME_BUDGET):
+    """Propozycje typów dla wszystkich kolumn: {kolumna: {type, confidence, reason}}."""
+    deadline = time.monotonic() + time_budget
+    sample = sample_rows(df)
+    suggestions = {}
+    for col in df.columns:
+        if time.monotonic() > deadline:
+            suggestions[col] = _suggestion("pomiń", 0.0, "nie oceniono (przekroczony limit czasu)")
+            continue
+        suggestions[col] = infer_column(str(col), sample[col])
+    return suggestions
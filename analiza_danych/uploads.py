@@ -0,0 +1,499 @@
+"""
+Strumieniowe przyjmowanie przesyłanych plików.
+
+Plik z formularza jest czytany fragmentami (UPLOAD_CHUNK_SIZE), a w trakcie
+odczytu liczony jest jego skrót SHA-256, rozmiar i liczba wierszy. Małe pliki
+(do UPLOAD_SPOOL_MAX_MB) zostają w pamięci, większe są zapisywane na dysk
+w katalogu UPLOAD_DIR pod nazwą równą skrótowi, z rozszerzeniem rozpoznanego
+formatu (np. .parquet, .csv.gz), więc ten sam plik przesłany ponownie nie
+zajmuje dodatkowego miejsca. Czytnik CSV dostaje ścieżkę
+(z memory_map), a proces raportowy - tylko lekki obiekt StoredUpload.
+
+Podgląd (/api/parse-preview) zostawia plik na serwerze i zwraca token
+(UPLOAD_TOKEN_TTL_S, domyślnie godzina), który create_payment_session przyjmuje
+zamiast ponownego przesłania pliku. Pliki pod tokenami trzymają w pamięci treść
+(małe pliki) i mapę braków; gdy łącznie przekroczą UPLOAD_TOKEN_MAX_MB (domyślnie
+512) albo tokenów jest więcej niż UPLOAD_TOKEN_MAX_COUNT (domyślnie 1000),
+najstarsze tokeny wygasają wcześniej (płatność z takim tokenem dostaje 410
+i frontend przesyła plik ponownie).
+
+Pliki większe niż MAX_UPLOAD_MB są odrzucane (413): przez middleware na
+podstawie nagłówka Content-Length albo licznika bajtów ciała żądania, zanim
+całe żądanie zostanie odebrane.
+
+Poza CSV przyjmowane są pliki Parquet, Arrow IPC/Feather (v2) oraz CSV
+skompresowane gzip, zstd i bz2, rozpoznawane po pierwszych bajtach (magic
+bytes), a nie po nazwie. Dla nich liczba wierszy i nagłówek (potrzebne do
+szacunku pamięci i podglądu) pochodzą z metadanych pliku albo z dekompresji
+strumieniowej. Czytniki przyjmują listę kolumn i wczytują tylko je (usecols,
+projekcja kolumn Arrow). Parquet i Arrow wymagają pakietu pyarrow, zstd -
+pakietu zstandard; bez nich plik jest odrzucany z czytelnym komunikatem.
+
+Skoroszyty Excel (.xlsx, .xls) są czytane przez excel.py: liczba wierszy
+i nagłówek pochodzą z wybranego arkusza (domyślnie pierwszego), a podgląd innego
+arkusza tego samego pliku dostaje osobny StoredUpload (with_sheet).
+"""
+import asyncio
+import bz2
+import copy
+import csv
+import gzip
+import hashlib
+import io
+import os
+import tempfile
+import secrets
+import threading
+import time
+
+import pandas as pd
+
+import excel
+
+MAX_UPLOAD_BYTES = int(float(os.getenv("MAX_UPLOAD_MB", "500")) * 1024 * 1024)
+UPLOAD_SPOOL_MAX_BYTES = int(float(os.getenv("UPLOAD_SPOOL_MAX_MB", "8")) * 1024 * 1024)
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+UPLOAD_TOKEN_TTL = int(os.getenv("UPLOAD_TOKEN_TTL_S", "3600"))
+UPLOAD_TOKEN_MAX_BYTES = int(float(os.getenv("UPLOAD_TOKEN_MAX_MB", "512")) * 1024 * 1024)
+UPLOAD_TOKEN_MAX_COUNT = int(os.getenv("UPLOAD_TOKEN_MAX_COUNT", "1000"))
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", os.path.join(tempfile.gettempdir(), "analiza_danych_uploads"))
+
+# Zapas na nagłówki części formularza (multipart) i pozostałe pola
+FORM_OVERHEAD_BYTES = 1024 * 1024
+LIMITED_PATHS = ("/api/parse-preview", "/api/create-payment-session")
+
+
+class UploadTooLarge(ValueError):
+    def __init__(self):
+        super().__init__(f"Plik jest zbyt duży. Maksymalny rozmiar pliku to {MAX_UPLOAD_BYTES // (1024 * 1024)} MB.")
+
+
+class UnsupportedFormat(ValueError):
+    pass
+
+
+# Formaty rozpoznawane po pierwszych bajtach pliku; pozostałe pliki traktujemy jako CSV
+MAGIC_BYTES = (
+    (b"PAR1", "parquet"),
+    (b"ARROW1", "arrow"),
+    (b"\x1f\x8b", "gzip"),
+    (b"\x28\xb5\x2f\xfd", "zstd"),
+    (b"BZh", "bz2"),
+    (b"PK\x03\x04", "xlsx"),
+    (b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1", "xls"),
+)
+COMPRESSED_CSV = ("gzip", "zstd", "bz2")
+# Rozszerzenia plików w magazynie na dysku (nazwa = skrót); format i tak wyznaczają pierwsze bajty
+EXTENSIONS = {
+    "csv": ".csv", "parquet": ".parquet", "arrow": ".arrow", "gzip": ".csv.gz", "zstd": ".csv.zst", "bz2": ".csv.bz2",
+    "xlsx": ".xlsx", "xls": ".xls",
+}
+FORMAT_NAMES = {"parquet": "Parquet", "arrow": "Arrow/Feather", "zstd": "CSV (zstd)", "xlsx": "Excel (.xlsx)", "xls": "Excel (.xls)"}
+EXCEL_READERS = {"xlsx": "openpyxl", "xls": "xlrd"}
+
+
+def detect_format(head: bytes) -> str:
+    for magic, name in MAGIC_BYTES:
+        if head.startswith(magic):
+            return name
+    return "csv"
+
+
+def _require(module, fmt):
+    """Importuje opcjonalną bibliotekę czytnika albo zgłasza UnsupportedFormat z nazwą brakującego pakietu."""
+    import importlib
+    try:
+        return importlib.import_module(module)
+    except ImportError:
+        package = module.split(".")[0]
+        raise UnsupportedFormat(
+            f"Obsługa plików {FORMAT_NAMES[fmt]} wymaga pakietu {package}, który nie jest zainstalowany na serwerze. "
+            "Prześlij plik CSV."
+        )
+
+
+class StoredUpload:
+    """Przesłany plik: w pamięci (content) albo na dysku (path), z metadanymi z odczytu strumieniowego."""
+
+    def __init__(self, size, sha256, line_count, header, content=None, path=None):
+        self.size = size
+        self.sha256 = sha256
+        self.format = detect_format(header)
+        self.line_count = line_count
+        self.header = header
+        self.content = content
+        self.path = path
+        self.null_bitmap = None  # nullmap.NullBitmap z podglądu, używana ponownie w raporcie
+        self.sheets = None  # nazwy arkuszy skoroszytu Excel
+        self.sheet = None  # arkusz, którego dotyczą line_count, header i odczyt
+
+    @classmethod
+    def from_bytes(cls, content):
+        header = content.split(b"\n", 1)[0]
+        return cls(len(content), hashlib.sha256(content).hexdigest(), content.count(b"\n"), header, content=content).inspect()
+
+    def source(self):
+        """Argument dla pd.read_csv: ścieżka pliku na dysku albo bufor w pamięci."""
+        return self.path if self.path is not None else io.BytesIO(self.content)
+
+    def inspect(self):
+        """Dla plików innych niż CSV: liczba wierszy i wiersz nagłówka w postaci CSV (z metadanych lub po dekompresji)."""
+        if self.format == "csv":
+            return self
+        if self.format == "parquet":
+            parquet = _require("pyarrow.parquet", self.format)
+            parquet_file = parquet.ParquetFile(self.source())
+            self.line_count = parquet_file.metadata.num_rows
+            names = parquet_file.schema_arrow.names
+        elif self.format == "arrow":
+            reader = _arrow_reader(self)
+            self.line_count = sum(reader.get_batch(i).num_rows for i in range(reader.num_record_batches))
+            names = reader.schema.names
+        elif self.format in excel.FORMATS:
+            _require(EXCEL_READERS[self.format], self.format)
+            try:
+                self.sheets, self.sheet, self.line_count, names = excel.describe(self.source(), self.format, self.sheet)
+            except excel.InvalidWorkbook as e:
+                raise UnsupportedFormat(str(e))
+        else:
+            line_count, head = 0, b""
+            with _decompressed(self) as stream:
+                for block in iter(lambda: stream.read(UPLOAD_CHUNK_SIZE), b""):
+                    line_count += block.count(b"\n")
+                    if b"\n" not in head and len(head) < UPLOAD_CHUNK_SIZE:
+                        head += block
+            self.line_count = line_count
+            self.header = head.split(b"\n", 1)[0]
+            return self
+        header = io.StringIO()
+        csv.writer(header).writerow(names)
+        self.header = header.getvalue().rstrip("\r\n").encode("utf-8")
+        return self
+
+    def with_sheet(self, sheet):
+        """Ten sam skoroszyt z innym arkuszem; nowy obiekt przejmuje odwołanie do pliku od wywołującego."""
+        if sheet not in (self.sheets or ()):
+            raise ValueError(f"Plik nie zawiera arkusza '{sheet}'.")
+        upload = copy.copy(self)
+        upload.sheet = sheet
+        upload.null_bitmap = None
+        return upload.inspect()
+
+    def read_bytes(self):
+        if self.content is not None:
+            return self.content
+        with open(self.path, "rb") as f:
+            return f.read()
+
+
+# Licznik odwołań do plików na dysku - ten sam plik (skrót) może należeć do kilku sesji
+_refs_lock = threading.Lock()
+_refs = {}
+
+
+def _store_on_disk(tmp_path, sha256, fmt):
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    path = os.path.join(UPLOAD_DIR, sha256 + EXTENSIONS[fmt])
+    with _refs_lock:
+        if _refs.get(path, 0) > 0 and os.path.exists(path):
+            os.remove(tmp_path)
+        else:
+            os.replace(tmp_path, path)
+        _refs[path] = _refs.get(path, 0) + 1
+    return path
+
+
+def store_file(tmp_path, size, sha256, line_count, header):
+    """Przenosi kompletny plik tymczasowy do magazynu (nazwa = skrót z rozszerzeniem formatu) i zwraca StoredUpload."""
+    upload = StoredUpload(size, sha256, line_count, header, path=_store_on_disk(tmp_path, sha256, detect_format(header)))
+    try:
+        return upload.inspect()
+    except BaseException:
+        release(upload)
+        raise
+
+
+def retain(upload):
+    """Dodaje odwołanie do pliku na dysku (np. gdy sesja płatności korzysta z pliku spod tokenu)."""
+    if upload.path is not None:
+        with _refs_lock:
+            _refs[upload.path] = _refs.get(upload.path, 0) + 1
+    return upload
+
+
+def release(upload):
+    """Zwalnia plik na dysku, gdy nie odwołuje się do niego już żadna sesja."""
+    if upload is None or upload.path is None:
+        return
+    with _refs_lock:
+        remaining = _refs.get(upload.path, 0) - 1
+        if remaining > 0:
+            _refs[upload.path] = remaining
+            return
+        _refs.pop(upload.path, None)
+        # Usunięcie pod blokadą: równoległy _store_on_disk tego samego pliku (skrótu) nie może go
+        # w tym czasie zapisać na nowo i przejąć odwołania, bo usunęlibyśmy jego plik
+        try:
+            os.remove(upload.path)
+        except FileNotFoundError:
+            pass
+
+
+async def receive(file):
+    """Czyta UploadFile fragmentami do StoredUpload; zgłasza UploadTooLarge po przekroczeniu limitu."""
+    if file.size is not None and file.size > MAX_UPLOAD_BYTES:
+        raise UploadTooLarge()
+    digest = hashlib.sha256()
+    size = 0
+    line_count = 0
+    head = b""  # początek pliku, do wyznaczenia wiersza nagłówka
+    buffer = io.BytesIO()
+    spill = None  # plik tymczasowy, gdy rozmiar przekroczy próg trzymania w pamięci
+    try:
+        while True:
+            chunk = await file.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > MAX_UPLOAD_BYTES:
+                raise UploadTooLarge()
+            digest.update(chunk)
+            line_count += chunk.count(b"\n")
+            if b"\n" not in head and len(head) < UPLOAD_CHUNK_SIZE:
+                head += chunk
+            if spill is None and size > UPLOAD_SPOOL_MAX_BYTES:
+                os.makedirs(UPLOAD_DIR, exist_ok=True)
+                spill = tempfile.NamedTemporaryFile(dir=UPLOAD_DIR, suffix=".part", delete=False)
+                spill.write(buffer.getvalue())
+                buffer = None
+            (spill if spill is not None else buffer).write(chunk)
+    except BaseException:
+        if spill is not None:
+            spill.close()
+            os.remove(spill.name)
+        raise
+
+    header = head.split(b"\n", 1)[0]
+    sha256 = digest.hexdigest()
+    if spill is None:
+        content = buffer.getvalue()
+        upload = StoredUpload(size, sha256, line_count, header, content=content)
+        return await asyncio.to_thread(upload.inspect)
+    spill.close()
+    return await asyncio.to_thread(store_file, spill.name, size, sha256, line_count, header)
+
+
+# --- Tokeny przesłanych plików (upload-once) ---
+
+_tokens_lock = threading.Lock()
+_tokens = {}  # token -> (StoredUpload, kolumny, czas wygaśnięcia, bajty w pamięci); kolejność = kolejność wydania
+
+
+def _held_bytes(upload):
+    """Pamięć trzymana przez plik pod tokenem: treść małego pliku i mapa braków z podglądu."""
+    size = len(upload.content) if upload.content is not None else 0
+    if upload.null_bitmap is not None:
+        size += upload.null_bitmap.bits.nbytes
+    return size
+
+
+def _expire_tokens(now):
+    with _tokens_lock:
+        expired = [token for token, (_, _, expires_at, _) in _tokens.items() if expires_at <= now]
+        uploads = [_tokens.pop(token)[0] for token in expired]
+    for upload in uploads:
+        release(upload)
+
+
+def issue_token(upload, columns):
+    """Zachowuje przesłany plik (wraz z listą kolumn) pod nowym tokenem; token przejmuje odwołanie do pliku."""
+    now = time.monotonic()
+    _expire_tokens(now)
+    token = secrets.token_urlsafe(24)
+    evicted = []
+    with _tokens_lock:
+        _tokens[token] = (upload, list(columns), now + UPLOAD_TOKEN_TTL, _held_bytes(upload))
+        held = sum(entry[3] for entry in _tokens.values())
+        # Limit pamięci i liczby tokenów: najstarsze ustępują (nowy token zostaje, nawet gdy sam przekracza limit)
+        while len(_tokens) > 1 and (held > UPLOAD_TOKEN_MAX_BYTES or len(_tokens) > UPLOAD_TOKEN_MAX_COUNT):
+            entry = _tokens.pop(next(iter(_tokens)))
+            held -= entry[3]
+            evicted.append(entry[0])
+    for old_upload in evicted:
+        release(old_upload)
+    return token
+
+
+def redeem_token(token):
+    """(StoredUpload z nowym odwołaniem, kolumny) dla ważnego tokenu albo None. Token pozostaje ważny."""
+    _expire_tokens(time.monotonic())
+    with _tokens_lock:
+        entry = _tokens.get(token)
+        if entry is None:
+            return None
+        upload, columns, _, _ = entry
+        return retain(upload), columns
+
+
+def discard_token(token):
+    with _tokens_lock:
+        entry = _tokens.pop(token, None)
+    if entry is not None:
+        release(entry[0])
+
+
+def _arrow_reader(upload):
+    pyarrow = _require("pyarrow", "arrow")
+    source = pyarrow.memory_map(upload.path) if upload.path is not None else pyarrow.BufferReader(upload.content)
+    return pyarrow.ipc.open_file(source)
+
+
+def _decompressed(upload):
+    if upload.format == "gzip":
+        return gzip.open(upload.source())
+    if upload.format == "bz2":
+        return bz2.open(upload.source())
+    zstandard = _require("zstandard", "zstd")
+    return zstandard.ZstdDecompressor().stream_reader(
+        open(upload.path, "rb") if upload.path is not None else io.BytesIO(upload.content),
+        read_across_frames=True, closefd=True,
+    )
+
+
+def _csv_options(upload, columns, kwargs):
+    if upload.format in COMPRESSED_CSV:
+        if upload.format == "zstd":
+            _require("zstandard", "zstd")
+        kwargs["compression"] = upload.format
+    elif upload.path is not None:
+        kwargs.setdefault("memory_map", True)
+    if columns is not None:
+        kwargs["usecols"] = columns
+    return kwargs
+
+
+def read_csv(upload, columns=None, **kwargs):
+    """pd.read_csv dla przesłanego pliku CSV, także skompresowanego (UTF-8, a przy błędzie dekodowania latin1)."""
+    kwargs = _csv_options(upload, columns, kwargs)
+    try:
+        return pd.read_csv(upload.source(), encoding="utf-8", **kwargs)
+    except UnicodeDecodeError:
+        return pd.read_csv(upload.source(), encoding="latin1", **kwargs)
+
+
+def column_names(upload):
+    """Nazwy kolumn tak, jak zwróci je read_frame (np. do sprawdzenia typów zmiennych przed płatnością)."""
+    if upload.format == "csv" or upload.format in COMPRESSED_CSV:
+        return list(read_csv(upload, nrows=0).columns)
+    # Dla pozostałych formatów nagłówek to już nazwy kolumn zapisane jako wiersz CSV (zob. StoredUpload.inspect)
+    return next(csv.reader([upload.header.decode("utf-8")]), [])
+
+
+def read_frame(upload, columns=None, **csv_kwargs):
+    """Cały plik jako DataFrame; columns ogranicza odczyt do wskazanych kolumn. csv_kwargs dotyczą tylko CSV."""
+    if upload.format == "parquet":
+        _require("pyarrow.parquet", upload.format)
+        return pd.read_parquet(upload.source(), columns=columns)
+    if upload.format == "arrow":
+        _require("pyarrow", upload.format)
+        return pd.read_feather(upload.source(), columns=columns)
+    if upload.format in excel.FORMATS:
+        _require(EXCEL_READERS[upload.format], upload.format)
+        return excel.read_sheet(upload.source(), upload.format, upload.sheet, columns)
+    return read_csv(upload, columns, **csv_kwargs)
+
+
+def read_head(upload, n_rows):
+    """Nagłówek i najwyżej n_rows pierwszych wierszy arkusza Excel, bez wczytywania całego arkusza."""
+    _require(EXCEL_READERS[upload.format], upload.format)
+    return excel.read_head(upload.source(), upload.format, upload.sheet, n_rows)
+
+
+def read_chunks(upload, chunksize, columns=None, encoding="utf-8", **csv_kwargs):
+    """Kolejne porcje pliku (po chunksize wierszy) jako DataFrame; csv_kwargs dotyczą tylko CSV.
+
+    Bez memory_map (inaczej niż read_csv): odwzorowany w pamięci plik większy niż RAM zawyżałby pamięć procesu.
+    """
+    if upload.format == "parquet":
+        parquet = _require("pyarrow.parquet", upload.format)
+        for batch in parquet.ParquetFile(upload.source()).iter_batches(batch_size=chunksize, columns=columns):
+            yield batch.to_pandas()
+        return
+    if upload.format == "arrow":
+        pyarrow = _require("pyarrow", upload.format)
+        reader = _arrow_reader(upload)
+        for i in range(reader.num_record_batches):
+            table = pyarrow.Table.from_batches([reader.get_batch(i)])
+            if columns is not None:
+                table = table.select(columns)
+            for start in range(0, table.num_rows, chunksize):
+                yield table.slice(start, chunksize).to_pandas()
+        return
+    if upload.format in excel.FORMATS:
+        _require(EXCEL_READERS[upload.format], upload.format)
+        yield from excel.iter_frames(upload.source(), upload.format, upload.sheet, chunksize, columns)
+        return
+    csv_kwargs = _csv_options(upload, columns, csv_kwargs)
+    csv_kwargs.pop("memory_map", None)
+    with pd.read_csv(upload.source(), encoding=encoding, chunksize=chunksize, **csv_kwargs) as reader:
+        yield from reader
+
+
+class UploadSizeLimitMiddleware:
+    """Odrzuca zbyt duże żądania z plikami (413), zanim zostaną odebrane w całości."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in LIMITED_PATHS:
+            return await self.app(scope, receive, send)
+
+        limit = MAX_UPLOAD_BYTES + FORM_OVERHEAD_BYTES
+        headers = dict(scope["headers"])
+        content_length = headers.get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > limit:
+            return await self._reject(scope, send)
+
+        # Bez Content-Length (np. chunked) liczymy bajty ciała w trakcie odbioru; po przekroczeniu
+        # limitu aplikacja dostaje rozłączenie, a jej odpowiedź zastępujemy odpowiedzią 413
+        received = 0
+        too_large = False
+        response_started = False
+
+        async def limited_receive():
+            nonlocal received, too_large
+            if too_large:
+                return {"type": "http.disconnect"}
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    too_large = True
+                    return {"type": "http.disconnect"}
+            return message
+
+        async def guarded_send(message):
+            nonlocal response_started
+            if too_large:
+                return
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except Exception:
+            if not too_large:
+                raise
+        if too_large and not response_started:
+            await self._reject(scope, send)
+
+    async def _reject(self, scope, send):
+        from fastapi.responses import JSONResponse
+
+        async def no_receive():
+            return {"type": "http.disconnect"}
+
+        response = JSONResponse(status_code=413, content={"detail": str(UploadTooLarge())})
+        await response(scope, no_receive, send)
@@ -0,0 +1,199 @@
+"""
+Pula procesów roboczych generujących raporty, z rozgrzanym stosem analitycznym.
+
+Raporty są liczone w osobnych procesach (pula ProcessPoolExecutor), dzięki czemu
+ciężkie obliczenia nie blokują pętli zdarzeń serwera. Procesy tworzone są przez
+forkserver z wstępnie zaimportowanym stosem analitycznym (pandas, scipy, numba,
+ydata_profiling, matplotlib), a każdy z nich przed przyjęciem pierwszego
+zadania (initializer puli) generuje mały raport próbny na danych
+z generate_sample_csv, co kompiluje jądra numba i buduje pamięć podręczną
+czcionek matplotlib. Rozgrzane procesy zgłaszają się przez kolejkę; dopiero gdy
+zgłoszą się wszystkie, status() zgłasza gotowość (/api/health/ready), więc load
+balancer kieruje płatny ruch wyłącznie do rozgrzanych instancji.
+
+Konfiguracja: REPORT_WORKERS - liczba procesów (domyślnie 1); 0 oznacza
+generowanie raportów w wątku procesu serwera (np. lokalnie lub w testach).
+"""
+import asyncio
+import multiprocessing
+import os
+import queue
+import sys
+import tempfile
+import threading
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+REPORT_WORKERS = int(os.getenv("REPORT_WORKERS", "1"))
+
+# Moduły ładowane w forkserverze, zanim zostaną z niego utworzone procesy robocze
+PRELOAD_MODULES = [
+    "numpy", "pandas", "scipy.stats", "matplotlib.pyplot", "ydata_profiling",
+    "kernels", "moments", "regression", "sampling", "sketches", "outofcore", "corrections", "uploads", "app",
+]
+
+SAMPLE_VARIABLE_TYPES = {
+    "Wiek": "ciągła",
+    "Przychód": "ciągła",
+    "Liczba_Dzieci": "ciągła",
+    "Płeć": "binarna",
+    "Czy_Aktywny": "binarna",
+    "Miasto": "nominalna",
+}
+
+
+class WorkerCrashed(RuntimeError):
+    pass
+
+
+_lock = threading.Lock()
+_state = {"pool": None, "ready": False, "warm_workers": 0, "started_at": None, "ready_at": None, "error": None}
+
+
+# --- Funkcje wykonywane w procesach roboczych ---
+
+def _synthetic_csv(num_rows=300):
+    """Mały plik CSV z generate_sample_csv (z katalogu głównego repozytorium) jako bajty."""
+    root = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+    if root not in sys.path:
+        sys.path.append(root)
+    from generate_sample_csv import generate_sample_csv
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "warm_up.csv")
+        generate_sample_csv(path, num_rows=num_rows)
+        with open(path, "rb") as f:
+            return f.read()
+
+
+def warm_up_worker():
+    """Rozgrzewa bieżący proces: importy, kompilacja jąder numba i raport próbny."""
+    import kernels
+    kernels.warm_up()
+
+    import app
+    import uploads
+    status_code, _ = app.build_report(uploads.StoredUpload.from_bytes(_synthetic_csv()), SAMPLE_VARIABLE_TYPES, "impute")
+    if status_code != 200:
+        raise RuntimeError(f"Raport próbny zakończył się kodem {status_code}.")
+    return os.getpid()
+
+
+def _init_worker(ready_queue):
+    """Initializer puli: rozgrzewa proces i zgłasza (pid, błąd) procesowi serwera."""
+    try:
+        warm_up_worker()
+    except Exception as e:
+        ready_queue.put((os.getpid(), f"{type(e).__name__}: {e}"))
+        raise
+    ready_queue.put((os.getpid(), None))
+
+
+def _run_report(*args):
+    import app
+    import tracing
+    trace = tracing.Trace()
+    status_code, content = app.build_report(*args, trace=trace)
+    return status_code, content, trace.records
+
+
+# --- Zarządzanie pulą (proces serwera) ---
+
+def _create_pool():
+    """(pula, kolejka zgłoszeń rozgrzanych procesów)."""
+    methods = multiprocessing.get_all_start_methods()
+    # forkserver nie jest dostępny na Windows - wtedy procesy tworzone są przez spawn
+    ctx = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+    if ctx.get_start_method() == "forkserver":
+        app_dir = os.path.dirname(os.path.abspath(__file__))
+        if app_dir not in sys.path:
+            sys.path.insert(0, app_dir)
+        ctx.set_forkserver_preload(PRELOAD_MODULES)
+    ready_queue = ctx.Queue()
+    pool = ProcessPoolExecutor(max_workers=REPORT_WORKERS, mp_context=ctx, initializer=_init_worker, initargs=(ready_queue,))
+    return pool, ready_queue
+
+
+def _warm_up_pool(pool, ready_queue):
+    try:
+        if pool is None:
+            warm_up_worker()
+            warmed = {os.getpid()}
+        else:
+            # Procesy forkserver/spawn powstają dopiero przy zleceniu, po jednym na zadanie, na które nie czeka
+            # wolny proces - REPORT_WORKERS pustych zadań uruchamia całą pulę (rozgrzewa ją initializer)
+            futures = [pool.submit(int) for _ in range(REPORT_WORKERS)]
+            warmed = set()
+            while len(warmed) < REPORT_WORKERS:
+                try:
+                    pid, error = ready_queue.get(timeout=1)
+                except queue.Empty:
+                    with _lock:
+                        if _state["pool"] is not pool:
+                            return
+                    # Proces zginął podczas rozgrzewania - pula jest zepsuta, puste zadania kończą się błędem
+                    for future in futures:
+                        if future.done() and future.exception() is not None:
+                            raise future.exception()
+                    continue
+                if error is not None:
+                    raise RuntimeError(error)
+                warmed.add(pid)
+                with _lock:
+                    if _state["pool"] is pool:
+                        _state["warm_workers"] = len(warmed)
+        with _lock:
+            if _state["pool"] is pool:
+                _state.update(ready=True, warm_workers=len(warmed), ready_at=time.time(), error=None)
+    except Exception as e:
+        traceback.print_exc()
+        with _lock:
+            if _state["pool"] is pool:
+                _state.update(ready=False, error=f"Rozgrzewanie procesów raportowych nie powiodło się: {e}")
+
+
+def start():
+    """Tworzy pulę i uruchamia rozgrzewanie w tle (nie blokuje startu serwera)."""
+    with _lock:
+        pool, ready_queue = _create_pool() if REPORT_WORKERS > 0 else (None, None)
+        _state.update(pool=pool, ready=False, warm_workers=0, started_at=time.time(), ready_at=None, error=None)
+    threading.Thread(target=_warm_up_pool, args=(pool, ready_queue), daemon=True).start()
+
+
+def stop():
+    with _lock:
+        pool = _state["pool"]
+        _state.update(pool=None, ready=False, warm_workers=0)
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def status():
+    with _lock:
+        return {
+            "ready": _state["ready"],
+            "workers": REPORT_WORKERS,
+            "warm_workers": _state["warm_workers"],
+            "warm_up_seconds": round(_state["ready_at"] - _state["started_at"], 2) if _state["ready_at"] else None,
+            "error": _state["error"],
+        }
+
+
+async def run_report(*args):
+    """Generuje raport w puli procesów (lub w wątku, gdy REPORT_WORKERS=0).
+
+    Zwraca (kod HTTP, HTML, pomiary etapów z procesu roboczego - zob. tracing.py).
+    """
+    with _lock:
+        pool = _state["pool"]
+    if pool is None:
+        return await asyncio.to_thread(_run_report, *args)
+    try:
+        return await asyncio.wrap_future(pool.submit(_run_report, *args))
+    except BrokenProcessPool:
+        # Proces roboczy zginął (np. przez brak pamięci) - odtwórz i rozgrzej pulę od nowa
+        stop()
+        start()
+        raise WorkerCrashed("Proces generujący raport został przerwany. Spróbuj ponownie za chwilę.")
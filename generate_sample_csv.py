@@ -1,10 +1,31 @@
+import argparse
+
 import pandas as pd
 import numpy as np
-import random
 
-def generate_sample_csv(filename="sample_data.csv", num_rows=1000):
+CITIES = np.array(["Warszawa", "Kraków", "Gdańsk", "Wrocław", "Poznań", "Katowice", np.nan], dtype=object)
+CITY_P = [0.2, 0.15, 0.1, 0.1, 0.1, 0.1, 0.25]
+
+DESCRIPTIONS = np.array([
+    "Lorem ipsum dolor sit amet, consectetur adipiscing elit.",
+    "Sed do eiusmod tempor incididunt ut labore et dolore magna aliqua.",
+    "Ut enim ad minim veniam, quis nostrud exercitation ullamco laboris nisi ut aliquip ex ea commodo consequat.",
+    "Duis aute irure dolor in reprehenderit in voluptate velit esse cillum dolore eu fugiat nulla pariatur.",
+    "Excepteur sint occaecat cupidatat non proident, sunt in culpa qui officia deserunt mollit anim id est laborum.",
+    "", # Pusty opis
+    np.nan # Brak danych
+], dtype=object)
+DESCRIPTION_P = [0.15, 0.15, 0.15, 0.15, 0.15, 0.15, 0.1]
+
+START_DATE = np.datetime64("2020-01-01", "D")
+END_DATE = np.datetime64("2023-12-31", "D")
+
+DEFAULT_CHUNK_SIZE = 1_000_000
+
+
+def sample_chunk(rng, num_rows, first_id=1):
     """
-    Generuje przykładowy plik CSV z różnymi typami danych.
+    Generuje fragment danych przykładowych jako DataFrame (w pełni zwektoryzowane).
 
     Kolumny:
     - ID (ciągła, unikalna)
@@ -20,64 +41,189 @@ def generate_sample_csv(filename="sample_data.csv", num_rows=1000):
 
     data = {}
 
-    # 1. ID (ciągła, unikalna)
-    data["ID"] = np.arange(1, num_rows + 1)
+    # 1. ID (ciągła, unikalna) - kolejne fragmenty kontynuują numerację
+    data["ID"] = np.arange(first_id, first_id + num_rows)
 
-    # 2. Wiek (ciągła, rozkład normalny)
-    data["Wiek"] = np.random.normal(loc=35, scale=10, size=num_rows).astype(int)
-    data["Wiek"][data["Wiek"] < 18] = 18 # Minimalny wiek 18
-    data["Wiek"][data["Wiek"] > 80] = 80 # Maksymalny wiek 80
+    # 2. Wiek (ciągła, rozkład normalny), od 18 do 80 lat
+    data["Wiek"] = np.clip(rng.normal(loc=35, scale=10, size=num_rows).astype(int), 18, 80)
 
     # 3. Płeć (kategorystyczna, dyskretna)
-    genders = ["M", "K"]
-    data["Płeć"] = np.random.choice(genders, size=num_rows, p=[0.55, 0.45])
+    data["Płeć"] = np.array(["M", "K"], dtype=object)[(rng.random(num_rows) >= 0.55).astype(np.int8)]
 
     # 4. Miasto (kategorystyczna, z brakami danych)
-    cities = ["Warszawa", "Kraków", "Gdańsk", "Wrocław", "Poznań", "Katowice", np.nan]
-    data["Miasto"] = np.random.choice(cities, size=num_rows, p=[0.2, 0.15, 0.1, 0.1, 0.1, 0.1, 0.25])
+    data["Miasto"] = CITIES[rng.choice(len(CITIES), size=num_rows, p=CITY_P)]
 
     # 5. Liczba_Dzieci (skokowa, całkowita)
-    data["Liczba_Dzieci"] = np.random.randint(0, 5, size=num_rows)
+    data["Liczba_Dzieci"] = rng.integers(0, 5, size=num_rows)
 
     # 6. Przychód (ciągła, z dużą wariancją, z outlierami)
-    data["Przychód"] = np.random.normal(loc=5000, scale=2000, size=num_rows)
-    # Dodaj trochę outlierów
-    outlier_indices = np.random.choice(num_rows, int(num_rows * 0.01), replace=False)
-    data["Przychód"][outlier_indices] = np.random.normal(loc=20000, scale=5000, size=len(outlier_indices))
-    data["Przychód"][data["Przychód"] < 0] = 100 # Minimalny przychód
-    data["Przychód"] = data["Przychód"].round(2)
+    income = rng.normal(loc=5000, scale=2000, size=num_rows)
+    outlier_indices = rng.choice(num_rows, int(num_rows * 0.01), replace=False)
+    income[outlier_indices] = rng.normal(loc=20000, scale=5000, size=len(outlier_indices))
+    income[income < 0] = 100 # Minimalny przychód
+    data["Przychód"] = income.round(2)
 
     # 7. Czy_Aktywny (binarna)
-    data["Czy_Aktywny"] = np.random.choice([True, False], size=num_rows, p=[0.7, 0.3])
+    data["Czy_Aktywny"] = rng.random(num_rows) < 0.7
 
-    # 8. Data_Rejestracji (data)
-    start_date = pd.to_datetime("2020-01-01")
-    end_date = pd.to_datetime("2023-12-31")
-    date_range = (end_date - start_date).days
-    data["Data_Rejestracji"] = [start_date + pd.Timedelta(days=random.randint(0, date_range)) for _ in range(num_rows)]
+    # 8. Data_Rejestracji (data) - arytmetyka na datetime64 zamiast pętli po wierszach
+    date_range = int((END_DATE - START_DATE).astype(int))
+    data["Data_Rejestracji"] = START_DATE + rng.integers(0, date_range + 1, size=num_rows).astype("timedelta64[D]")
 
     # 9. Opis (tekstowa, z brakami danych i różnymi długościami)
-    descriptions = [
-        "Lorem ipsum dolor sit amet, consectetur adipiscing elit.",
-        "Sed do eiusmod tempor incididunt ut labore et dolore magna aliqua.",
-        "Ut enim ad minim veniam, quis nostrud exercitation ullamco laboris nisi ut aliquip ex ea commodo consequat.",
-        "Duis aute irure dolor in reprehenderit in voluptate velit esse cillum dolore eu fugiat nulla pariatur.",
-        "Excepteur sint occaecat cupidatat non proident, sunt in culpa qui officia deserunt mollit anim id est laborum.",
-        "", # Pusty opis
-        np.nan # Brak danych
-    ]
-    data["Opis"] = np.random.choice(descriptions, size=num_rows, p=[0.15, 0.15, 0.15, 0.15, 0.15, 0.15, 0.1])
+    data["Opis"] = DESCRIPTIONS[rng.choice(len(DESCRIPTIONS), size=num_rows, p=DESCRIPTION_P)]
 
+    return pd.DataFrame(data)
 
-    df = pd.DataFrame(data)
+
+def generate_sample_csv(filename="sample_data.csv", num_rows=1000, seed=None):
+    """Generuje przykładowy plik CSV z różnymi typami danych (kolumny - zob. sample_chunk)."""
+    df = sample_chunk(np.random.default_rng(seed), num_rows)
 
     # Zapisz do CSV
     df.to_csv(filename, index=False, encoding='utf-8')
     print(f"Wygenerowano plik '{filename}' z {num_rows} wierszami.")
 
+
+def _chunk_plan(num_rows, chunk_size, seed):
+    # Każdy fragment ma własne ziarno z SeedSequence, więc wynik nie zależy od liczby procesów
+    seeds = np.random.SeedSequence(seed).spawn((num_rows + chunk_size - 1) // chunk_size)
+    return [
+        (seed_seq, min(chunk_size, num_rows - i * chunk_size), i * chunk_size + 1)
+        for i, seed_seq in enumerate(seeds)
+    ]
+
+
+def _render_chunk(task):
+    seed_seq, num_rows, first_id, file_format, header = task
+    df = sample_chunk(np.random.default_rng(seed_seq), num_rows, first_id)
+    if file_format == "parquet":
+        import pyarrow as pa
+        return pa.Table.from_pandas(df, preserve_index=False)
+    return df.to_csv(index=False, header=header).encode("utf-8")
+
+
+def generate_large_file(filename, num_rows, chunk_size=DEFAULT_CHUNK_SIZE, file_format="csv", processes=1, seed=0):
+    """
+    Strumieniowo generuje duży plik testowy (CSV lub Parquet) fragmentami po chunk_size wierszy.
+
+    Fragmenty są generowane wektorowo (numpy.random.Generator) i od razu dopisywane
+    do pliku, więc pamięć zależy od chunk_size, a nie od num_rows. Przy processes > 1
+    fragmenty generuje pula procesów, a zapis zachowuje ich kolejność. Dla tego
+    samego ziarna i chunk_size plik jest identyczny niezależnie od liczby procesów.
+    Format Parquet wymaga pakietu pyarrow.
+    """
+    if file_format not in ("csv", "parquet"):
+        raise ValueError("Obsługiwane formaty: 'csv' i 'parquet'.")
+    if file_format == "parquet":
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Zapis do formatu Parquet wymaga pakietu pyarrow (pip install pyarrow).")
+
+    tasks = [(seed_seq, rows, first_id, file_format, i == 0)
+             for i, (seed_seq, rows, first_id) in enumerate(_chunk_plan(num_rows, chunk_size, seed))]
+
+    writer = None
+    out = None if file_format == "parquet" else open(filename, "wb")
+    try:
+        def write(chunk):
+            nonlocal writer
+            if file_format == "parquet":
+                if writer is None:
+                    writer = pq.ParquetWriter(filename, chunk.schema)
+                writer.write_table(chunk)
+            else:
+                out.write(chunk)
+
+        if processes > 1:
+            from concurrent.futures import ProcessPoolExecutor
+            with ProcessPoolExecutor(max_workers=processes) as pool:
+                # Okna po 2 * processes fragmentów ograniczają liczbę gotowych, niezapisanych fragmentów w pamięci
+                window = 2 * processes
+                for start in range(0, len(tasks), window):
+                    for chunk in pool.map(_render_chunk, tasks[start:start + window]):
+                        write(chunk)
+        else:
+            for task in tasks:
+                write(_render_chunk(task))
+    finally:
+        if writer is not None:
+            writer.close()
+        if out is not None:
+            out.close()
+    print(f"Wygenerowano plik '{filename}' z {num_rows} wierszami ({len(tasks)} fragmentów).")
+
+
+def generate_benchmark_csv(filename, num_rows=1000, num_columns=8, mix=(0.5, 0.25, 0.25), missing_rate=0.0, seed=0):
+    """
+    Generuje plik CSV o zadanej liczbie wierszy, kolumn i proporcjach typów (do benchmarków).
+
+    Kolumny powielają rodziny z generate_sample_csv:
+    - Wiek_i, Przychód_i (ciągłe: rozkład normalny / przychód z outlierami)
+    - Płeć_i, Czy_Aktywny_i (binarne, 0/1)
+    - Miasto_i (kategoryczna, 6 poziomów)
+
+    mix - udziały kolumn (ciągłe, binarne, kategoryczne); missing_rate - odsetek
+    losowych braków danych w każdej kolumnie. Zwraca słownik typów zmiennych
+    w formacie oczekiwanym przez backend (np. {"Wiek_1": "ciągła"}).
+    """
+    rng = np.random.default_rng(seed)
+    weights = np.asarray(mix, dtype=float) / np.sum(mix)
+    counts = np.floor(weights * num_columns).astype(int)
+    # Pozostałe kolumny trafiają do typów z największą częścią ułamkową
+    for i in np.argsort(-(weights * num_columns - counts))[:num_columns - counts.sum()]:
+        counts[i] += 1
+    n_continuous, n_binary, n_categorical = counts
+
+    data = {}
+    variable_types = {}
+    for i in range(n_continuous):
+        if i % 2 == 0:
+            name = f"Wiek_{i // 2 + 1}"
+            values = np.clip(rng.normal(loc=35, scale=10, size=num_rows).round(), 18, 80)
+        else:
+            name = f"Przychód_{i // 2 + 1}"
+            values = rng.normal(loc=5000, scale=2000, size=num_rows)
+            outliers = rng.random(num_rows) < 0.01
+            values[outliers] = rng.normal(loc=20000, scale=5000, size=outliers.sum())
+            values = np.maximum(values, 100).round(2)
+        data[name] = values
+        variable_types[name] = "ciągła"
+    for i in range(n_binary):
+        name = f"Płeć_{i // 2 + 1}" if i % 2 == 0 else f"Czy_Aktywny_{i // 2 + 1}"
+        data[name] = (rng.random(num_rows) < (0.55 if i % 2 == 0 else 0.7)).astype(float)
+        variable_types[name] = "binarna"
+    cities = np.array(["Warszawa", "Kraków", "Gdańsk", "Wrocław", "Poznań", "Katowice"], dtype=object)
+    for i in range(n_categorical):
+        name = f"Miasto_{i + 1}"
+        data[name] = cities[rng.choice(len(cities), size=num_rows, p=[0.25, 0.2, 0.15, 0.15, 0.15, 0.1])]
+        variable_types[name] = "nominalna"
+
+    df = pd.DataFrame(data)
+    if missing_rate > 0:
+        for col in df.columns:
+            df.loc[rng.random(num_rows) < missing_rate, col] = np.nan
+
+    df.to_csv(filename, index=False, encoding='utf-8')
+    return variable_types
+
 if __name__ == "__main__":
-    # Generowanie małego pliku (100 wierszy)
-    generate_sample_csv("small_sample_data.csv", num_rows=100)
-    
-    # Generowanie większego pliku (10,000 wierszy)
-    generate_sample_csv("large_sample_data.csv", num_rows=10000)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Generator przykładowych plików z danymi.")
+    parser.add_argument("--rows", type=int, help="liczba wierszy dużego pliku (tryb strumieniowy)")
+    parser.add_argument("--output", default="stress_data.csv")
+    parser.add_argument("--format", choices=["csv", "parquet"], default="csv")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--processes", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.rows:
+        # np. python generate_sample_csv.py --rows 50000000 --processes 8 --output stress.csv
+        generate_large_file(args.output, args.rows, args.chunk_size, args.format, args.processes, args.seed)
+    else:
+        # Generowanie małego pliku (100 wierszy)
+        generate_sample_csv("small_sample_data.csv", num_rows=100)
+
+        # Generowanie większego pliku (10,000 wierszy)
+        generate_sample_csv("large_sample_data.csv", num_rows=10000)
@@ -3,19 +3,103 @@ import React, { useState, useEffect, useCallback } from 'react';
 // === Endpointy na backendzie ===
 const API_BASE_URL = (process.env.REACT_APP_API_URL || "https://analiza-danych.onrender.com") + "/api";
 const PREVIEW_URL = `${API_BASE_URL}/parse-preview`;
+const PREVIEW_SHEET_URL = `${API_BASE_URL}/preview-sheet`;
 const PAYMENT_URL = `${API_BASE_URL}/create-payment-session`;
 const REPORT_URL = `${API_BASE_URL}/generate-report`;
+const REPORT_QUEUE_URL = `${API_BASE_URL}/report-queue`;
+const UPLOADS_URL = `${API_BASE_URL}/uploads`;
+const MAX_REPORT_RETRIES = 5;
+
+// Pliki większe niż próg wysyłamy fragmentami (wznawialnie); mniejsze jednym żądaniem
+const CHUNKED_UPLOAD_THRESHOLD = 20 * 1024 * 1024;
+const MAX_CHUNK_RETRIES = 5;
+
+const sha256Hex = async (buffer) => {
+  const digest = await crypto.subtle.digest('SHA-256', buffer);
+  return Array.from(new Uint8Array(digest)).map((b) => b.toString(16).padStart(2, '0')).join('');
+};
+
+const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+
+// Wysyła plik fragmentami z sumami kontrolnymi i zwraca podgląd (jak /parse-preview).
+// ID sesji przesyłania trzymamy w localStorage, więc po zerwaniu połączenia lub odświeżeniu
+// strony wysyłane są tylko brakujące fragmenty.
+async function uploadInChunks(file, onProgress) {
+  const storageKey = `upload:${file.name}:${file.size}:${file.lastModified}`;
+  let status = null;
+  const savedId = localStorage.getItem(storageKey);
+  if (savedId) {
+    const response = await fetch(`${UPLOADS_URL}/${savedId}`);
+    if (response.ok) status = await response.json();
+  }
+  if (!status) {
+    const response = await fetch(UPLOADS_URL, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ filename: file.name, size: file.size }),
+    });
+    if (!response.ok) {
+      const err = await response.json().catch(() => ({}));
+      throw new Error(err.detail || `Błąd serwera: ${response.status}`);
+    }
+    status = await response.json();
+    localStorage.setItem(storageKey, status.upload_id);
+  }
+
+  const received = new Set(status.received_chunks);
+  for (let index = 0; index < status.total_chunks; index++) {
+    if (received.has(index)) continue;
+    const chunk = await file.slice(index * status.chunk_size, (index + 1) * status.chunk_size).arrayBuffer();
+    const checksum = await sha256Hex(chunk);
+    for (let attempt = 0; ; attempt++) {
+      try {
+        const response = await fetch(`${UPLOADS_URL}/${status.upload_id}/chunks/${index}`, {
+          method: 'PUT',
+          headers: { 'X-Chunk-SHA256': checksum },
+          body: chunk,
+        });
+        if (response.ok) break;
+        if (response.status === 404) localStorage.removeItem(storageKey);
+        if (response.status < 500 && response.status !== 422) {
+          const err = await response.json().catch(() => ({}));
+          throw new Error(err.detail || `Błąd serwera: ${response.status}`);
+        }
+      } catch (err) {
+        if (!(err instanceof TypeError)) throw err; // TypeError = błąd sieci, ponawiamy
+      }
+      if (attempt >= MAX_CHUNK_RETRIES) throw new Error('Nie udało się przesłać pliku. Sprawdź połączenie i spróbuj ponownie.');
+      await sleep(1000 * 2 ** attempt);
+    }
+    received.add(index);
+    onProgress(Math.round((received.size / status.total_chunks) * 100));
+  }
+
+  const response = await fetch(`${UPLOADS_URL}/${status.upload_id}/complete`, { method: 'POST' });
+  if (response.status !== 409) localStorage.removeItem(storageKey);
+  if (!response.ok) {
+    const err = await response.json().catch(() => ({}));
+    throw new Error(err.detail || err.error || `Błąd serwera: ${response.status}`);
+  }
+  return response.json();
+}
 
 // === Komponent do wyboru typu zmiennej ===
-function VariableTypeSelector({ columnName, onChange }) {
+function VariableTypeSelector({ columnName, value, suggestion, onChange }) {
   return (
-    <select onChange={(e) => onChange(columnName, e.target.value)} style={{ width: '100%' }}>
-      <option value="pomiń">Pomiń (np. ID, Tekst)</option>
-      <option value="ciągła">Ciągła (np. Wiek, Przychód)</option>
-      <option value="binarna">Binarna (2 grupy, np. Płeć)</option>
-      <option value="nominalna">Kategoryczna (3+ grup, np. Miasto)</option>
-      <option value="porzadkowa">Porządkowa (kolejność)</option>
-    </select>
+    <>
+      <select value={value || 'pomiń'} onChange={(e) => onChange(columnName, e.target.value)} style={{ width: '100%' }}>
+        <option value="pomiń">Pomiń (np. ID, Tekst)</option>
+        <option value="ciągła">Ciągła (np. Wiek, Przychód)</option>
+        <option value="binarna">Binarna (2 grupy, np. Płeć)</option>
+        <option value="nominalna">Kategoryczna (3+ grup, np. Miasto)</option>
+        <option value="porządkowa">Porządkowa (kolejność)</option>
+      </select>
+      {suggestion && (
+        <div style={{ fontSize: '0.8em', color: suggestion.confidence < 0.7 ? '#856404' : '#6c757d', marginTop: '3px' }}>
+          Propozycja: {suggestion.type} ({Math.round(suggestion.confidence * 100)}%, {suggestion.reason})
+        </div>
+      )}
+    </>
   );
 }
 
@@ -23,15 +107,19 @@ function VariableTypeSelector({ columnName, onChange }) {
 function App() {
   // --- Stany Aplikacji ---
   const [originalFile, setOriginalFile] = useState(null);
+  const [uploadToken, setUploadToken] = useState(null);
   const [previewData, setPreviewData] = useState(null);
   const [variableTypes, setVariableTypes] = useState({});
   const [missingDataStrategy, setMissingDataStrategy] = useState('');
   const [missingDataInfo, setMissingDataInfo] = useState(null);
+  const [correctionMethod, setCorrectionMethod] = useState('bonferroni');
 
   const [reportUrl, setReportUrl] = useState("");
   const [isLoading, setIsLoading] = useState(false);
   const [error, setError] = useState("");
   const [paymentStatus, setPaymentStatus] = useState('idle');
+  const [queueInfo, setQueueInfo] = useState(null);
+  const [uploadProgress, setUploadProgress] = useState(null);
 
   // --- NOWA, UPROSZCZONA LOGIKA POBIERANIA RAPORTU ---
   const getFinalReport = useCallback(async (sessionId) => {
@@ -39,14 +127,32 @@ function App() {
     setError("");
     setPaymentStatus('success'); // Ustawiamy status sukcesu, żeby pokazać ekran ładowania
 
+    // W trakcie oczekiwania odpytujemy pozycję raportu w kolejce serwera
+    const pollQueue = setInterval(async () => {
+      try {
+        const queueResponse = await fetch(`${REPORT_QUEUE_URL}/${encodeURIComponent(sessionId)}`);
+        setQueueInfo(queueResponse.ok ? await queueResponse.json() : null);
+      } catch (err) {
+        setQueueInfo(null);
+      }
+    }, 3000);
+
     try {
-      const response = await fetch(REPORT_URL, {
-        method: "POST",
-        headers: {
-          'Content-Type': 'application/json',
-        },
-        body: JSON.stringify({ session_id: sessionId }),
-      });
+      let response;
+      for (let attempt = 0; ; attempt++) {
+        response = await fetch(REPORT_URL, {
+          method: "POST",
+          headers: {
+            'Content-Type': 'application/json',
+          },
+          body: JSON.stringify({ session_id: sessionId }),
+        });
+        // Serwer przeciążony - ponów po czasie wskazanym w nagłówku Retry-After
+        if (response.status !== 503 || attempt >= MAX_REPORT_RETRIES) break;
+        const retryAfter = parseInt(response.headers.get('Retry-After'), 10) || 30;
+        setQueueInfo({ state: 'retrying', retry_after: retryAfter });
+        await new Promise((resolve) => setTimeout(resolve, retryAfter * 1000));
+      }
 
       if (!response.ok) {
         const errorData = await response.json().catch(() => ({ detail: 'Nieznany błąd serwera.' }));
@@ -62,6 +168,8 @@ function App() {
       setError(`Błąd podczas generowania raportu: ${err.message}`);
       setPaymentStatus('idle'); // Resetuj status w razie błędu
     } finally {
+      clearInterval(pollQueue);
+      setQueueInfo(null);
       setIsLoading(false);
     }
   }, []);
@@ -99,6 +207,7 @@ function App() {
     if (!file) return;
 
     setOriginalFile(file);
+    setUploadToken(null);
     setIsLoading(true);
     setError("");
     setPreviewData(null);
@@ -107,27 +216,57 @@ function App() {
     setMissingDataStrategy('');
     setMissingDataInfo(null);
 
-    const formData = new FormData();
-    formData.append("file", file);
+    try {
+      let data;
+      if (file.size > CHUNKED_UPLOAD_THRESHOLD) {
+        setUploadProgress(0);
+        data = await uploadInChunks(file, setUploadProgress);
+      } else {
+        const formData = new FormData();
+        formData.append("file", file);
+        const response = await fetch(PREVIEW_URL, { method: "POST", body: formData });
+        if (!response.ok) {
+          const err = await response.json();
+          throw new Error(err.error || err.detail || `Błąd serwera: ${response.status}`);
+        }
+        data = await response.json();
+      }
+      applyPreview(data);
+    } catch (err) {
+      setError(err.message);
+    } finally {
+      setUploadProgress(null);
+      setIsLoading(false);
+    }
+  };
+
+  const applyPreview = (data) => {
+    setPreviewData(data);
+    setUploadToken(data.upload_token);
+    setMissingDataInfo(data.missing_data_info);
+    setMissingDataStrategy('');
+
+    // Typy wstępnie wypełnione propozycjami z serwera; użytkownik może każdy zmienić
+    const initialTypes = {};
+    data.columns.forEach(col => { initialTypes[col] = data.suggested_types?.[col]?.type || "pomiń"; });
+    setVariableTypes(initialTypes);
+  };
 
+  // --- Wybór arkusza skoroszytu Excel: podgląd innego arkusza tego samego pliku ---
+  const handleSheetChange = async (sheet) => {
+    setIsLoading(true);
+    setError("");
     try {
-      const response = await fetch(PREVIEW_URL, { method: "POST", body: formData });
+      const response = await fetch(PREVIEW_SHEET_URL, {
+        method: "POST",
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ upload_token: uploadToken, sheet }),
+      });
       if (!response.ok) {
         const err = await response.json();
-        throw new Error(err.error || `Błąd serwera: ${response.status}`);
+        throw new Error(err.error || err.detail || `Błąd serwera: ${response.status}`);
       }
-      const data = await response.json();
-      setPreviewData(data);
-      setMissingDataInfo(data.missing_data_info);
-      
-      if (!data.missing_data_info.has_missing_data) {
-        setMissingDataStrategy('none');
-      }
-      
-      const initialTypes = {};
-      data.columns.forEach(col => { initialTypes[col] = "pomiń"; });
-      setVariableTypes(initialTypes);
-
+      applyPreview(await response.json());
     } catch (err) {
       setError(err.message);
     } finally {
@@ -139,9 +278,17 @@ function App() {
     setVariableTypes(prevTypes => ({ ...prevTypes, [columnName]: newType }));
   };
 
+  // Raport wczytuje tylko analizowane kolumny, więc strategia jest potrzebna tylko przy brakach w nich
+  const analyzedMissing = (missingDataInfo?.columns_with_missing_data || []).filter(col => variableTypes[col] && variableTypes[col] !== 'pomiń');
+  const needsStrategy = analyzedMissing.length > 0;
+  // W dużym skoroszycie braki sprawdzono tylko w początku arkusza - ewentualne dalsze braki usuwamy z wierszami
+  const effectiveStrategy = needsStrategy ? missingDataStrategy : (missingDataInfo?.sampled_rows ? 'delete_rows' : 'none');
+  // Skutki usuwania z podglądu są dokładne tylko wtedy, gdy wszystkie kolumny z brakami są analizowane
+  const strategySummary = analyzedMissing.length === missingDataInfo?.columns_with_missing_data?.length ? missingDataInfo.summary : null;
+
   // --- NOWA LOGIKA INICJOWANIA PŁATNOŚCI ---
   const handlePayment = async () => {
-    if (!originalFile || !variableTypes || (missingDataInfo?.has_missing_data && !missingDataStrategy)) {
+    if (!originalFile || !variableTypes || !effectiveStrategy) {
       setError("Brakuje pliku, zdefiniowanych typów zmiennych lub strategii dla braków danych.");
       return;
     }
@@ -149,14 +296,31 @@ function App() {
     setError("");
     setPaymentStatus('processing');
 
-    const formData = new FormData();
-    formData.append("file", originalFile);
-    formData.append("variable_types_json", JSON.stringify(variableTypes));
-    formData.append("missing_data_strategy", missingDataStrategy);
+    // Plik jest już na serwerze po podglądzie - wysyłamy tylko jego token.
+    // Jeśli token wygasł (410), ponawiamy z pełnym plikiem.
+    const buildFormData = (useToken) => {
+      const formData = new FormData();
+      if (useToken) {
+        formData.append("upload_token", uploadToken);
+      } else {
+        formData.append("file", originalFile);
+      }
+      formData.append("variable_types_json", JSON.stringify(variableTypes));
+      formData.append("missing_data_strategy", effectiveStrategy);
+      formData.append("correction_method", correctionMethod);
+      if (previewData?.sheet) {
+        formData.append("sheet", previewData.sheet);
+      }
+      return formData;
+    };
 
     try {
-      // Wyślij plik i parametry, aby utworzyć sesję i zapisać dane na backendzie
-      const response = await fetch(PAYMENT_URL, { method: "POST", body: formData });
+      // Wyślij parametry (i token pliku), aby utworzyć sesję i zapisać dane na backendzie
+      let response = await fetch(PAYMENT_URL, { method: "POST", body: buildFormData(Boolean(uploadToken)) });
+      if (response.status === 410 && uploadToken) {
+        setUploadToken(null);
+        response = await fetch(PAYMENT_URL, { method: "POST", body: buildFormData(false) });
+      }
       if (!response.ok) {
         const err = await response.json();
         throw new Error(err.detail || "Błąd tworzenia sesji płatności.");
@@ -171,11 +335,19 @@ function App() {
     }
   };
 
-  const isButtonDisabled = (missingDataInfo?.has_missing_data && !missingDataStrategy) || isLoading;
+  const isButtonDisabled = !effectiveStrategy || isLoading;
 
   // --- Renderowanie UI ---
   if (paymentStatus === 'success' && isLoading) {
-    return <div style={{ padding: '30px', fontFamily: 'sans-serif', color: 'green', textAlign: 'center' }}><h2>Płatność udana! Trwa generowanie raportu...</h2><p>To może potrwać nawet kilka minut. Proszę nie zamykać okna.</p></div>;
+    return <div style={{ padding: '30px', fontFamily: 'sans-serif', color: 'green', textAlign: 'center' }}><h2>Płatność udana! Trwa generowanie raportu...</h2><p>To może potrwać nawet kilka minut. Proszę nie zamykać okna.</p>
+      {queueInfo?.state === 'queued' && (
+        <p>Twój raport czeka w kolejce: pozycja {queueInfo.position} z {queueInfo.queue_length}
+          {queueInfo.estimated_wait_s ? ` (szacowany czas oczekiwania: ok. ${Math.ceil(queueInfo.estimated_wait_s / 60)} min)` : ''}.</p>
+      )}
+      {queueInfo?.state === 'retrying' && (
+        <p>Serwer jest obecnie przeciążony. Ponowimy próbę za {queueInfo.retry_after} s.</p>
+      )}
+    </div>;
   }
   if (reportUrl) {
     return (
@@ -197,7 +369,7 @@ function App() {
 
   // Jeśli nie ma danych do podglądu, pokaż nową stronę powitalną
   if (!previewData) {
-    return <LandingPage onFileChange={handleFileChangeAndPreview} isLoading={isLoading} error={error} />;
+    return <LandingPage onFileChange={handleFileChangeAndPreview} isLoading={isLoading} uploadProgress={uploadProgress} error={error} />;
   }
 
   // Jeśli są dane do podglądu, pokaż przepływ analizy
@@ -206,9 +378,14 @@ function App() {
       previewData={previewData}
       missingDataInfo={missingDataInfo}
       missingDataStrategy={missingDataStrategy}
+      needsStrategy={needsStrategy}
+      strategySummary={strategySummary}
       setMissingDataStrategy={setMissingDataStrategy}
+      correctionMethod={correctionMethod}
+      setCorrectionMethod={setCorrectionMethod}
       variableTypes={variableTypes}
       handleTypeChange={handleTypeChange}
+      handleSheetChange={handleSheetChange}
       handlePayment={handlePayment}
       isButtonDisabled={isButtonDisabled}
       isLoading={isLoading}
@@ -218,7 +395,7 @@ function App() {
   );
 }
 
-const LandingPage = ({ onFileChange, isLoading, error }) => {
+const LandingPage = ({ onFileChange, isLoading, uploadProgress, error }) => {
   const fileInputRef = React.useRef(null);
   const handleButtonClick = () => fileInputRef.current.click();
 
@@ -242,7 +419,7 @@ const LandingPage = ({ onFileChange, isLoading, error }) => {
       <section style={styles.keyInfoSection}>
         <div style={styles.keyInfoCard}>
           <h3 style={styles.h3}>Wymagany Format</h3>
-          <p>Prześlij swoje dane w pliku <strong>.CSV</strong> rozdzielanym przecinkami.</p>
+          <p>Prześlij swoje dane w pliku <strong>.CSV</strong> rozdzielanym przecinkami (także skompresowanym: .gz, .zst, .bz2) albo w skoroszycie <strong>Excel</strong> (.xlsx, .xls), <strong>Parquet</strong> lub <strong>Feather</strong>.</p>
         </div>
         <div style={styles.keyInfoCard}>
           <h3 style={styles.h3}>Koszt Analizy</h3>
@@ -283,14 +460,14 @@ const LandingPage = ({ onFileChange, isLoading, error }) => {
         <section id="upload-section" style={styles.uploadSection}>
           <h2 style={styles.h2}>Rozpocznij w 3 prostych krokach</h2>
           <div style={styles.stepsGrid}>
-            <div style={styles.step}><strong>Krok 1:</strong> Wgraj plik CSV</div>
+            <div style={styles.step}><strong>Krok 1:</strong> Wgraj plik CSV lub Excel</div>
             <div style={styles.step}><strong>Krok 2:</strong> Zdefiniuj typy zmiennych</div>
             <div style={styles.step}><strong>Krok 3:</strong> Odbierz gotowy raport</div>
           </div>
           <button onClick={handleButtonClick} style={styles.ctaButton} disabled={isLoading}>
-            {isLoading ? 'Przetwarzanie...' : 'Rozpocznij Analizę - Wgraj Plik CSV'}
+            {uploadProgress !== null ? `Przesyłanie pliku... ${uploadProgress}%` : isLoading ? 'Przetwarzanie...' : 'Rozpocznij Analizę - Wgraj Plik CSV lub Excel'}
           </button>
-          <input type="file" ref={fileInputRef} onChange={onFileChange} accept=".csv" style={{ display: 'none' }} />
+          <input type="file" ref={fileInputRef} onChange={onFileChange} accept=".csv,.xlsx,.xls,.gz,.zst,.bz2,.parquet,.feather,.arrow" style={{ display: 'none' }} />
           {error && <p style={{ color: 'red', marginTop: '15px' }}><strong>Błąd:</strong> {error}</p>}
         </section>
 
@@ -339,7 +516,11 @@ const LandingPage = ({ onFileChange, isLoading, error }) => {
   );
 };
 
-const AnalysisFlow = ({ previewData, missingDataInfo, missingDataStrategy, setMissingDataStrategy, variableTypes, handleTypeChange, handlePayment, isButtonDisabled, isLoading, error, paymentStatus }) => (
+// Skutki strategii usuwania wyliczone z mapy braków w podglądzie
+const deleteRowsNote = summary => (summary ? ` (usunie ${summary.delete_rows_impact.rows_removed} z ${summary.total_rows} wierszy, ${summary.delete_rows_impact.percent_removed}%)` : '');
+const deleteColsNote = summary => (summary ? ` (usunie ${summary.delete_cols_impact.columns_removed} kolumn, zostanie ${summary.delete_cols_impact.columns_remaining})` : '');
+
+const AnalysisFlow = ({ previewData, missingDataInfo, missingDataStrategy, needsStrategy, strategySummary, setMissingDataStrategy, correctionMethod, setCorrectionMethod, variableTypes, handleTypeChange, handleSheetChange, handlePayment, isButtonDisabled, isLoading, error, paymentStatus }) => (
   <div style={styles.container}>
     <header style={styles.header}>
       <h1 style={styles.h1}>Konfiguracja Analizy</h1>
@@ -348,8 +529,21 @@ const AnalysisFlow = ({ previewData, missingDataInfo, missingDataStrategy, setMi
 
     <div style={styles.analysisBox}>
       <h2 style={styles.h2}>Krok 2: Skonfiguruj swoją analizę</h2>
+
+      {previewData.sheets?.length > 1 && (
+        <div style={{ margin: '15px 0' }}>
+          <label htmlFor="sheet"><strong>Arkusz skoroszytu:</strong> </label>
+          <select id="sheet" value={previewData.sheet} onChange={e => handleSheetChange(e.target.value)} disabled={isLoading}>
+            {previewData.sheets.map(sheet => <option key={sheet} value={sheet}>{sheet}</option>)}
+          </select>
+        </div>
+      )}
+
+      {missingDataInfo?.sampled_rows && !needsStrategy && (
+        <p>Braków danych nie znaleziono w pierwszych {missingDataInfo.sampled_rows} wierszach arkusza. Cały arkusz zostanie sprawdzony przy generowaniu raportu, a wiersze z ewentualnymi brakami - usunięte.</p>
+      )}
       
-      {missingDataInfo?.has_missing_data && (
+      {needsStrategy && (
         <div style={styles.missingDataPanel}>
           <h3 style={{ color: '#721c24', marginTop: 0 }}>Wykryto braki w danych!</h3>
           {missingDataInfo.detection_method && <p><strong>Metoda wykrywania:</strong> {missingDataInfo.detection_method}</p>}
@@ -361,15 +555,38 @@ const AnalysisFlow = ({ previewData, missingDataInfo, missingDataStrategy, setMi
               </ul>
             </div>
           )}
+          {missingDataInfo.summary && (
+            <div style={{ marginTop: '10px' }}>
+              <strong>Braki w kolumnach:</strong>
+              <ul style={{ paddingLeft: '20px', margin: '5px 0', listStyleType: 'square' }}>
+                {Object.entries(missingDataInfo.summary.missing_counts).map(([col, { count, percent }]) => (
+                  <li key={col}>{col}: {count} ({percent}%)</li>
+                ))}
+              </ul>
+              {missingDataInfo.summary.patterns.length > 0 && (
+                <>
+                  <strong>Najczęstsze wzorce braków (kolumny brakujące razem w jednym wierszu):</strong>
+                  <ul style={{ paddingLeft: '20px', margin: '5px 0', listStyleType: 'square' }}>
+                    {missingDataInfo.summary.patterns.map((pattern, i) => (
+                      <li key={i}>{pattern.columns.join(', ')}: {pattern.rows} wierszy ({pattern.percent}%)</li>
+                    ))}
+                  </ul>
+                </>
+              )}
+            </div>
+          )}
           <p style={{ marginTop: '20px' }}><strong>Wybierz, co chcesz zrobić z brakującymi danymi:</strong></p>
-          {['delete_rows', 'delete_cols', 'impute'].map(strategy => (
+          {['delete_rows', 'delete_cols', 'impute', 'impute_group_median', 'impute_knn', 'impute_mice'].map(strategy => (
             <div key={strategy}>
-              <input type="radio" id={`strat_${strategy}`} name="missing_data" value={strategy} onChange={e => setMissingDataStrategy(e.target.value)} />
+              <input type="radio" id={`strat_${strategy}`} name="missing_data" value={strategy} checked={missingDataStrategy === strategy} onChange={e => setMissingDataStrategy(e.target.value)} />
               <label htmlFor={`strat_${strategy}`}> {
                 {
-                  'delete_rows': 'Usuń wszystkie wiersze z brakami.',
-                  'delete_cols': 'Usuń całe kolumny z brakami.',
-                  'impute': 'Uzupełnij braki wartościami średnimi/dominantą.'
+                  'delete_rows': `Usuń wszystkie wiersze z brakami.${deleteRowsNote(strategySummary)}`,
+                  'delete_cols': `Usuń całe kolumny z brakami.${deleteColsNote(strategySummary)}`,
+                  'impute': 'Uzupełnij braki wartościami średnimi/dominantą.',
+                  'impute_group_median': 'Uzupełnij braki medianą w grupach najsilniej powiązanej zmiennej kategorycznej.',
+                  'impute_knn': 'Uzupełnij braki na podstawie najbardziej podobnych wierszy (k najbliższych sąsiadów).',
+                  'impute_mice': 'Uzupełnij braki regresją na pozostałych zmiennych (iteracyjnie, metoda MICE).'
                 }[strategy]
               }</label>
             </div>
@@ -377,8 +594,17 @@ const AnalysisFlow = ({ previewData, missingDataInfo, missingDataStrategy, setMi
         </div>
       )}
 
+      <div style={{ margin: '15px 0' }}>
+        <label htmlFor="correction_method"><strong>Korekta na wielokrotne porównania:</strong> </label>
+        <select id="correction_method" value={correctionMethod} onChange={e => setCorrectionMethod(e.target.value)}>
+          <option value="bonferroni">Bonferroniego (najbardziej rygorystyczna)</option>
+          <option value="holm">Holma-Bonferroniego</option>
+          <option value="fdr_bh">Benjaminiego-Hochberga (FDR, dla wielu zmiennych)</option>
+        </select>
+      </div>
+
       <div style={styles.warningBox}>
-        ⚠️ <strong>Ważna uwaga!</strong> Poprawne wyniki zależą od poprawnego zdefiniowania typów zmiennych.
+        ⚠️ <strong>Ważna uwaga!</strong> Poprawne wyniki zależą od poprawnego zdefiniowania typów zmiennych. Kolumny oznaczone jako „Pomiń” nie są wczytywane - nie ma ich ani w testach, ani w części opisowej raportu.
       </div>
 
       <table style={styles.table}>
@@ -393,7 +619,7 @@ const AnalysisFlow = ({ previewData, missingDataInfo, missingDataStrategy, setMi
           {previewData.columns.map((colName, colIndex) => (
             <tr key={colName}>
               <td style={styles.td}><strong>{colName}</strong></td>
-              <td style={styles.td}><VariableTypeSelector columnName={colName} onChange={handleTypeChange} /></td>
+              <td style={styles.td}><VariableTypeSelector columnName={colName} value={variableTypes[colName]} suggestion={previewData.suggested_types?.[colName]} onChange={handleTypeChange} /></td>
               <td style={styles.td}>{previewData.preview_data.map(row => row[colIndex]).slice(0, 5).join(', ')}...</td>
             </tr>
           ))}
@@ -406,7 +632,7 @@ const AnalysisFlow = ({ previewData, missingDataInfo, missingDataStrategy, setMi
       <button onClick={handlePayment} style={isButtonDisabled ? styles.ctaButtonDisabled : styles.ctaButton} disabled={isButtonDisabled}>
         {isLoading ? 'Przetwarzanie...' : 'Zapłać i Generuj Raport'}
       </button>
-      {isButtonDisabled && missingDataInfo?.has_missing_data && !missingDataStrategy && <p style={{color: 'red', marginTop: '10px'}}>Proszę wybrać strategię obsługi brakujących danych.</p>}
+      {isButtonDisabled && needsStrategy && !missingDataStrategy && <p style={{color: 'red', marginTop: '10px'}}>Proszę wybrać strategię obsługi brakujących danych.</p>}
       {error && <p style={{ color: 'red', marginTop: '15px' }}><strong>Błąd:</strong> {error}</p>}
       {paymentStatus === 'cancelled' && <p style={{ color: 'orange' }}>Płatność anulowana.</p>}
     </div>